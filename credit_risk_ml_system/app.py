@@ -12,21 +12,24 @@ Integrated Credit Risk API with Monitoring Logging
 
 from flask import Flask, request, jsonify, send_from_directory, send_file
 from flask_cors import CORS # Cross Origin Resource Sharing 
-import joblib
 import pandas as pd
 import numpy as np
 import os
 import json
-import io
-import base64
-import matplotlib.pyplot as plt
-import seaborn as sns
+import uuid
 from datetime import datetime
 
 
-from explainability.shap_explainer import get_shap_explanation
-from services.scoring import get_realtime_risk_details
+from explainability.shap_explainer import get_shap_explanation, get_shap_explanations, refresh_explainer, explainer_registry
+from explainability.deferred import DeferredExplainer
+from services.scoring import get_realtime_risk_details, get_batch_risk_details
+from services.inference import ModelManager, validate_records, build_model_input, predict_default_probability
+from services.coalescer import PredictionCoalescer
+from services.eda_cache import EdaReportCache
 from monitoring.drift_analysis import CreditRiskMonitor
+from monitoring.prediction_logger import PredictionLogWriter
+from monitoring.prediction_store import PredictionLogStore
+from monitoring.drift_accumulator import DriftAccumulator, ROLLUP_FREQS
 
 # Initialize Flask
 app = Flask(__name__, static_folder='ui')
@@ -38,9 +41,44 @@ LOG_DIR = "logs"
 LOG_FILE = os.path.join(LOG_DIR, "production_predictions.csv")
 # Constants
 MODEL_PATH = "artifacts/credit_risk_pipeline.pkl"
-LOG_FILE = "logs/production_predictions.csv"
-BASELINE_FILE = "data/processed/training_reference.csv"
+LOG_FILE = "logs/production_predictions.csv"  # legacy CSV log (see prediction_store migrate)
+LOG_STORE_DIR = "logs/predictions"  # Parquet partitions: date=YYYY-MM-DD/hour=HH
+DRIFT_LOOKBACK_DAYS = 7
+BASELINE_FILE = "artifacts/baseline_profile.json"  # written by the trainers
+DRIFT_COUNTS_DIR = "logs/drift_counts"  # hourly drift counts updated as the log is written
+DRIFT_PERSIST_SECONDS = 60.0
 REPORTS_DIR = "reports"
+EDA_DATA_PATH = "data/raw/hmeq.csv"
+EDA_CHECK_SECONDS = 30  # how often /api/eda-report checks the source data for changes
+MODEL_RELOAD_INTERVAL = 5  # seconds between artifact checks
+MODEL_MMAP_MODE = os.environ.get("MODEL_MMAP_MODE") or None  # "r": memory-map an artifact snapshot
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", 5000))  # bounds memory per /predict/batch call
+
+# Column order of the production log (matches the existing CSV header)
+LOG_COLUMNS = [
+    "LOAN", "MORTDUE", "VALUE", "REASON", "JOB", "YOJ", "DEROG", "DELINQ",
+    "CLAGE", "NINQ", "CLNO", "DEBTINC", "COLLATERAL", "L_P_RATIO", "L_C_RATIO",
+    "C_P_RATIO", "HIGH_DEBTINC_FLAG", "HAS_DEROG", "timestamp", "predicted_prob", "decision", "prediction_id"
+]
+
+# Background log writer: flush every LOG_BATCH_SIZE records or LOG_FLUSH_SECONDS
+# (each flush is one Parquet part file, so keep the interval coarse)
+LOG_QUEUE_SIZE = 10000
+LOG_BATCH_SIZE = 500
+LOG_FLUSH_SECONDS = 30.0
+LOG_ON_FULL = "drop"  # or "block": never slow /predict down for the sake of the log
+
+# Opt-in micro-batching of concurrent /predict calls (0 = score each request directly)
+COALESCE_MAX_WAIT_MS = float(os.environ.get("COALESCE_MAX_WAIT_MS", 0))
+COALESCE_MAX_BATCH = int(os.environ.get("COALESCE_MAX_BATCH", 64))
+
+# Deferred reason codes (/predict?explain=async): results kept for polling
+EXPLAIN_WORKERS = 2
+EXPLAIN_STORE_SIZE = 10000
+EXPLAIN_TTL_SECONDS = 300
+EXPLAIN_MAX_PENDING = 100  # queued async explanations; beyond this /predict explains inline
+# Shared ticket directory for multi-worker serving (set by gunicorn.conf.py); unset = in-process store
+EXPLAIN_STORE_DIR = os.environ.get("EXPLAIN_STORE_DIR") or None
 
 os.makedirs(REPORTS_DIR, exist_ok=True)
 os.makedirs("logs", exist_ok=True)
@@ -48,55 +86,113 @@ os.makedirs("logs", exist_ok=True)
 # Ensure directories exist for logging
 os.makedirs(LOG_DIR, exist_ok=True)
 
-@app.route('/')
-def index():
-    """Serve the UI."""
-    return send_from_directory('ui', 'index.html')
+# Load + warm the pipeline once per process, then hot-reload on change
+model_manager = ModelManager(MODEL_PATH, poll_interval=MODEL_RELOAD_INTERVAL, on_reload=[refresh_explainer],
+                             mmap_mode=MODEL_MMAP_MODE)
+model_manager.load()
+model_manager.start_watcher()
 
-@app.route('/predict', methods=['POST'])
-def predict():
+# Drift baseline profile loaded once (reloaded by the monitor after retraining);
+# every written log batch is also added to the hourly drift counts
+drift_monitor = CreditRiskMonitor(baseline_path=BASELINE_FILE)
+drift_accumulator = DriftAccumulator(drift_monitor, DRIFT_COUNTS_DIR, persist_interval=DRIFT_PERSIST_SECONDS)
+
+prediction_logger = PredictionLogWriter(
+    PredictionLogStore(LOG_STORE_DIR), max_queue=LOG_QUEUE_SIZE, batch_size=LOG_BATCH_SIZE,
+    flush_interval=LOG_FLUSH_SECONDS, on_full=LOG_ON_FULL, on_write=[drift_accumulator.update]
+)
+
+prediction_coalescer = None
+if COALESCE_MAX_WAIT_MS > 0:
+    prediction_coalescer = PredictionCoalescer(max_wait_ms=COALESCE_MAX_WAIT_MS, max_batch=COALESCE_MAX_BATCH)
+
+# EDA dashboard rendered once per source-data version, in the background
+eda_cache = EdaReportCache(EDA_DATA_PATH, os.path.join(REPORTS_DIR, "eda"), check_interval=EDA_CHECK_SECONDS)
+eda_cache.refresh()
+
+deferred_explainer = DeferredExplainer(
+    max_workers=EXPLAIN_WORKERS, max_items=EXPLAIN_STORE_SIZE, ttl_seconds=EXPLAIN_TTL_SECONDS,
+    max_pending=EXPLAIN_MAX_PENDING, store_dir=EXPLAIN_STORE_DIR
+)
+
+def restart_after_fork():
+    """
+    Called in each pre-forked worker (gunicorn.conf.py post_fork): the model
+    loaded by the master is inherited copy-on-write, background threads
+    are restarted.
+    """
+    model_manager.after_fork()
+    explainer_registry.after_fork()
+    prediction_logger.after_fork()
+    drift_monitor.after_fork()
+    drift_accumulator.after_fork()
+    deferred_explainer.after_fork()
+    eda_cache.after_fork()
+    if prediction_coalescer is not None:
+        prediction_coalescer.after_fork()
+
+def log_predictions(input_df, probs, decisions):
+    """
+    Queues scored rows (inputs + engineered features + outcome) for the
+    production log. Returns one prediction_id per row: the key labelled
+    outcomes are joined on for retraining (models/retrain.py).
+    """
+    log_df = input_df.reindex(columns=LOG_COLUMNS)
+    log_df['timestamp'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    log_df['predicted_prob'] = probs
+    log_df['decision'] = decisions
+    prediction_ids = [uuid.uuid4().hex for _ in range(len(log_df))]
+    log_df['prediction_id'] = prediction_ids
+    # Written asynchronously in batches by the background writer
+    prediction_logger.submit(log_df)
+    return prediction_ids
+
+# ----------------------------------------------------------------------
+# Request handlers: plain functions returning (payload, status) so the
+# Flask routes below and the ASGI app (app_asgi.py) share one JSON contract
+# ----------------------------------------------------------------------
+def predict_response(data, explain="sync"):
+    """
+    Scores one applicant.
+    explain="async" returns the decision immediately with an explanation
+    ticket; poll /api/explanations/<ticket> for the reason codes.
+    """
     try:
-        # 1. Load pipeline
-        if not os.path.exists(MODEL_PATH):
-            return jsonify({"error": "Model artifact missing. Train a model first."}), 500
+        # 1. Cached pipeline (loaded once, hot-reloaded by the watcher)
+        pipeline = model_manager.get()
+        if pipeline is None:
+            return {"error": "Model artifact missing. Train a model first."}, 500
             
-        pipeline = joblib.load(MODEL_PATH)
-        data = request.get_json()
         print("Data coming from the UI - " , data)
         
         # --- FEATURE ENGINEERING (Required for the model) ---
-        # We calculate these server-side so the UI/Bruno doesn't have to
-        data['COLLATERAL'] = data.get('VALUE', 0) - data.get('MORTDUE', 0)
-        data['L_P_RATIO'] = data.get('LOAN', 0) / data.get('VALUE', 1) if data.get('VALUE', 0) != 0 else 0
-        data['L_C_RATIO'] = data.get('LOAN', 0) / data['COLLATERAL'] if data['COLLATERAL'] != 0 else 0
-        data['C_P_RATIO'] = data['COLLATERAL'] / data.get('VALUE', 1) if data.get('VALUE', 0) != 0 else 0
-        data['HIGH_DEBTINC_FLAG'] = 1 if data.get('DEBTINC', 0) > 45 else 0
-        data['HAS_DEROG'] = 1 if data.get('DEROG', 0) > 0 else 0
-        
-        # Convert to DataFrame for the Scikit-Learn Pipeline
-        input_df = pd.DataFrame([data])
+        # Fitted feature step from the artifact: same ratios, imputation and
+        # clipping statistics as training (features/feature_pipeline.py)
+        input_df = build_model_input([data], pipeline)
         
-        # 2. Probability of Default (PD)
-        prob = pipeline.predict_proba(input_df)[0][1]
+        # 2. Probability of Default (PD), micro-batched with concurrent requests if enabled
+        if prediction_coalescer is not None:
+            prob = prediction_coalescer.predict(pipeline, input_df)[0]
+        else:
+            prob = predict_default_probability(pipeline, input_df)[0]
         
         # 3. Industry Scoring (Decisioning & Risk Bands)
         risk_details = get_realtime_risk_details(prob)
         
-        # 4. Explainability (SHAP Reason Codes)
-        explanation = get_shap_explanation(pipeline, input_df)
+        # 4. Explainability (SHAP Reason Codes), inline by default
+        # (async falls back to inline when the deferred queue is full)
+        explanation, explanation_ticket = None, None
+        if explain.lower() == "async":
+            explanation_ticket = deferred_explainer.submit(pipeline, input_df)
+        if explanation_ticket is None:
+            explanation = get_shap_explanation(pipeline, input_df)
         
         # --- 5. DATA LOGGING FOR DRIFT MONITORING ---
         # We log everything: inputs, engineered features, and the prediction result
-        log_data = data.copy()
-        log_data['timestamp'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_data['predicted_prob'] = round(float(prob), 4)
-        log_data['decision'] = risk_details['decision']
+        prediction_id = log_predictions(input_df, [round(float(prob), 4)], [risk_details['decision']])[0]
         
-        log_df = pd.DataFrame([log_data])
-        # Append to CSV; if file doesn't exist, write headers
-        log_df.to_csv(LOG_FILE, mode='a', header=not os.path.exists(LOG_FILE), index=False)
-        
-        return jsonify({
+        response = {
+            "prediction_id": prediction_id,
             "probability_of_default": round(float(prob), 4),
             "credit_score": risk_details['credit_score'],
             "risk_band": risk_details['risk_band'],
@@ -104,64 +200,189 @@ def predict():
             "action_code": risk_details['action_code'],
             "explanation": explanation,
             "theme_color": risk_details['color']
-        })
+        }
+        if explanation_ticket is not None:
+            response["explanation_ticket"] = explanation_ticket
+            response["explanation_url"] = f"/api/explanations/{explanation_ticket}"
+        return response, 200
     
     except Exception as e:
         # Log the error for debugging
         print(f"Prediction Error: {str(e)}")
-        return jsonify({"error": str(e)}), 400
-    
-@app.route('/api/drift-report')
-def drift_report():
+        return {"error": str(e)}, 400
+
+def predict_batch_response(payload, explain="false"):
+    """
+    Scores an array of applicants in one call.
+    Body: a JSON list of applicant records, or {"records": [...]}.
+    explain=true adds per-row SHAP reason codes (one explainer call per batch).
+    """
     try:
-        monitor = CreditRiskMonitor(baseline_path=BASELINE_FILE)
-        report = monitor.analyze_current_drift(log_path=LOG_FILE)
-        return jsonify(report)
+        pipeline = model_manager.get()
+        if pipeline is None:
+            return {"error": "Model artifact missing. Train a model first."}, 500
+
+        records = payload.get("records") if isinstance(payload, dict) else payload
+        if not isinstance(records, list):
+            return {"error": "Expected a JSON array of applicant records."}, 400
+        if len(records) > MAX_BATCH_SIZE:
+            return {"error": f"Batch of {len(records)} exceeds MAX_BATCH_SIZE={MAX_BATCH_SIZE}."}, 413
+
+        # 1. Per-row validation; bad rows are reported, the rest are scored
+        valid, positions, errors = validate_records(records)
+        results = []
+
+        if valid:
+            # 2. Whole-array feature engineering and scoring
+            input_df = build_model_input(valid, pipeline)
+            probs = predict_default_probability(pipeline, input_df)
+            details = get_batch_risk_details(probs)
+            probs = np.round(probs.astype(float), 4)
+            explain = explain.lower() in ("1", "true", "yes")
+            explanations = get_shap_explanations(pipeline, input_df) if explain else None
+
+            # 3. One log write for the whole batch
+            prediction_ids = log_predictions(input_df, probs, details['decision'])
+
+            results = [
+                {
+                    "index": pos,
+                    "prediction_id": prediction_id,
+                    "probability_of_default": float(p),
+                    "credit_score": int(score),
+                    "risk_band": band,
+                    "decision": decision,
+                    "action_code": action,
+                    "theme_color": color
+                }
+                for pos, prediction_id, p, score, band, decision, action, color in zip(
+                    positions, prediction_ids, probs, details['credit_score'], details['risk_band'],
+                    details['decision'], details['action_code'], details['color'])
+            ]
+            if explanations is not None:
+                for result, explanation in zip(results, explanations):
+                    result["explanation"] = explanation
+
+        return {
+            "count": len(records),
+            "scored": len(results),
+            "failed": len(errors),
+            "results": results,
+            "errors": errors
+        }, 200
+
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        print(f"Batch Prediction Error: {str(e)}")
+        return {"error": str(e)}, 400
 
+def explanation_response(ticket):
+    """Polls a deferred explanation: 200 when done, 202 while pending, 404 if unknown/expired."""
+    result = deferred_explainer.result(ticket)
+    if result is None:
+        return {"error": "Unknown or expired explanation ticket."}, 404
+    result["ticket"] = ticket
+    return result, (202 if result["status"] == "pending" else 200)
 
-@app.route('/api/eda-report')
-def eda_report():
-    """Generates the EDA plot as a base64 string for the UI."""
+def model_status_response():
+    """Loaded model version, load time and warmup latency (readiness probe)."""
+    status = model_manager.status()
+    if prediction_coalescer is not None:
+        status["coalescer"] = prediction_coalescer.stats()
+    return status, (200 if status["ready"] else 503)
+
+def log_status_response():
+    """Queued / written / dropped counters of the background prediction logger."""
+    return prediction_logger.stats(), 200
+
+def drift_report_response(granularity=None):
+    """
+    Drift over the lookback window from the hourly accumulators (O(hours x
+    buckets), the log is not re-read). granularity=hour|day|week|month adds
+    a per-period timeline. Before any counts exist (fresh deployment, new
+    baseline) the log itself is analysed; `python -m monitoring.drift_accumulator`
+    backfills the counts.
+    """
+    if granularity is not None and granularity not in ROLLUP_FREQS:
+        return {"error": f"granularity must be one of {sorted(ROLLUP_FREQS)}"}, 400
     try:
-        df = pd.read_csv("data/raw/hmeq.csv")
-        df_calc = df.copy()
-        df_calc['L_P_RATIO'] = df_calc['LOAN'] / df_calc['VALUE'].replace(0, np.nan)
-        
-        plt.figure(figsize=(12, 8))
-        sns.set_style("whitegrid")
-        
-        fig, axes = plt.subplots(2, 2, figsize=(12, 10))
-        sns.countplot(x='BAD', data=df, ax=axes[0,0], palette='viridis')
-        axes[0,0].set_title('Target Distribution (BAD)')
-        
-        sns.histplot(x='DEBTINC', hue='BAD', data=df, kde=True, ax=axes[0,1])
-        axes[0,1].set_title('Debt-to-Income Impact')
-        
-        sns.boxplot(x='BAD', y='L_P_RATIO', data=df_calc, ax=axes[1,0])
-        axes[1,0].set_ylim(0, 1.5)
-        axes[1,0].set_title('LTV Ratio by Outcome')
-        
-        corr = df.select_dtypes(include=[np.number]).corr()
-        sns.heatmap(corr[['BAD']].sort_values(by='BAD'), annot=True, cmap='RdYlGn', ax=axes[1,1])
-        
-        plt.tight_layout()
-        
-        img = io.BytesIO()
-        plt.savefig(img, format='png')
-        img.seek(0)
-        plot_url = base64.b64encode(img.getvalue()).decode()
-        plt.close()
-        
-        return jsonify({"image": plot_url, "summary": "EDA generated successfully."})
+        # Make the latest predictions visible to the analysis
+        prediction_logger.flush()
+        if drift_accumulator.has_history():
+            report = drift_monitor.analyze_accumulated_drift(drift_accumulator, DRIFT_LOOKBACK_DAYS, granularity)
+        else:
+            report = drift_monitor.analyze_current_drift(log_path=LOG_STORE_DIR, lookback_days=DRIFT_LOOKBACK_DAYS)
+        return report, 200
+    except Exception as e:
+        return {"error": str(e)}, 500
+
+def eda_report_response(if_none_match=None):
+    """
+    Serves the precomputed EDA dashboard (base64 PNG) for the UI.
+    Returns (payload, status, headers); 304 when the client's ETag is current.
+    """
+    try:
+        report = eda_cache.get()
+        if report is None:
+            return {"error": eda_cache.last_error or "EDA report is still being generated."}, 503, {"Retry-After": "5"}
+
+        headers = {"ETag": f'"{report["etag"]}"', "Cache-Control": "no-cache"}
+        if if_none_match:
+            tags = [t.strip().removeprefix("W/").strip('"') for t in if_none_match.split(",")]
+            if "*" in tags or report["etag"] in tags:
+                return None, 304, headers
+        return {"image": report["image"], "summary": report["summary"]}, 200, headers
     except Exception as e:
-        return jsonify({"error": str(e)}), 500    
+        return {"error": str(e)}, 500, {}
+
+# ----------------------------------------------------------------------
+# Flask routes
+# ----------------------------------------------------------------------
+@app.route('/')
+def index():
+    """Serve the UI."""
+    return send_from_directory('ui', 'index.html')
+
+@app.route('/predict', methods=['POST'])
+def predict():
+    payload, status = predict_response(request.get_json(silent=True), request.args.get("explain", "sync"))
+    return jsonify(payload), status
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    payload, status = predict_batch_response(request.get_json(silent=True), request.args.get("explain", "false"))
+    return jsonify(payload), status
+
+@app.route('/api/explanations/<ticket>')
+def explanation_result(ticket):
+    payload, status = explanation_response(ticket)
+    return jsonify(payload), status
+
+@app.route('/api/model-status')
+def model_status():
+    payload, status = model_status_response()
+    return jsonify(payload), status
+
+@app.route('/api/log-status')
+def log_status():
+    payload, status = log_status_response()
+    return jsonify(payload), status
+
+@app.route('/api/drift-report')
+def drift_report():
+    payload, status = drift_report_response(request.args.get("granularity"))
+    return jsonify(payload), status
+
+@app.route('/api/eda-report')
+def eda_report():
+    payload, status, headers = eda_report_response(request.headers.get("If-None-Match"))
+    if status == 304:
+        return "", 304, headers
+    return jsonify(payload), status, headers
 
 if __name__ == '__main__':
     if not os.path.exists(MODEL_PATH):
         print(" [!] WARNING: Model artifact not found at " + MODEL_PATH)
     
     print(f" [*] Credit Risk Engine active: http://127.0.0.1:5000")
-    print(f" [*] Real-time monitoring enabled. Logs: {LOG_FILE}")
+    print(f" [*] Real-time monitoring enabled. Logs: {LOG_STORE_DIR}")
     app.run(debug=True, port=5002)
\ No newline at end of file
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+ASGI (Starlette) entry point for the Credit Risk API.
+
+Same routes and JSON contract as app.py: the handlers are the shared
+*_response functions. The event loop only parses requests and writes
+responses; model scoring, drift analysis and EDA rendering run on a
+dedicated thread pool so a slow report never stalls /predict.
+
+Run:
+    uvicorn app_asgi:app --host 0.0.0.0 --port 5002
+"""
+
+import os
+import asyncio
+import json
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import FileResponse, JSONResponse, Response
+from starlette.routing import Route
+
+import app as flask_app
+from app import (
+    predict_response, predict_batch_response, explanation_response, model_status_response,
+    log_status_response, drift_report_response, eda_report_response
+)
+
+# Threads for CPU-bound work (scoring, SHAP, reports)
+ASGI_WORKER_THREADS = int(os.environ.get("ASGI_WORKER_THREADS", 8))
+executor = ThreadPoolExecutor(max_workers=ASGI_WORKER_THREADS, thread_name_prefix="asgi-worker")
+
+
+async def run_blocking(fn, *args):
+    loop = asyncio.get_running_loop()
+    payload, status = await loop.run_in_executor(executor, fn, *args)
+    return JSONResponse(payload, status_code=status)
+
+
+async def read_json(request):
+    try:
+        return await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+
+
+async def index(request):
+    """Serve the UI."""
+    return FileResponse(os.path.join("ui", "index.html"))
+
+
+async def predict(request):
+    data = await read_json(request)
+    return await run_blocking(predict_response, data, request.query_params.get("explain", "sync"))
+
+
+async def predict_batch(request):
+    payload = await read_json(request)
+    return await run_blocking(predict_batch_response, payload, request.query_params.get("explain", "false"))
+
+
+async def explanation_result(request):
+    # Completed explanations may be read back from the file store
+    return await run_blocking(explanation_response, request.path_params["ticket"])
+
+
+async def model_status(request):
+    payload, status = model_status_response()
+    return JSONResponse(payload, status_code=status)
+
+
+async def log_status(request):
+    payload, status = log_status_response()
+    return JSONResponse(payload, status_code=status)
+
+
+async def drift_report(request):
+    return await run_blocking(drift_report_response, request.query_params.get("granularity"))
+
+
+async def eda_report(request):
+    loop = asyncio.get_running_loop()
+    payload, status, headers = await loop.run_in_executor(
+        executor, eda_report_response, request.headers.get("if-none-match"))
+    if status == 304:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(payload, status_code=status, headers=headers)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    yield
+    # Drain the prediction log before the server exits
+    executor.shutdown(wait=False, cancel_futures=True)
+    flask_app.prediction_logger.flush()
+
+
+routes = [
+    Route("/", index),
+    Route("/predict", predict, methods=["POST"]),
+    Route("/predict/batch", predict_batch, methods=["POST"]),
+    Route("/api/explanations/{ticket}", explanation_result),
+    Route("/api/model-status", model_status),
+    Route("/api/log-status", log_status),
+    Route("/api/drift-report", drift_report),
+    Route("/api/eda-report", eda_report),
+]
+
+app = Starlette(
+    routes=routes,
+    middleware=[Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])],
+    lifespan=lifespan
+)
+
+
+if __name__ == "__main__":
+    import uvicorn
+    print(f" [*] Credit Risk Engine (ASGI) active: http://127.0.0.1:5002")
+    uvicorn.run(app, host="127.0.0.1", port=5002)
@@ -7,11 +7,11 @@ Created on Sun Jan 18 13:35:11 2025
 
 from flask import Flask, request, jsonify, send_from_directory
 from flask_cors import CORS
-import joblib
 import pandas as pd
 import os
-from explainability.shap_explainer import get_shap_explanation
+from explainability.shap_explainer import get_shap_explanation, refresh_explainer
 from services.scoring import get_realtime_risk_details
+from services.inference import ModelManager, build_model_input, predict_default_probability
 
 # Initialize Flask
 app = Flask(__name__, static_folder='ui')
@@ -19,6 +19,11 @@ CORS(app) # Enable Cross-Origin Resource Sharing for the UI
 
 MODEL_PATH = "artifacts/credit_risk_pipeline.pkl"
 
+# Load + warm the pipeline once per process, then hot-reload on change
+model_manager = ModelManager(MODEL_PATH, on_reload=[refresh_explainer])
+model_manager.load()
+model_manager.start_watcher()
+
 @app.route('/')
 def index():
     """Serve the UI."""
@@ -27,30 +32,19 @@ def index():
 @app.route('/predict', methods=['POST'])
 def predict():
     try:
-        # 1. Load pipeline
-        if not os.path.exists(MODEL_PATH):
+        # 1. Cached pipeline (loaded once, hot-reloaded by the watcher)
+        pipeline = model_manager.get()
+        if pipeline is None:
             return jsonify({"error": "Model artifact missing. Train a model first."}), 500
             
-        pipeline = joblib.load(MODEL_PATH)
         data = request.get_json()
         
         
-        # Server-side engineering to ensure columns are never "missing"
-        data['COLLATERAL'] = data['VALUE'] - data['MORTDUE']
-        data['L_P_RATIO'] = data['LOAN'] / data['VALUE'] if data['VALUE'] != 0 else 0
-        data['L_C_RATIO'] = data['LOAN'] / data['COLLATERAL'] if data['COLLATERAL'] != 0 else 0
-        data['C_P_RATIO'] = data['COLLATERAL'] / data['VALUE'] if data['VALUE'] != 0 else 0
-        data['HIGH_DEBTINC_FLAG'] = 1 if data['DEBTINC'] > 45 else 0
-        data['HAS_DEROG'] = 1 if data['DEROG'] > 0 else 0
-        
-        
-        
-        input_df = pd.DataFrame([data])
-        
-        
+        # Server-side engineering shared with training (features/feature_pipeline.py)
+        input_df = build_model_input([data], pipeline)
         
         # 2. Probability of Default (PD)
-        prob = pipeline.predict_proba(input_df)[0][1]
+        prob = predict_default_probability(pipeline, input_df)[0]
         
         # 3. Industry Scoring (Real-time details)
         risk_details = get_realtime_risk_details(prob)
@@ -71,6 +65,12 @@ def predict():
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
+@app.route('/api/model-status')
+def model_status():
+    """Loaded model version, load time and warmup latency (readiness probe)."""
+    status = model_manager.status()
+    return jsonify(status), (200 if status["ready"] else 503)
+
 if __name__ == '__main__':
     if not os.path.exists(MODEL_PATH):
         print("  Warning: Model artifact not found. Run main.py first!")
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: all-feature drift (monitoring/drift_engine.py) against the
+previous per-Series PSI (np.percentile + np.histogram, one column at a time).
+
+Synthetic production rows are drawn around the baseline profile's bucket
+edges, so every profiled feature plus REASON / JOB is scored.
+
+Run from the project directory:
+    python -m benchmarks.drift_engine_benchmark --rows 1000000 5000000
+
+Reference run (19 features incl. score and 2 categoricals, 1 vCPU):
+
+        rows   per-Series s   engine s   engine rows/s
+     1000000          1.13       0.33        3.0M
+     5000000          6.02       1.74        2.9M
+
+The engine only holds one partition's value matrix at a time when fed from
+PredictionLogStore.iter_frames, and its counts merge with `+`, so tens of
+millions of rows cost time linear in rows and memory bounded by the part size.
+"""
+
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from monitoring.baseline_profile import BASELINE_PROFILE_PATH, load_baseline_profile
+from monitoring.drift_engine import DriftEngine
+
+
+def synthetic_log(profile, engine, rows, seed=0):
+    rng = np.random.default_rng(seed)
+    data = {}
+    numeric = dict(profile["numeric"], predicted_prob=profile["predicted_prob"])
+    for col in engine.numeric_features:
+        edges = np.asarray(numeric[col]["edges"])
+        lo, hi = (edges.min(), edges.max()) if len(edges) else (0.0, 1.0)
+        values = rng.uniform(lo - 0.1 * abs(lo), hi * 1.1 + 1e-9, rows)
+        values[rng.random(rows) < 0.02] = np.nan
+        data[col] = values
+    for col in engine.categorical_features:
+        cats = list(profile["categorical"][col]["frequencies"])
+        data[col] = rng.choice(cats, rows)
+    return pd.DataFrame(data)
+
+
+def per_series_psi(profile, df, engine, buckets=10):
+    """Previous approach: breakpoints and histograms recomputed per column."""
+    out = {}
+    for col in engine.numeric_features:
+        actual = df[col].dropna().to_numpy()
+        breakpoints = np.unique(np.percentile(actual, np.linspace(0, 100, buckets + 1)))
+        counts, _ = np.histogram(actual, breakpoints)
+        out[col] = counts / len(actual)
+    for col in engine.categorical_features:
+        out[col] = df[col].value_counts(normalize=True)
+    return out
+
+
+def main(rows_list, profile_path):
+    profile = load_baseline_profile(profile_path)
+    engine = DriftEngine(profile)
+    print(f"\n {len(engine.columns)} features (score + {len(engine.categorical_features)} categorical)")
+    print(f"{'rows':>12} | {'per-Series s':>12} | {'engine s':>9} | {'engine rows/s':>13}")
+    for rows in rows_list:
+        df = synthetic_log(profile, engine, rows)
+
+        start = time.perf_counter()
+        per_series_psi(profile, df, engine)
+        legacy = time.perf_counter() - start
+
+        start = time.perf_counter()
+        engine.drift_table(engine.count(df))
+        fast = time.perf_counter() - start
+        print(f"{rows:>12} | {legacy:12.2f} | {fast:9.2f} | {rows / fast / 1e6:12.1f}M")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 5_000_000])
+    parser.add_argument("--profile", default=BASELINE_PROFILE_PATH)
+    args = parser.parse_args()
+    main(args.rows, args.profile)
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: peak memory and time of out-of-core training
+(models/train_streaming.py) against the in-memory trainers' pattern
+(full read_table + CreditFeatureTransformer.fit + fit on the whole split).
+
+Synthetic tables are HMEQ rows resampled with 5% multiplicative noise
+(missing values and labels kept) at --scales x 5,960 rows, loaded into
+SQLite stand-ins of hmeq_data. Every run is a fresh subprocess, so
+peak RSS (ru_maxrss) is that run's own:
+    stream-sgd    - averaged SGD logistic regression, partial_fit per chunk
+    stream-xgb    - XGBoost on an ExtMemQuantileDMatrix (disk-cached pages)
+    memory-xgb    - same booster, whole table in memory (today's trainers)
+
+Run from the project directory:
+    python -m benchmarks.out_of_core_benchmark --scales 1,10,100
+
+Reference run (1 vCPU, chunksize 50,000; ~300 MB of the RSS is the
+imported libraries):
+
+   scale       rows        mode    peak MB   seconds     Gini
+       1      5,960  stream-sgd      300.6      2.27   0.6238
+       1      5,960  stream-xgb      306.5      2.63   0.8710
+       1      5,960  memory-xgb      303.5      2.08   0.8767
+      10     59,600  stream-sgd      376.1      6.22   0.6128
+      10     59,600  stream-xgb      378.8      7.41   0.9446
+      10     59,600  memory-xgb      346.8      4.06   0.9449
+     100    596,000  stream-sgd      414.4     40.07   0.6233
+     100    596,000  stream-xgb      439.2     45.10   0.9496
+     100    596,000  memory-xgb      627.1     21.96   0.9518
+     300  1,788,000  stream-sgd      414.7    132.89   0.6235
+     300  1,788,000  stream-xgb      455.0    151.70   0.9514
+
+Streaming memory rises until a chunk and the 50k-row scaler sample are
+full (by 10x-100x) and then stays flat: SGD uses the same 414 MB at 100x
+and 300x. The in-memory path grows with the table. Streaming is ~2x
+slower because every pass re-reads and re-featurizes from the database.
+That is the price of bounded memory; with a table that fits in RAM the
+in-memory trainers remain the faster choice.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import shutil
+import tempfile
+import subprocess
+
+import numpy as np
+import pandas as pd
+
+HMEQ_CSV = "data/raw/hmeq.csv"
+MODES = ["stream-sgd", "stream-xgb", "memory-xgb"]
+
+
+def build_synthetic_table(scale, out_dir, seed=42):
+    """HMEQ resampled to scale x rows with multiplicative noise; returns the SQLite URL."""
+    from data.sql_loader import create_sqlite_standin
+
+    base = pd.read_csv(HMEQ_CSV)
+    numeric = [c for c in base.columns if c not in ("BAD", "REASON", "JOB")]
+    rng = np.random.default_rng(seed)
+    csv_path = os.path.join(out_dir, f"hmeq_x{scale}.csv")
+    for i in range(scale):
+        block = base.copy()
+        block[numeric] = block[numeric] * rng.lognormal(0, 0.05, size=(len(block), len(numeric)))
+        block.to_csv(csv_path, mode="a" if i else "w", header=not i, index=False)
+    return create_sqlite_standin(os.path.join(out_dir, f"hmeq_x{scale}.sqlite"), csv_path)
+
+
+def run_memory_xgb(chunksize):
+    """The current trainers' pattern: whole table, in-memory split, fit, exact metrics."""
+    from sklearn.preprocessing import StandardScaler, OneHotEncoder
+    from sklearn.compose import ColumnTransformer
+    from xgboost import XGBClassifier
+    from data.sql_loader import read_table
+    from features.feature_pipeline import CreditFeatureTransformer, NUMERIC_FEATURES, CATEGORICAL_FEATURES
+    from models.evaluate import get_credit_metrics
+    from models.train_streaming import STREAM_COLUMNS, split_chunk, XGB_PARAMS, XGB_ROUNDS
+
+    X_train, y_train, X_test, y_test = split_chunk(read_table(columns=STREAM_COLUMNS, chunksize=chunksize))
+    features = CreditFeatureTransformer().fit(X_train)
+    preprocessor = ColumnTransformer([
+        ("num", StandardScaler(), NUMERIC_FEATURES),
+        ("cat", OneHotEncoder(handle_unknown="ignore"), CATEGORICAL_FEATURES)
+    ], sparse_threshold=0.0)
+    Xt_train = preprocessor.fit_transform(features.transform(X_train))
+    model = XGBClassifier(n_estimators=XGB_ROUNDS, max_depth=XGB_PARAMS["max_depth"],
+                          learning_rate=XGB_PARAMS["eta"], eval_metric="logloss", tree_method="hist")
+    model.fit(Xt_train, y_train)
+    probs = model.predict_proba(preprocessor.transform(features.transform(X_test)))[:, 1]
+    return get_credit_metrics(y_test, probs)["Gini"]
+
+
+def worker(mode, chunksize):
+    start = time.perf_counter()
+    if mode == "memory-xgb":
+        gini = run_memory_xgb(chunksize)
+    else:
+        from models.train_streaming import train_streaming
+        _, report = train_streaming(mode.split("-")[1], chunksize=chunksize, log_mlflow=False)
+        gini = report["Gini"]
+    print(json.dumps({
+        "seconds": time.perf_counter() - start,
+        "peak_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "gini": gini
+    }))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", default="1,10,100", help="table sizes as multiples of HMEQ")
+    parser.add_argument("--chunksize", type=int, default=50_000)
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker, args.chunksize)
+        sys.exit(0)
+
+    out_dir = tempfile.mkdtemp(prefix="ooc-bench-")
+    print(f"\n{'scale':>8} {'rows':>10} {'mode':>11} {'peak MB':>10} {'seconds':>9} {'Gini':>8}")
+    for scale in [int(s) for s in args.scales.split(",")]:
+        url = build_synthetic_table(scale, out_dir)
+        for mode in args.modes.split(","):
+            env = dict(os.environ, CREDIT_DB_URL=url)
+            out = subprocess.run([sys.executable, "-m", "benchmarks.out_of_core_benchmark", "--worker", mode,
+                                  "--chunksize", str(args.chunksize)], env=env, capture_output=True, text=True)
+            if out.returncode != 0:
+                print(f"{scale:>8} {mode:>22} failed:\n{out.stderr[-2000:]}")
+                continue
+            result = json.loads(out.stdout.strip().splitlines()[-1])
+            print(f"{scale:>8} {scale * 5960:>10,} {mode:>11} {result['peak_mb']:>10.1f} "
+                  f"{result['seconds']:>9.2f} {result['gini']:>8.4f}")
+    shutil.rmtree(out_dir, ignore_errors=True)
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: accuracy vs memory of the KLL score sketch
+(monitoring/quantile_sketch.py) against exact computations on full arrays.
+
+Scores are synthetic (beta distributions shaped like the model's
+predicted_prob); the reference population is sketched in --partitions
+pieces and merged, like per-worker / per-partition sketches. Per k:
+    retained / KB     - items kept and their memory (vs 8 bytes per score)
+    rank err          - max |sketch CDF - exact CDF| over 999 quantile points
+    bound             - the sketch's own 99% rank-error bound
+    KS err / bound    - |sketch KS D - ks_2samp D| and its stated bound
+    AUC err           - CreditMetricsSketch AUC vs roc_auc_score
+
+Run from the project directory:
+    python -m benchmarks.quantile_sketch_benchmark --rows 2000000
+
+Reference run (2M reference + 600k production scores, 16 partitions, 1 vCPU;
+exact arrays 20312 KB, ks_2samp 0.38s):
+
+       k   retained     KB   rank err    bound     KS err   KS bound    AUC err   build s
+      50        151    1.2    0.01478  0.02771    0.01593    0.06398    0.00014      0.09
+     100        289    2.3    0.01016  0.01435    0.00705    0.03260    0.00059      0.06
+     200        574    4.5    0.00311  0.00717    0.00441    0.01630    0.00031      0.06
+     400       1122    8.8    0.00170  0.00359    0.00334    0.00814    0.00048      0.05
+     800       2214   17.3    0.00103  0.00179    0.00121    0.00407    0.00013      0.06
+
+The observed errors stay inside the stated bounds. Memory depends on k
+only, not on the number of scores: doubling k roughly halves the error.
+"""
+
+import time
+import argparse
+
+import numpy as np
+import scipy.stats as stats
+from sklearn.metrics import roc_auc_score
+
+from models.evaluate import CreditMetricsSketch
+from monitoring.quantile_sketch import KLLSketch, ks_sketches
+
+
+def sketch_partitions(values, k, partitions):
+    sketches = [KLLSketch(k, seed=i).update(part) for i, part in enumerate(np.array_split(values, partitions))]
+    merged = sketches[0]
+    for sketch in sketches[1:]:
+        merged.merge(sketch)
+    return merged
+
+
+def main(rows, partitions, ks_list):
+    rng = np.random.default_rng(42)
+    reference = rng.beta(2, 5, rows)
+    production = rng.beta(2.2, 5, rows * 3 // 10)
+
+    start = time.perf_counter()
+    exact_d = stats.ks_2samp(reference, production).statistic
+    exact_s = time.perf_counter() - start
+
+    points = np.quantile(reference, np.linspace(0.001, 0.999, 999))
+    exact_cdf = np.searchsorted(np.sort(reference), points, side="right") / rows
+
+    # AUC: reference as goods, production as bads
+    y = np.r_[np.zeros(rows), np.ones(len(production))]
+    p = np.r_[reference, production]
+    exact_auc = roc_auc_score(y, p)
+
+    print(f"\n {rows} reference + {len(production)} production scores, {partitions} partitions; "
+          f"exact arrays {p.nbytes / 1024:.0f} KB, ks_2samp {exact_s:.2f}s")
+    print(f"{'k':>6} | {'retained':>8} | {'KB':>5} | {'rank err':>8} | {'bound':>7} | "
+          f"{'KS err':>7} | {'KS bound':>8} | {'AUC err':>7} | {'build s':>7}")
+    for k in ks_list:
+        start = time.perf_counter()
+        ref_sketch = sketch_partitions(reference, k, partitions)
+        build_s = time.perf_counter() - start
+        prod_sketch = sketch_partitions(production, k, partitions)
+
+        rank_err = np.max(np.abs(ref_sketch.cdf(points) - exact_cdf))
+        d, _, d_bound = ks_sketches(ref_sketch, prod_sketch)
+
+        metrics = CreditMetricsSketch(k).update(y, p).metrics()
+        print(f"{k:>6} | {ref_sketch.num_retained:>8} | {ref_sketch.nbytes / 1024:5.1f} | {rank_err:8.5f} | "
+              f"{ref_sketch.rank_error():7.5f} | {abs(d - exact_d):7.5f} | {d_bound:8.5f} | "
+              f"{abs(metrics['AUC'] - exact_auc):7.5f} | {build_s:7.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--partitions", type=int, default=16)
+    parser.add_argument("--k", type=int, nargs="+", default=[50, 100, 200, 400, 800])
+    args = parser.parse_args()
+    main(args.rows, args.partitions, args.k)
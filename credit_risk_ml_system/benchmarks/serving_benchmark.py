@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Flask (app.py, threaded dev server) vs ASGI (app_asgi.py on
+uvicorn) for concurrent /predict calls, alone and while another client
+keeps requesting /api/eda-report.
+
+Each server is started as a subprocess from the project directory:
+    python -m benchmarks.serving_benchmark --clients 16 --requests 30
+
+Reference run (voting pipeline with inline SHAP, 1 vCPU, 16 x 20 calls):
+
+    server  scenario        req/s   p50 ms   p99 ms
+    flask   predict only      7.0   2247.5   3022.4
+    flask   + eda reports     6.7   2327.9   3399.2
+    asgi    predict only      7.8   2031.8   2706.9
+    asgi    + eda reports     7.3   2176.8   2987.4
+
+/predict is CPU-bound (scoring + SHAP under the GIL), so on one core the
+ASGI server gains ~10% throughput and a lower tail, not a multiple; the
+gain comes from request parsing and I/O leaving the worker threads.
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+import subprocess
+
+import numpy as np
+import requests
+
+APPLICANT = {
+    "LOAN": 15000, "MORTDUE": 60000, "VALUE": 100000, "YOJ": 10,
+    "DEROG": 0, "DELINQ": 0, "CLAGE": 250, "NINQ": 0, "CLNO": 25,
+    "DEBTINC": 25.5, "JOB": "Office", "REASON": "DebtCon"
+}
+
+SERVERS = {
+    "flask": [sys.executable, "-c", "import app; app.app.run(port={port}, threaded=True)"],
+    "asgi": [sys.executable, "-m", "uvicorn", "app_asgi:app", "--port", "{port}", "--log-level", "warning"],
+}
+
+
+def start_server(name, port):
+    cmd = [part.format(port=port) for part in SERVERS[name]]
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"{base_url}/api/model-status", timeout=1).status_code == 200:
+                return proc, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    proc.kill()
+    raise RuntimeError(f"{name} server did not become ready")
+
+
+def load_test(base_url, clients, requests_per_client, path="/predict"):
+    latencies = [[] for _ in range(clients)]
+    failures = [0]
+    barrier = threading.Barrier(clients)
+
+    def client(i):
+        session = requests.Session()
+        barrier.wait()
+        for _ in range(requests_per_client):
+            start = time.perf_counter()
+            r = session.post(f"{base_url}{path}", json=APPLICANT)
+            latencies[i].append((time.perf_counter() - start) * 1000)
+            if r.status_code != 200:
+                failures[0] += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return np.concatenate(latencies), clients * requests_per_client / elapsed, failures[0]
+
+
+def background_reports(base_url, stop):
+    session = requests.Session()
+    while not stop.is_set():
+        try:
+            session.get(f"{base_url}/api/eda-report")
+        except requests.RequestException:
+            return
+
+
+def main(clients, requests_per_client, port):
+    print(f"\n {clients} clients x {requests_per_client} /predict calls")
+    print(f"{'server':>7} | {'scenario':>14} | {'req/s':>7} | {'p50 ms':>8} | {'p99 ms':>8} | {'errors':>6}")
+    for name in SERVERS:
+        proc, base_url = start_server(name, port)
+        try:
+            load_test(base_url, 2, 5)  # warm-up
+            for scenario in ("predict only", "+ eda reports"):
+                stop = threading.Event()
+                if scenario != "predict only":
+                    threading.Thread(target=background_reports, args=(base_url, stop), daemon=True).start()
+                lat, throughput, errors = load_test(base_url, clients, requests_per_client)
+                stop.set()
+                print(f"{name:>7} | {scenario:>14} | {throughput:7.1f} | {np.percentile(lat, 50):8.1f} | "
+                      f"{np.percentile(lat, 99):8.1f} | {errors:6d}")
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=30)
+    parser.add_argument("--port", type=int, default=int(os.environ.get("BENCH_PORT", 5099)))
+    args = parser.parse_args()
+    main(args.clients, args.requests, args.port)
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: SHAP reason codes with the explainer rebuilt on every request
+(old behaviour) vs the cached per-model explainer.
+
+Run from the project directory:
+    python -m benchmarks.shap_cache_benchmark --requests 200
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from services.inference import load_latest_model, build_model_input, WARMUP_RECORD
+from explainability.shap_explainer import get_shap_explanation, clear_explainer_cache
+
+
+def timed_requests(pipeline, input_df, n, cached):
+    latencies = []
+    for _ in range(n):
+        if not cached:
+            clear_explainer_cache()
+        start = time.perf_counter()
+        get_shap_explanation(pipeline, input_df)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.array(latencies)
+
+
+def main(n):
+    pipeline = load_latest_model()
+    input_df = build_model_input([WARMUP_RECORD], pipeline)
+    print(f" [*] Model step: {type(pipeline.named_steps['model']).__name__}")
+
+    # 1. Explainer rebuilt per request
+    uncached = timed_requests(pipeline, input_df, n, cached=False)
+
+    # 2. Cached explainer (first call builds it)
+    clear_explainer_cache()
+    get_shap_explanation(pipeline, input_df)
+    cached = timed_requests(pipeline, input_df, n, cached=True)
+
+    for name, lat in [("rebuild per request", uncached), ("cached explainer", cached)]:
+        print(f"{name:>20}: p50 {np.percentile(lat, 50):8.2f} ms | p99 {np.percentile(lat, 99):8.2f} ms")
+    saving = np.median(uncached) - np.median(cached)
+    print(f" [*] Median saving per request: {saving:.2f} ms ({np.median(uncached) / np.median(cached):.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    main(args.requests)
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+Content-addressed cache of the training split and its engineered features.
+
+Each entry lives under <cache dir>/<key>/, where key is a hash of:
+    - the source data (file bytes for the CSV, row hashes for the database),
+    - the feature code version (source of the loader / feature modules),
+    - the split parameters (test_size, random_state).
+Editing hmeq.csv or the feature code therefore selects a new entry; stale
+entries are pruned oldest-first. An entry holds raw and engineered X/y for
+train and test as Parquet plus the CreditFeatureTransformer fitted on the
+training split, so a cached run behaves exactly like a fresh one: no
+statistics are ever learned on the test rows.
+
+    python -m data.feature_cache            # build / show the current entry
+    python -m data.feature_cache --clear
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import argparse
+from datetime import datetime
+
+import joblib
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+import data.load_data as load_data_module
+import features.feature_pipeline as feature_module
+import features.schema as schema_module
+from data.load_data import load_credit_data, CSV_PATH
+from features.feature_pipeline import CreditFeatureTransformer, record_training_mean, split_target
+
+FEATURE_CACHE_DIR = os.getenv("FEATURE_CACHE_DIR", "data/processed/feature_cache")
+FEATURE_CACHE_ENTRIES = 5
+# Bump to invalidate every entry when the on-disk layout changes
+CACHE_FORMAT = 1
+FRAMES = ("X_train", "X_test", "Xf_train", "Xf_test", "y_train", "y_test")
+
+
+def feature_code_version():
+    """Hash of the code that turns the source into X/y; any edit invalidates the cache."""
+    digest = hashlib.blake2b(str(CACHE_FORMAT).encode(), digest_size=8)
+    for module in (load_data_module, schema_module, feature_module):
+        with open(module.__file__, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def file_fingerprint(path, cache_dir=FEATURE_CACHE_DIR):
+    """
+    blake2b of the file contents. The digest is remembered against
+    (size, mtime) in <cache dir>/sources.json so an unchanged multi-GB
+    source is not re-read on every run.
+    """
+    stat = os.stat(path)
+    index_path = os.path.join(cache_dir, "sources.json")
+    index = {}
+    if os.path.exists(index_path):
+        with open(index_path) as f:
+            index = json.load(f)
+    known = index.get(os.path.abspath(path))
+    if known and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+        return known["digest"]
+
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    index[os.path.abspath(path)] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "digest": digest.hexdigest()}
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(index_path + ".tmp", "w") as f:
+        json.dump(index, f, indent=2)
+    os.replace(index_path + ".tmp", index_path)
+    return digest.hexdigest()
+
+
+def frame_fingerprint(df):
+    """Order-sensitive hash of every row and the column names (for non-file sources)."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(",".join(map(str, df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+class TrainingSplit:
+    """
+    Raw and engineered train/test data plus the fitted feature step.
+    X_* are raw inputs (as split_target returns them), Xf_* their
+    engineered view, `features` the CreditFeatureTransformer fitted on
+    X_train.
+    """
+
+    def __init__(self, frames, features, key=None, from_cache=False):
+        for name in FRAMES:
+            setattr(self, name, frames[name])
+        self.features = features
+        self.key = key
+        self.from_cache = from_cache
+
+    def fit(self, pipeline):
+        """
+        Fits a (features, preprocessing, model) Pipeline without re-running
+        feature engineering: the cached fitted transformer becomes the
+        first step and the remaining steps are fitted on Xf_train.
+        """
+        pipeline.steps[0] = (pipeline.steps[0][0], self.features)
+        pipeline[1:].fit(self.Xf_train, self.y_train)
+        if "preprocessing" in pipeline.named_steps:
+            preprocessor = pipeline.named_steps["preprocessing"]
+            record_training_mean(preprocessor, preprocessor.transform(self.Xf_train))
+        return pipeline
+
+    def predict_test(self, pipeline):
+        """Hold-out PDs from the cached engineered test features."""
+        return pipeline[1:].predict_proba(self.Xf_test)[:, 1]
+
+
+def build_split(df, test_size=0.3, random_state=42):
+    # Raw inputs: imputation/clipping stats are fitted on X_train only
+    X, y = split_target(df)
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, stratify=y, test_size=test_size, random_state=random_state
+    )
+    features = CreditFeatureTransformer().fit(X_train, y_train)
+    frames = {
+        "X_train": X_train, "X_test": X_test,
+        "Xf_train": features.transform(X_train), "Xf_test": features.transform(X_test),
+        "y_train": y_train, "y_test": y_test
+    }
+    return frames, features
+
+
+def _write_entry(entry_dir, frames, features, manifest):
+    tmp_dir = f"{entry_dir}.tmp-{os.getpid()}"
+    os.makedirs(tmp_dir, exist_ok=True)
+    for name, frame in frames.items():
+        frame = frame.to_frame() if isinstance(frame, pd.Series) else frame
+        frame.to_parquet(os.path.join(tmp_dir, f"{name}.parquet"))
+    joblib.dump(features, os.path.join(tmp_dir, "features.pkl"))
+    with open(os.path.join(tmp_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    try:
+        # Publish the whole entry at once; a concurrent writer may have won the race
+        os.rename(tmp_dir, entry_dir)
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _read_entry(entry_dir):
+    frames = {}
+    for name in FRAMES:
+        frame = pd.read_parquet(os.path.join(entry_dir, f"{name}.parquet"))
+        frames[name] = frame.iloc[:, 0] if name.startswith("y_") else frame
+    return frames, joblib.load(os.path.join(entry_dir, "features.pkl"))
+
+
+def prune_cache(cache_dir=FEATURE_CACHE_DIR, keep=FEATURE_CACHE_ENTRIES):
+    """Removes all but the `keep` most recently used entries."""
+    if not os.path.isdir(cache_dir):
+        return
+    entries = [os.path.join(cache_dir, d) for d in os.listdir(cache_dir)
+               if os.path.isfile(os.path.join(cache_dir, d, "manifest.json"))]
+    entries.sort(key=os.path.getmtime, reverse=True)
+    for entry_dir in entries[keep:]:
+        shutil.rmtree(entry_dir, ignore_errors=True)
+
+
+def load_training_split(source='csv', test_size=0.3, random_state=42, cache_dir=FEATURE_CACHE_DIR, use_cache=True):
+    """
+    Drop-in for `load_credit_data` + split + feature fit in the trainers.
+    For the CSV source a cache hit never parses the file; for the database
+    the rows are still fetched (to fingerprint them) but not re-engineered.
+    """
+    if not use_cache:
+        frames, features = build_split(load_credit_data(source), test_size, random_state)
+        return TrainingSplit(frames, features)
+
+    df = None
+    if source == 'csv':
+        source_id = file_fingerprint(CSV_PATH, cache_dir)
+    else:
+        df = load_credit_data(source)
+        source_id = frame_fingerprint(df)
+    key_parts = {"source": source_id, "code": feature_code_version(),
+                 "test_size": test_size, "random_state": random_state}
+    key = hashlib.blake2b(json.dumps(key_parts, sort_keys=True).encode(), digest_size=10).hexdigest()
+    entry_dir = os.path.join(cache_dir, key)
+
+    if os.path.isfile(os.path.join(entry_dir, "manifest.json")):
+        try:
+            frames, features = _read_entry(entry_dir)
+            os.utime(entry_dir)
+            print(f" [*] Feature cache hit: {entry_dir}")
+            return TrainingSplit(frames, features, key, from_cache=True)
+        except Exception as e:
+            print(f" [!] Feature cache entry unreadable, rebuilding: {e}")
+            shutil.rmtree(entry_dir, ignore_errors=True)
+
+    if df is None:
+        df = load_credit_data(source)
+    frames, features = build_split(df, test_size, random_state)
+    manifest = dict(key_parts, key=key, source_type=source, rows=int(len(df)),
+                    created_at=datetime.now().isoformat(timespec="seconds"))
+    _write_entry(entry_dir, frames, features, manifest)
+    prune_cache(cache_dir)
+    print(f" [*] Feature cache miss: engineered {len(df)} rows -> {entry_dir}")
+    return TrainingSplit(frames, features, key)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Training feature cache")
+    parser.add_argument("--source", default="csv", choices=["csv", "mysql"])
+    parser.add_argument("--clear", action="store_true", help="delete every cache entry")
+    args = parser.parse_args()
+
+    if args.clear:
+        shutil.rmtree(FEATURE_CACHE_DIR, ignore_errors=True)
+        print(f" Cleared {FEATURE_CACHE_DIR}")
+    else:
+        split = load_training_split(args.source)
+        print(f" Entry {split.key}: {len(split.X_train)} train / {len(split.X_test)} test rows, "
+              f"{split.Xf_train.shape[1]} engineered columns")
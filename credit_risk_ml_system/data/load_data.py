@@ -8,43 +8,32 @@ Created on Sun Jan 18 13:36:23 2025
 
 import pandas as pd
 import os
-from sqlalchemy import create_mock_engine, create_engine
+
+CSV_PATH = "data/raw/hmeq.csv"
 
 def load_credit_data(source='csv'):
     """
     Loads credit data from MySQL or a local CSV file.
     
     Args:
-        source (str): 'mysql' or 'csv'
+        source (str): 'mysql' (any SQLAlchemy URL, see data/sql_loader.py) or 'csv'
     """
     if source == 'mysql':
+        # Pooled, chunked read of hmeq_data (URL from CREDIT_DB_URL / config.yaml `database`)
+        from data.sql_loader import read_table, load_database_config
         try:
-            # Database credentials (Update these for your Windows MySQL setup)
-            USER = "root"
-            PASSWORD = ""
-            HOST = "localhost"
-            PORT = "3306"
-            DB_NAME = "credit_risk_db"
-            
-            connection_str = f"mysql+pymysql://{USER}:{PASSWORD}@{HOST}:{PORT}/{DB_NAME}"
-            engine = create_engine(connection_str)
-            
-            print(f"🗄️ Querying data from MySQL: {DB_NAME}...")
-            query = "SELECT * FROM hmeq_data"
-            df = pd.read_sql(query, engine)
-            
-            if 'id' in df.columns:
-                df = df.drop(columns=['id'])
-                
+            print("🗄️ Querying data from the database (hmeq_data)...")
+            df = read_table()
             print(f" Successfully loaded {len(df)} records from Database.")
             return df
-            
         except Exception as e:
-            print(f"  MySQL Error: {e}. Falling back to CSV...")
+            if not load_database_config().get("fallback_to_csv"):
+                raise
+            print(f" [!] Database error: {e}. Falling back to CSV (database.fallback_to_csv)...")
             source = 'csv'
 
     if source == 'csv':
-        csv_path = "data/raw/hmeq.csv"
+        csv_path = CSV_PATH
         if os.path.exists(csv_path):
             print(f"📄 Loading data from local file: {csv_path}")
             df = pd.read_csv(csv_path)
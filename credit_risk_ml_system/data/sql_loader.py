@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming reader for the hmeq_data table.
+
+One pooled engine per database URL (per process) and server-side cursors:
+rows arrive in `chunksize` batches already cast to compact dtypes (float32
+for the FLOAT columns, int8 target, categoricals for the text columns), so
+memory is bounded by one chunk. Column projection and WHERE / date-range
+filters are compiled into the SELECT and run by the database.
+
+The URL comes from the CREDIT_DB_URL environment variable, else the
+`database` section of config.yaml. For local runs a SQLite stand-in built
+from sql/load_data.sql behaves like the MySQL table:
+    python -m data.sql_loader --build-standin      # data/processed/hmeq.sqlite
+    CREDIT_DB_URL=sqlite:///data/processed/hmeq.sqlite python -m data.sql_loader --where "LOAN > 20000"
+"""
+
+import os
+import re
+import time
+import argparse
+
+import pandas as pd
+import sqlalchemy as sa
+import yaml
+
+CONFIG_PATH = "config.yaml"
+SCHEMA_PATH = "sql/load_data.sql"
+STANDIN_PATH = "data/processed/hmeq.sqlite"
+
+DATABASE_DEFAULTS = {
+    "url": "mysql+pymysql://root:@localhost:3306/credit_risk_db",
+    "table": "hmeq_data",
+    "chunksize": 50_000,
+    "pool_size": 5,
+    "max_overflow": 10,
+    "pool_recycle": 3600,
+    "connect_timeout": 10,
+    "fallback_to_csv": False
+}
+
+# Explicit dtypes of the hmeq_data columns (MySQL FLOAT is single precision)
+TABLE_DTYPES = {
+    "target": "int8",
+    "LOAN": "float32", "MORTDUE": "float32", "VALUE": "float32",
+    "REASON": "category", "JOB": "category",
+    "YOJ": "float32", "DEROG": "float32", "DELINQ": "float32", "CLAGE": "float32",
+    "NINQ": "float32", "CLNO": "float32", "DEBTINC": "float32"
+}
+DEFAULT_COLUMNS = list(TABLE_DTYPES)
+
+_engines = {}
+_tables = {}
+
+
+def load_database_config():
+    config = dict(DATABASE_DEFAULTS)
+    if os.path.exists(CONFIG_PATH):
+        with open(CONFIG_PATH, "r") as f:
+            config.update((yaml.safe_load(f) or {}).get("database") or {})
+    config["url"] = os.getenv("CREDIT_DB_URL", config["url"])
+    return config
+
+
+def get_engine(url=None, config=None):
+    """Process-wide pooled engine for `url` (created on first use, pre-pinged on checkout)."""
+    config = config or load_database_config()
+    url = url or config["url"]
+    if url not in _engines:
+        options = {"pool_pre_ping": True}
+        connect_args = {}
+        if not url.startswith("sqlite"):
+            options.update(pool_size=config["pool_size"], max_overflow=config["max_overflow"],
+                           pool_recycle=config["pool_recycle"])
+            # Fail fast instead of hanging on an unreachable server
+            connect_args["connect_timeout"] = config["connect_timeout"]
+        _engines[url] = sa.create_engine(url, connect_args=connect_args, **options)
+    return _engines[url]
+
+
+def dispose_engines():
+    """Call in a forked worker: drop the parent's pooled connections without closing them."""
+    for engine in _engines.values():
+        engine.dispose(close=False)
+
+
+def _reflect(engine, table, needed=()):
+    """Cached table metadata; reflected again if a requested column is missing (schema changed)."""
+    key = (str(engine.url), table)
+    if key not in _tables or any(c not in _tables[key].c for c in needed):
+        _tables[key] = sa.Table(table, sa.MetaData(), autoload_with=engine)
+    return _tables[key]
+
+
+def build_query(table, columns=None, where=None, date_column=None, start=None, end=None):
+    """
+    SELECT <columns> FROM table [WHERE ...]. `columns` are checked against
+    the reflected table; `where` is a SQL fragment with :named parameters;
+    the date range is [start, end) on `date_column`.
+    """
+    columns = columns or [c for c in DEFAULT_COLUMNS if c in table.c]
+    unknown = [c for c in columns if c not in table.c]
+    if unknown:
+        raise ValueError(f"Unknown columns for {table.name}: {unknown}")
+
+    query = sa.select(*[table.c[c] for c in columns])
+    if where:
+        query = query.where(sa.text(where))
+    if date_column is not None:
+        if date_column not in table.c:
+            raise ValueError(f"Unknown date column for {table.name}: {date_column}")
+        if start is not None:
+            query = query.where(table.c[date_column] >= start)
+        if end is not None:
+            query = query.where(table.c[date_column] < end)
+    elif start is not None or end is not None:
+        raise ValueError("start/end need a date_column")
+    return query
+
+
+def _cast(chunk, dtypes):
+    # Cast column by column; categoricals keep per-chunk levels (unioned in read_table)
+    for col, dtype in dtypes.items():
+        if col in chunk:
+            chunk[col] = chunk[col].astype(dtype)
+    return chunk
+
+
+def iter_chunks(columns=None, where=None, params=None, date_column=None, start=None, end=None,
+                chunksize=None, url=None, table=None, dtypes=None):
+    """
+    Streams the table as typed DataFrames of at most `chunksize` rows.
+    The connection is checked out of the pool for the duration of the
+    iteration and uses a server-side cursor (stream_results), so neither
+    the driver nor pandas buffers the full result.
+    """
+    config = load_database_config()
+    engine = get_engine(url, config)
+    table = _reflect(engine, table or config["table"], needed=list(columns or []) + ([date_column] if date_column else []))
+    chunksize = int(chunksize or config["chunksize"])
+    dtypes = dict(TABLE_DTYPES, **(dtypes or {}))
+    query = build_query(table, columns, where, date_column, start, end)
+
+    with engine.connect() as conn:
+        conn = conn.execution_options(stream_results=True, max_row_buffer=chunksize)
+        result = conn.execute(query, params or {})
+        names = list(result.keys())
+        while True:
+            rows = result.fetchmany(chunksize)
+            if not rows:
+                break
+            yield _cast(pd.DataFrame.from_records(rows, columns=names, coerce_float=True), dtypes)
+
+
+def read_table(**kwargs):
+    """iter_chunks() concatenated; category levels are unioned across chunks."""
+    chunks = list(iter_chunks(**kwargs))
+    if not chunks:
+        return pd.DataFrame(columns=kwargs.get("columns") or DEFAULT_COLUMNS)
+    for col in chunks[0].columns:
+        if isinstance(chunks[0][col].dtype, pd.CategoricalDtype):
+            levels = pd.api.types.union_categoricals([c[col] for c in chunks]).categories
+            for c in chunks:
+                c[col] = c[col].cat.set_categories(levels)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def create_sqlite_standin(db_path=STANDIN_PATH, csv_path="data/raw/hmeq.csv", schema_path=SCHEMA_PATH,
+                          chunksize=50_000):
+    """
+    Builds a SQLite copy of hmeq_data: the CREATE TABLE statement is taken
+    from sql/load_data.sql (MySQL-only syntax translated) and the CSV is
+    loaded in chunks with BAD renamed to target. Returns the SQLAlchemy URL.
+    """
+    with open(schema_path, "r") as f:
+        schema = re.sub(r"--[^\n]*", "", f.read())
+    ddl = re.search(r"CREATE TABLE[^;]*;", schema, flags=re.IGNORECASE | re.DOTALL).group(0)
+    ddl = re.sub(r"INT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY", "INTEGER PRIMARY KEY AUTOINCREMENT", ddl, flags=re.IGNORECASE)
+
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    url = f"sqlite:///{db_path}"
+    engine = sa.create_engine(url)
+    with engine.begin() as conn:
+        conn.exec_driver_sql(ddl)
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+            chunk.rename(columns={"BAD": "target"}).to_sql("hmeq_data", conn, if_exists="append", index=False)
+    engine.dispose()
+    return url
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream hmeq_data from the configured database")
+    parser.add_argument("--build-standin", action="store_true", help=f"create {STANDIN_PATH} from the CSV")
+    parser.add_argument("--columns", default=None, help="comma-separated projection")
+    parser.add_argument("--where", default=None, help="SQL filter, e.g. \"LOAN > 20000\"")
+    parser.add_argument("--chunksize", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.build_standin:
+        print(f" SQLite stand-in ready: {create_sqlite_standin()}")
+    else:
+        start = time.perf_counter()
+        rows, peak = 0, 0
+        columns = args.columns.split(",") if args.columns else None
+        for chunk in iter_chunks(columns=columns, where=args.where, chunksize=args.chunksize):
+            rows += len(chunk)
+            peak = max(peak, chunk.memory_usage(deep=True).sum())
+        print(f" Streamed {rows} rows in {time.perf_counter() - start:.2f}s "
+              f"(largest chunk {peak / 2**20:.2f} MB)")
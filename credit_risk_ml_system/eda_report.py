@@ -3,8 +3,12 @@ import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
+import io
+from matplotlib.figure import Figure
 from scipy import stats
 
+from features.feature_pipeline import add_ratio_features
+
 def generate_eda_report(source='csv'):
     """
     EDA Generator for HMEQ Credit Risk.
@@ -28,21 +32,8 @@ def generate_eda_report(source='csv'):
     print(" EDA for HMEQ Dataset...")
 
     # 2.  Feature Engineering (Ratios & Collateral)
-    # We use a copy for math to avoid modifying the original display strings
-    df_calc = df.copy()
-    
-    # Collateral = Property Value - Mortgage Balance
-    df_calc['COLLATERAL'] = df_calc['VALUE'] - df_calc['MORTDUE']
-    
-    # Loan-to-Collateral Ratio
-    # We use a small epsilon to avoid division by zero
-    df_calc['L_C_RATIO'] = df_calc['LOAN'] / (df_calc['COLLATERAL'].replace(0, np.nan))
-    
-    # Loan-to-Property Ratio (LTV)
-    df_calc['L_P_RATIO'] = df_calc['LOAN'] / (df_calc['VALUE'].replace(0, np.nan))
-    
-    # Collateral-to-Property Ratio
-    df_calc['C_P_RATIO'] = df_calc['COLLATERAL'] / (df_calc['VALUE'].replace(0, np.nan))
+    # Same vectorised ratios as training/serving; a copy keeps the raw columns for display
+    df_calc = add_ratio_features(df.copy())
 
     # 3. Categorical Encoding for Correlation Math
     df_numeric = df_calc.copy()
@@ -132,5 +123,34 @@ def generate_eda_report(source='csv'):
 
     print("  Exhaustive statistical report saved to reports/exhaustive_eda_summary.txt")
 
+def render_dashboard_png(df):
+    """
+    Renders the four-panel EDA dashboard served by /api/eda-report as PNG bytes.
+    Uses a standalone Figure (no pyplot state), so nothing leaks and renders
+    from different threads do not interfere.
+    """
+    df_calc = add_ratio_features(df.copy())
+    sns.set_style("whitegrid")
+
+    fig = Figure(figsize=(12, 10))
+    axes = fig.subplots(2, 2)
+    sns.countplot(x='BAD', data=df, ax=axes[0,0], palette='viridis')
+    axes[0,0].set_title('Target Distribution (BAD)')
+
+    sns.histplot(x='DEBTINC', hue='BAD', data=df, kde=True, ax=axes[0,1])
+    axes[0,1].set_title('Debt-to-Income Impact')
+
+    sns.boxplot(x='BAD', y='L_P_RATIO', data=df_calc, ax=axes[1,0])
+    axes[1,0].set_ylim(0, 1.5)
+    axes[1,0].set_title('LTV Ratio by Outcome')
+
+    corr = df.select_dtypes(include=[np.number]).corr()
+    sns.heatmap(corr[['BAD']].sort_values(by='BAD'), annot=True, cmap='RdYlGn', ax=axes[1,1])
+
+    fig.tight_layout()
+    img = io.BytesIO()
+    fig.savefig(img, format='png')
+    return img.getvalue()
+
 if __name__ == "__main__":
     generate_eda_report(source='csv')
\ No newline at end of file
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import time
+import json
+import uuid
+import atexit
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from explainability.shap_explainer import compute_shap_matrix, reason_codes_from_matrix
+
+
+class ExplanationStore:
+    """
+    Bounded, TTL-evicting ticket -> result map.
+    Oldest tickets are evicted first when max_items is reached; anything
+    older than ttl_seconds is treated as gone.
+    """
+
+    def __init__(self, max_items=10000, ttl_seconds=300.0):
+        self.max_items = max_items
+        self.ttl_seconds = ttl_seconds
+        self._items = OrderedDict()  # ticket -> (created, entry)
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    def put(self, ticket, entry):
+        now = time.monotonic()
+        with self._lock:
+            self._items[ticket] = (now, entry)
+            self._evict(now)
+
+    def update(self, ticket, entry):
+        """Stores a result only if the ticket has not been evicted meanwhile."""
+        with self._lock:
+            if ticket in self._items:
+                self._items[ticket] = (self._items[ticket][0], entry)
+
+    def get(self, ticket):
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            item = self._items.get(ticket)
+            return dict(item[1]) if item else None
+
+    def __contains__(self, ticket):
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            return ticket in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def _evict(self, now):
+        # Insertion order == creation order, so expired tickets sit at the front
+        while self._items:
+            ticket, (created, _) = next(iter(self._items.items()))
+            if len(self._items) <= self.max_items and now - created <= self.ttl_seconds:
+                break
+            del self._items[ticket]
+            self.evicted += 1
+
+
+class FileExplanationStore:
+    """
+    ExplanationStore shared by the pre-forked workers of one host: one JSON
+    file per ticket in `directory`, so whichever worker receives the poll
+    can answer it. Writes are atomic (tmp file + os.replace). get() checks
+    the exact TTL; the size/TTL sweep over the directory runs at most once
+    per sweep_interval per process and uses file mtimes.
+    """
+
+    TICKET_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+    def __init__(self, directory, max_items=10000, ttl_seconds=300.0, sweep_interval=1.0):
+        self.directory = directory
+        self.max_items = max_items
+        self.ttl_seconds = ttl_seconds
+        self.sweep_interval = sweep_interval
+        self._last_sweep = 0.0
+        self._lock = threading.Lock()
+        self.evicted = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def put(self, ticket, entry):
+        self._write(ticket, time.time(), entry)
+        self._maybe_sweep()
+
+    def update(self, ticket, entry):
+        """Stores a result only if the ticket has not been evicted meanwhile."""
+        item = self._read(ticket)
+        if item is not None and not self._expired(item):
+            self._write(ticket, item["created"], entry)
+
+    def get(self, ticket):
+        item = self._read(ticket)
+        if item is None:
+            return None
+        if self._expired(item):
+            self._remove(ticket)
+            return None
+        return dict(item["entry"])
+
+    def __contains__(self, ticket):
+        return self.get(ticket) is not None
+
+    def __len__(self):
+        return sum(1 for name in os.listdir(self.directory) if name.endswith(".json"))
+
+    def _path(self, ticket):
+        # Tickets come from the poll URL: only our own uuid4 hex names map to files
+        if not self.TICKET_PATTERN.fullmatch(ticket):
+            return None
+        return os.path.join(self.directory, f"{ticket}.json")
+
+    def _expired(self, item):
+        return time.time() - item["created"] > self.ttl_seconds
+
+    def _write(self, ticket, created, entry):
+        path = self._path(ticket)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"created": created, "entry": entry}, f)
+        os.replace(tmp_path, path)
+
+    def _read(self, ticket):
+        path = self._path(ticket)
+        if path is None:
+            return None
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _remove(self, ticket):
+        try:
+            os.remove(self._path(ticket))
+            self.evicted += 1
+        except FileNotFoundError:
+            pass  # another worker got there first
+
+    def _maybe_sweep(self):
+        now = time.time()
+        with self._lock:
+            if now - self._last_sweep < self.sweep_interval:
+                return
+            self._last_sweep = now
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(".json"):
+                    try:
+                        entries.append((entry.stat().st_mtime, entry.name[:-5]))
+                    except FileNotFoundError:
+                        continue
+        entries.sort()
+        excess = len(entries) - self.max_items
+        for i, (mtime, ticket) in enumerate(entries):
+            if i >= excess and now - mtime <= self.ttl_seconds:
+                break
+            self._remove(ticket)
+
+
+class DeferredExplainer:
+    """
+    Computes SHAP reason codes off the request path.
+
+    submit() returns a ticket immediately; a small thread pool computes the
+    reason codes and stores them in an ExplanationStore that the poll
+    endpoint reads with result(ticket). At most max_pending explanations
+    are queued or running (each holds its input frame): beyond that
+    submit() returns None and the caller explains synchronously.
+    store_dir: keep results in a FileExplanationStore there instead of in
+    process memory, so tickets survive a poll landing on another worker.
+    """
+
+    def __init__(self, max_workers=2, max_items=10000, ttl_seconds=300.0, max_pending=100, store_dir=None):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.store_dir = store_dir
+        self.store = self._make_store(max_items, ttl_seconds)
+        self._pending = threading.BoundedSemaphore(max_pending)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="explainer")
+        self.rejected = 0  # submits refused because max_pending was reached
+        self.skipped = 0   # tickets evicted before their turn came
+        atexit.register(self.shutdown)
+
+    def after_fork(self):
+        """Fresh pool and store in a pre-forked worker (threads do not survive fork)."""
+        self.store = self._make_store(self.store.max_items, self.store.ttl_seconds)
+        self._pending = threading.BoundedSemaphore(self.max_pending)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="explainer")
+
+    def _make_store(self, max_items, ttl_seconds):
+        if self.store_dir:
+            return FileExplanationStore(self.store_dir, max_items, ttl_seconds)
+        return ExplanationStore(max_items, ttl_seconds)
+
+    def submit(self, pipeline, input_df):
+        """Returns a ticket, or None when max_pending explanations are already queued."""
+        if not self._pending.acquire(blocking=False):
+            self.rejected += 1
+            return None
+        ticket = uuid.uuid4().hex
+        self.store.put(ticket, {"status": "pending", "explanation": None})
+        try:
+            self._executor.submit(self._run, ticket, pipeline, input_df)
+        except RuntimeError:
+            # Pool already shut down (interpreter exit)
+            self._pending.release()
+            raise
+        return ticket
+
+    def result(self, ticket):
+        """{"status": "pending"|"done"|"error", "explanation": ...} or None if unknown/expired."""
+        return self.store.get(ticket)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, ticket, pipeline, input_df):
+        try:
+            if ticket not in self.store:
+                # Evicted (TTL / store size) while queued: nobody can poll it any more
+                self.skipped += 1
+                return
+            # Explainer called directly so failures surface as status "error"
+            shap_matrix, display_names = compute_shap_matrix(pipeline, input_df.iloc[:1])
+            explanation = reason_codes_from_matrix(shap_matrix, display_names)[0]
+            self.store.update(ticket, {"status": "done", "explanation": explanation})
+        except Exception as e:
+            self.store.update(ticket, {"status": "error", "explanation": None, "error": str(e)})
+        finally:
+            self._pending.release()
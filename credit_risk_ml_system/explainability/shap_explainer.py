@@ -5,89 +5,206 @@ Created on Sun Jun 25 13:46:01 2025
 @author: mjayant
 """
 import shap
+import threading
+import weakref
 import pandas as pd
 import numpy as np
 from sklearn.linear_model import LogisticRegression
 from sklearn.ensemble import StackingClassifier, VotingClassifier
 
-def get_shap_explanation(pipeline, input_df):
+from explainability.ensemble_explainer import VotingEnsembleExplainer
+
+
+class ExplainerBundle:
+    """Everything per model that does not depend on the request."""
+
+    def __init__(self, preprocessor, explainer, kind, feature_names):
+        self.preprocessor = preprocessor
+        self.explainer = explainer
+        self.kind = kind  # "linear", "voting", "ensemble" or "tree"
+        self.feature_names = feature_names
+        # Pre-cleaned display names ("num__DEBTINC" -> "DEBTINC")
+        self.display_names = np.array([f.split("__")[-1] for f in feature_names], dtype=object)
+
+
+class ExplainerRegistry:
     """
-    Generates dynamic 'Reason Codes' for credit decisions using SHAP.
-    Optimized for Logistic Regression and Tree-based ensembles.
+    Caches one ExplainerBundle per loaded pipeline.
+
+    Keys are the pipeline objects themselves (weakly referenced), so a
+    hot-reloaded model gets a fresh explainer and the old one is released
+    together with the old pipeline. invalidate() clears entries explicitly.
     """
-    try:
-        # 1. Access the preprocessing and model stages
-        preprocessor = pipeline.named_steps['preprocessing']
-        model = pipeline.named_steps['model']
-        
-        # 2. Extract feature names after one-hot encoding
-        feature_names = preprocessor.get_feature_names_out()
-        
-        # 3. Transform input
-        X_transformed = preprocessor.transform(input_df)
-        
-        # 4. Handle Model Type Dynamically
-        if isinstance(model, LogisticRegression):
-            explainer = shap.LinearExplainer(model, X_transformed)
-            shap_values = explainer.shap_values(X_transformed)
-            # shap_values is usually (n_samples, n_features)
-            vals = shap_values[0]
-
-        elif hasattr(model, "estimators_"):
-            # Stacking/Ensemble: Explain the first base learner
-            base_learner = model.estimators_[0]
-            explainer = shap.TreeExplainer(base_learner)
-            shap_values = explainer.shap_values(X_transformed)
-            
-            # --- FIX FOR 52 vs 26 ERROR ---
-            if isinstance(shap_values, list):
-                # Binary class list [class_0, class_1] -> Select class 1
-                vals = shap_values[1][0]
-            elif len(shap_values.shape) == 3:
-                # Array with shape (samples, features, classes) -> Select class 1
-                vals = shap_values[0, :, 1]
-            else:
-                # Standard (samples, features)
-                vals = shap_values[0]
-        
-        else:
-            # Standard Tree model
-            explainer = shap.TreeExplainer(model)
-            shap_values = explainer.shap_values(X_transformed)
-            if isinstance(shap_values, list):
-                vals = shap_values[1][0]
+
+    def __init__(self):
+        self._bundles = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def get(self, pipeline):
+        bundle = self._bundles.get(pipeline)
+        if bundle is None:
+            with self._lock:
+                bundle = self._bundles.get(pipeline)
+                if bundle is None:
+                    bundle = build_explainer_bundle(pipeline)
+                    self._bundles[pipeline] = bundle
+        return bundle
+
+    def invalidate(self, pipeline=None):
+        with self._lock:
+            if pipeline is None:
+                self._bundles.clear()
             else:
-                vals = shap_values[0]
-
-        # 5. Final Dimensionality Safeguard
-        # If vals still has 52 elements for 26 features, take the second half (class 1)
-        if len(vals) == 2 * len(feature_names):
-            vals = vals[len(feature_names):]
-        # If it's still a 2D array, flatten it to 1D
-        if len(vals.shape) > 1:
-            vals = vals.flatten()
-            
-        # 6. Create a mapping of Feature -> Impact
-        feature_impacts = pd.Series(vals, index=feature_names)
-        
-        # 7. Extract Top 3 Impacting Features
-        top_positive = feature_impacts.sort_values(ascending=False).head(3)
-        top_negative = feature_impacts.sort_values(ascending=True).head(3)
-        
-        reasons = []
-        
-        # Risk Factors (Positive SHAP values increase probability of default)
-        pos_features = [f.split("__")[-1] for f in top_positive.index if top_positive[f] > 1e-9]
-        if pos_features:
-            reasons.append(f"Risk Factors: {', '.join(pos_features)}")
-            
-        # Mitigating Factors (Negative SHAP values decrease probability of default)
-        neg_features = [f.split("__")[-1] for f in top_negative.index if top_negative[f] < -1e-9]
-        if neg_features:
-            reasons.append(f"Mitigating Factors: {', '.join(neg_features)}")
-
-        return " | ".join(reasons) if reasons else "Broad risk distribution identified."
+                self._bundles.pop(pipeline, None)
+
+    def after_fork(self):
+        # A lock held by a parent thread at fork time would never be released
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._bundles)
+
+
+explainer_registry = ExplainerRegistry()
+
+
+def linear_background(preprocessor, n_features):
+    """
+    Request-independent background for linear explainers: the transformed
+    training mean (0 for scaled numerics, category frequency for one-hot
+    columns) recorded at fit time, so the explainer can be reused.
+    """
+    background = getattr(preprocessor, "training_mean_", None)
+    if background is None:
+        # Older artifacts: zeros are only the mean of the scaled numeric columns
+        print(" [!] Pipeline has no training_mean_; SHAP background falls back to zeros (retrain to fix)")
+        background = np.zeros(n_features)
+    return np.asarray(background, dtype=float)
+
+
+def build_explainer_bundle(pipeline):
+    """Builds the SHAP explainer and feature-name mapping for a pipeline (slow; cached)."""
+    # 1. Access the preprocessing and model stages
+    preprocessor = pipeline.named_steps['preprocessing']
+    model = pipeline.named_steps['model']
+
+    # 2. Extract feature names after one-hot encoding
+    feature_names = preprocessor.get_feature_names_out()
+
+    # 3. Handle Model Type Dynamically
+    if isinstance(model, LogisticRegression):
+        explainer = shap.LinearExplainer(model, linear_background(preprocessor, len(feature_names)).reshape(1, -1))
+        return ExplainerBundle(preprocessor, explainer, "linear", feature_names)
+
+    if isinstance(model, VotingClassifier) and model.voting == "soft":
+        # Every member explained and combined with the voting weights
+        background = None
+        if any(isinstance(m, LogisticRegression) for m in model.estimators_):
+            background = linear_background(preprocessor, len(feature_names))
+        explainer = VotingEnsembleExplainer(model, background=background)
+        return ExplainerBundle(preprocessor, explainer, "voting", feature_names)
+
+    if hasattr(model, "estimators_"):
+        # Stacking/Ensemble: Explain the first base learner
+        return ExplainerBundle(preprocessor, shap.TreeExplainer(model.estimators_[0]), "ensemble", feature_names)
+
+    # Standard Tree model
+    return ExplainerBundle(preprocessor, shap.TreeExplainer(model), "tree", feature_names)
+
 
+def clear_explainer_cache(pipeline=None):
+    """Drops cached explainers (all, or those of one pipeline), e.g. on model reload."""
+    explainer_registry.invalidate(pipeline)
+
+
+def refresh_explainer(old_pipeline, new_pipeline):
+    """ModelManager on_reload hook: drop the old explainer, build the new one off the request path."""
+    if old_pipeline is not None:
+        explainer_registry.invalidate(old_pipeline)
+    try:
+        explainer_registry.get(new_pipeline)
+    except Exception as e:
+        print(f" [!] SHAP explainer pre-build failed: {e}")
+
+
+def _positive_class_matrix(shap_values, n_features):
+    """Normalises explainer output to an (n_samples, n_features) class-1 matrix."""
+    if isinstance(shap_values, list):
+        # Binary class list [class_0, class_1] -> Select class 1
+        shap_values = shap_values[1]
+    shap_values = np.asarray(shap_values)
+
+    if shap_values.ndim == 3:
+        # Array with shape (samples, features, classes) -> Select class 1
+        shap_values = shap_values[:, :, 1]
+    if shap_values.ndim == 1:
+        shap_values = shap_values.reshape(1, -1)
+
+    # Final Dimensionality Safeguard
+    # If rows still hold 52 values for 26 features, take the second half (class 1)
+    if shap_values.shape[1] == 2 * n_features:
+        shap_values = shap_values[:, n_features:]
+    return shap_values
+
+
+def compute_shap_matrix(pipeline, input_df):
+    """SHAP values (n_samples, n_features) for a whole frame in one explainer call."""
+    bundle = explainer_registry.get(pipeline)
+    X_transformed = bundle.preprocessor.transform(input_df)
+    shap_values = bundle.explainer.shap_values(X_transformed)
+    return _positive_class_matrix(shap_values, len(bundle.feature_names)), bundle.display_names
+
+
+def reason_codes_from_matrix(shap_matrix, display_names, top_k=3, tol=1e-9):
+    """
+    Vectorised reason codes: top_k risk and mitigating factors per row.
+    argpartition selects the candidates over the whole matrix, only the
+    k selected values per row are sorted.
+    """
+    n_rows, n_features = shap_matrix.shape
+    k = min(top_k, n_features)
+    rows = np.arange(n_rows)[:, None]
+
+    # 1. Largest k (risk) and smallest k (mitigating) contributions per row
+    pos_idx = np.argpartition(-shap_matrix, k - 1, axis=1)[:, :k]
+    neg_idx = np.argpartition(shap_matrix, k - 1, axis=1)[:, :k]
+    pos_idx = np.take_along_axis(pos_idx, np.argsort(-shap_matrix[rows, pos_idx], axis=1, kind="stable"), axis=1)
+    neg_idx = np.take_along_axis(neg_idx, np.argsort(shap_matrix[rows, neg_idx], axis=1, kind="stable"), axis=1)
+
+    # 2. Index -> name lookup; tiny contributions are blanked out
+    pos_names = np.where(shap_matrix[rows, pos_idx] > tol, display_names[pos_idx], None)
+    neg_names = np.where(shap_matrix[rows, neg_idx] < -tol, display_names[neg_idx], None)
+
+    reasons = []
+    for pos, neg in zip(pos_names.tolist(), neg_names.tolist()):
+        parts = []
+        pos = [f for f in pos if f is not None]
+        neg = [f for f in neg if f is not None]
+        if pos:
+            parts.append(f"Risk Factors: {', '.join(pos)}")
+        if neg:
+            parts.append(f"Mitigating Factors: {', '.join(neg)}")
+        reasons.append(" | ".join(parts) if parts else "Broad risk distribution identified.")
+    return reasons
+
+
+def get_shap_explanations(pipeline, input_df, top_k=3):
+    """
+    Batch reason codes: one string per row of input_df, computed with a
+    single explainer call. Intended for batch scoring and re-scoring runs.
+    """
+    try:
+        shap_matrix, display_names = compute_shap_matrix(pipeline, input_df)
+        return reason_codes_from_matrix(shap_matrix, display_names, top_k)
     except Exception as e:
         print(f"SHAP Explainer Error: {str(e)}")
-        return "Reason codes unavailable for this model configuration."
\ No newline at end of file
+        return ["Reason codes unavailable for this model configuration."] * len(input_df)
+
+
+def get_shap_explanation(pipeline, input_df):
+    """
+    Generates dynamic 'Reason Codes' for credit decisions using SHAP.
+    Optimized for Logistic Regression and Tree-based ensembles.
+    The explainer is built once per model and reused across requests.
+    """
+    return get_shap_explanations(pipeline, input_df.iloc[:1])[0]
@@ -10,70 +10,233 @@ import numpy as np
 
 
 from sklearn.impute import SimpleImputer
+from sklearn.base import BaseEstimator, TransformerMixin
 
-def create_features(df):
+from features.schema import EXPECTED_SCHEMA
+
+RATIO_FEATURES = ["COLLATERAL", "L_P_RATIO", "L_C_RATIO", "C_P_RATIO"]
+FLAG_FEATURES = ["HIGH_DEBTINC_FLAG", "HAS_DEROG"]
+ENGINEERED_FEATURES = RATIO_FEATURES + FLAG_FEATURES
+
+# Model input columns (in training order) for the ColumnTransformer
+RAW_NUMERIC_FEATURES = [c for c, t in EXPECTED_SCHEMA.items() if t == "float64"]
+CATEGORICAL_FEATURES = [c for c, t in EXPECTED_SCHEMA.items() if t == "object"]
+NUMERIC_FEATURES = RAW_NUMERIC_FEATURES + ENGINEERED_FEATURES
+# Dtypes treated as categorical when a frame is split by column type
+CATEGORICAL_DTYPES = ["object", "category", "string"]
+
+
+def split_column_types(X):
+    """(numeric columns, categorical columns) of a frame, in column order."""
+    return list(X.select_dtypes(include="number").columns), list(X.select_dtypes(include=CATEGORICAL_DTYPES).columns)
+
+
+def _numeric(X, col):
+    """Column as a float64 array (None/missing -> NaN); works for 1 row or 1M rows."""
+    if col not in X:
+        return np.full(len(X), np.nan)
+    return pd.to_numeric(X[col], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def ratio_arrays(loan, value, mortdue):
     """
-    Advanced Feature Engineering for HMEQ Credit Risk.
-    Includes Ratio Analysis, Outlier Clipping, and Robust Imputation.
+    Single implementation of the HMEQ ratio features on float arrays.
+
+    Zero VALUE / MORTDUE are treated as missing (NaN) so denominators never
+    produce infinities; L_C_RATIO is clipped to [-10, 10]. Returns a dict
+    that also carries the cleaned VALUE and MORTDUE columns.
+    """
+    # Handle zeros in denominators to avoid infinity
+    value = np.where(value == 0, np.nan, value)
+    mortdue = np.where(mortdue == 0, np.nan, mortdue)
+
+    # Collateral: The equity buffer in the home
+    collateral = value - mortdue
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Loan-to-Property (LTV): Core industry risk metric
+        l_p_ratio = loan / value
+        # Loan-to-Collateral: clipped because collateral can be near zero or negative
+        l_c_ratio = np.clip(loan / collateral, -10, 10)
+        # Collateral-to-Property: 'Skin in the game' ratio
+        c_p_ratio = collateral / value
+
+    return {
+        "VALUE": value,
+        "MORTDUE": mortdue,
+        "COLLATERAL": collateral,
+        "L_P_RATIO": l_p_ratio,
+        "L_C_RATIO": l_c_ratio,
+        "C_P_RATIO": c_p_ratio
+    }
+
+
+def flag_arrays(debtinc, derog):
+    """High debt-to-income and derogatory-history flags (NaN counts as 0)."""
+    return {
+        "HIGH_DEBTINC_FLAG": (debtinc > 45).astype(int),
+        "HAS_DEROG": (derog > 0).astype(int)
+    }
+
+
+def add_ratio_features(X):
+    """
+    Adds the ratio features to X (shared by training, serving and EDA).
+    Operates on whole columns with NumPy; returns X for chaining.
+    """
+    ratios = ratio_arrays(_numeric(X, "LOAN"), _numeric(X, "VALUE"), _numeric(X, "MORTDUE"))
+    for col, values in ratios.items():
+        X[col] = values
+    return X
+
+
+def add_flag_features(X):
+    """Adds HIGH_DEBTINC_FLAG / HAS_DEROG to X; returns X for chaining."""
+    for col, values in flag_arrays(_numeric(X, "DEBTINC"), _numeric(X, "DEROG")).items():
+        X[col] = values
+    return X
+
+
+def engineer_features(X):
+    """Ratios + flags in one call; used on the serving path."""
+    return add_flag_features(add_ratio_features(X))
+
+
+def record_training_mean(preprocessor, Xt_train):
+    """
+    Stores the column means of the transformed training matrix on the fitted
+    preprocessing step (pickled with the artifact). Scaled numeric columns
+    average 0, one-hot columns average their category frequency; linear
+    SHAP explanations use this vector as their background.
+    """
+    preprocessor.training_mean_ = np.asarray(Xt_train.mean(axis=0), dtype=np.float64).ravel()
+    return preprocessor
+
+
+def _lerp(a, b, t):
+    """Linear interpolation exactly as numpy/pandas quantile(method='linear') does it."""
+    diff = b - a
+    return np.where(t >= 0.5, b - diff * (1 - t), a + diff * t)
+
+
+def fit_imputation_stats(values, clip_quantile=0.99):
+    """
+    Median and post-imputation upper clip value for every column of a 2D
+    float array, from a single column-wise sort.
+
+    Equivalent to the original per-column loop
+        median = col.median(); col = col.fillna(median); upper = col.quantile(q)
+    but without filling or re-scanning: the quantile of the filled column is
+    read off the sorted observed values with the k filled medians spliced in.
+    """
+    n_rows = values.shape[0]
+    ordered = np.sort(values, axis=0)               # NaNs sort to the end
+    n_obs = n_rows - np.isnan(values).sum(axis=0)
+    cols = np.arange(values.shape[1])
+
+    def take(idx):
+        return ordered[np.clip(idx, 0, n_rows - 1), cols]
+
+    # Median of observed values (mean of the two middle elements, as np.median)
+    medians = (take((n_obs - 1) // 2) + take(n_obs // 2)) / 2
+    medians = np.where(n_obs > 0, medians, np.nan)
+
+    # Filled column = observed values + (n_rows - n_obs) copies of the median
+    n_missing = n_rows - n_obs
+    n_below = (ordered < medians).sum(axis=0)
+
+    def filled_at(i):
+        obs_idx = np.where(i < n_below, i, i - n_missing)
+        is_median = (i >= n_below) & (i < n_below + n_missing)
+        return np.where(is_median, medians, take(obs_idx))
+
+    pos = clip_quantile * (n_rows - 1)
+    lo = int(np.floor(pos))
+    hi = min(lo + 1, n_rows - 1)
+    lo_idx = np.full(len(cols), lo)
+    hi_idx = np.full(len(cols), hi)
+    upper = _lerp(filled_at(lo_idx), filled_at(hi_idx), pos - lo)
+    return medians, upper
+
+
+class CreditFeatureTransformer(BaseEstimator, TransformerMixin):
     """
+    Stateful version of create_features for use as the first Pipeline step.
+
+    fit() learns each numeric column's median and 99th-percentile clip value
+    in one vectorised pass; transform() re-applies them in O(rows x cols)
+    without re-aggregating, so serving reproduces training imputation exactly.
+    The fitted statistics are pickled with the pipeline artifact.
+    """
+
+    def __init__(self, clip_quantile=0.99):
+        self.clip_quantile = clip_quantile
+
+    def fit(self, X, y=None):
+        X = add_ratio_features(X.copy())
+        self.numeric_columns_, self.categorical_columns_ = split_column_types(X)
+        self.output_columns_ = list(X.columns) + [f for f in FLAG_FEATURES if f not in X]
+
+        values = X[self.numeric_columns_].to_numpy(dtype=np.float64)
+        self.medians_, self.clip_upper_ = fit_imputation_stats(values, self.clip_quantile)
+        return self
+
+    def transform(self, X):
+        # Work on plain arrays and build the output frame once: per-column
+        # DataFrame assignment would dominate the cost of a single-row request
+        columns = {col: _numeric(X, col) for col in self.numeric_columns_ if col not in RATIO_FEATURES}
+        columns.update(ratio_arrays(columns["LOAN"], columns["VALUE"], columns["MORTDUE"]))
+
+        # 1. Median imputation + 99th percentile clipping with the fitted stats
+        # (one contiguous row per feature, statistics broadcast down the rows)
+        values = np.stack([columns[col] for col in self.numeric_columns_])
+        medians, upper = self.medians_[:, None], self.clip_upper_[:, None]
+        np.copyto(values, np.broadcast_to(medians, values.shape), where=np.isnan(values))
+        np.minimum(values, upper, out=values, where=~np.isnan(upper))
+        columns = dict(zip(self.numeric_columns_, values))
+
+        # 2. Categorical features with an explicit "Unknown" level for missing values
+        for col in self.categorical_columns_:
+            cat = pd.Categorical(X[col] if col in X else np.full(len(X), None, dtype=object))
+            if "Unknown" not in cat.categories:
+                cat = cat.add_categories("Unknown")
+            columns[col] = cat.fillna("Unknown")
+
+        # 3. Flags are derived from the imputed values
+        columns.update(flag_arrays(columns["DEBTINC"], columns["DEROG"]))
+
+        return pd.DataFrame({col: columns[col] for col in self.output_columns_}, index=X.index)
+
+    def feature_stats(self):
+        """Fitted statistics as a plain dict (for logging/inspection)."""
+        return {
+            col: {"median": float(m), "clip_upper": float(u)}
+            for col, m, u in zip(self.numeric_columns_, self.medians_, self.clip_upper_)
+        }
+
+
+def split_target(df):
+    """Standardises the target name and returns raw (X, y)."""
     df = df.copy() # deep copy
-    
-    # 1. Standardize Target
     if 'BAD' in df.columns:
         df = df.rename(columns={'BAD': 'target'})
-    
-    y = df["target"]
-    X = df.drop(columns=["target"])
+    return df.drop(columns=["target"]), df["target"]
 
-    # 2. Advanced Ratio Engineering (Requested Features)
-    # Handle zeros in denominators to avoid infinity
-    X['VALUE'] = X['VALUE'].replace(0, np.nan)
-    X['MORTDUE'] = X['MORTDUE'].replace(0, np.nan)
 
-    # Collateral: The equity buffer in the home
-    X['COLLATERAL'] = X['VALUE'] - X['MORTDUE']
-    
-    # Loan-to-Property (LTV): Core industry risk metric
-    X['L_P_RATIO'] = X['LOAN'] / X['VALUE']
-    
-    # Loan-to-Collateral: Risk relative to available equity
-    # We clip this because collateral can be near zero or negative
-    X['L_C_RATIO'] = (X['LOAN'] / X['COLLATERAL']).clip(-10, 10)
-    
-    # Collateral-to-Property: 'Skin in the game' ratio
-    X['C_P_RATIO'] = X['COLLATERAL'] / X['VALUE']
-
-    # 3. Handling Numerical Missing Values & Outliers
-    num_cols = X.select_dtypes(include=["int64", "float64"]).columns
-    
-    # Strategy: Median Imputation is more robust than mean for HMEQ
-    for col in num_cols:
-        # Fill missing values with median
-        median_val = X[col].median()
-        X[col] = X[col].fillna(median_val)
-        
-        # Outlier Clipping (99th percentile) to prevent extreme values from biasing the model
-        upper_limit = X[col].quantile(0.99)
-        X[col] = X[col].clip(upper=upper_limit)
-
-    # 4. Handling Categorical Features (REASON, JOB)
-    cat_cols = X.select_dtypes(include=["object", "category"]).columns
-    for col in cat_cols:
-        # Cast to category for memory efficiency
-        X[col] = X[col].astype('category')
-        
-        # Add a specific "Unknown" category for missing values
-        # This allows the model to learn if "Missing" itself is a risk signal
-        if "Unknown" not in X[col].cat.categories:
-            X[col] = X[col].cat.add_categories("Unknown")
-        X[col] = X[col].fillna("Unknown")
-
-    # 5. Financial Indicator Binning (Optional but helpful)
-    # Create a flag for people with high debt-to-income
-    X['HIGH_DEBTINC_FLAG'] = (X['DEBTINC'] > 45).astype(int)
-    
-    # Create a flag for derogatory history
-    X['HAS_DEROG'] = (X['DEROG'] > 0).astype(int)
+def create_features(df):
+    """
+    Advanced Feature Engineering for HMEQ Credit Risk.
+    Includes Ratio Analysis, Outlier Clipping, and Robust Imputation.
+
+    Fits a CreditFeatureTransformer on df and returns the engineered (X, y).
+    Trainers put the transformer inside their Pipeline instead, so the
+    statistics are learned on the training split and shipped with the model.
+    """
+    # 1. Standardize Target
+    X, y = split_target(df)
+
+    # 2-5. Ratios, median imputation, outlier clipping, categoricals and flags
+    X = CreditFeatureTransformer().fit_transform(X)
 
     print(f"✅ Feature Engineering Complete. Engineered {X.shape[1]} predictors.")
-    return X, y
\ No newline at end of file
+    return X, y
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""
+Pre-fork multi-worker serving of app.py:
+    gunicorn -c gunicorn.conf.py app:app
+
+With preload (default) the master imports the app and loads + warms the
+model once; workers are forked afterwards and share those memory pages
+copy-on-write (sklearn/XGBoost trees are only read while scoring).
+MODEL_MMAP_MODE=r additionally memory-maps the artifact snapshot, so
+independently started processes share the arrays joblib can map.
+
+With more than one worker, deferred explanation tickets
+(/predict?explain=async) are kept as files under EXPLAIN_STORE_DIR
+(default logs/explanations) so a poll can land on any worker.
+"""
+
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "127.0.0.1:5002")
+workers = int(os.environ.get("WEB_CONCURRENCY", 4))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") == "1"
+
+if workers > 1:
+    # Read by app.py at import time, i.e. before the workers are forked
+    os.environ.setdefault("EXPLAIN_STORE_DIR", "logs/explanations")
+timeout = 120
+
+
+def post_fork(server, worker):
+    if preload_app:
+        # Threads started in the master (model watcher, log writer) do not survive fork()
+        import app
+        app.restart_after_fork()
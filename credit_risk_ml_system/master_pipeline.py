@@ -3,13 +3,21 @@
 Created on Sun Jun 25 13:34:31 2025
 
 @author: mjayant
+
+    python master_pipeline.py                          # all model families in parallel (serves the best
+                                                       # Gini only if no model is served yet)
+    python master_pipeline.py --promote                # ... and replace the served model with the best Gini
+    python master_pipeline.py --families boosted,logistic --cpus 4
+    python master_pipeline.py --sequential             # original single-model run (XGBoost)
 """
 
 import os
 import sys
+import argparse
 from models.train_boosted import train_boosted_ensemble
 from models.train_voting import train_voting_ensemble
 from models.train_logistic import train_logistic_baseline
+from models.train_orchestrator import train_all, MODEL_FAMILIES, CHAMPION_PATH, CANDIDATE_DIR
 
 def setup():
     folders = [
@@ -22,11 +30,30 @@ def setup():
     print(" Project Structure Initialized.")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the credit risk models")
+    parser.add_argument("--families", default=",".join(MODEL_FAMILIES),
+                        help=f"comma-separated subset of {list(MODEL_FAMILIES)}")
+    parser.add_argument("--cpus", type=int, default=None, help="total CPU budget (default: all cores)")
+    parser.add_argument("--promote", action="store_true",
+                        help="replace an existing serving artifact (and drift baseline) with the best candidate")
+    parser.add_argument("--sequential", action="store_true", help="train only the boosted ensemble, in-process")
+    args = parser.parse_args()
+
     setup()
-    
-    #  Run the Boosted Ensemble by default (Highest Performance)
-    print("\n--- Training Production  (XGBoost) ---")
-    train_boosted_ensemble()
+
+    if args.sequential:
+        #  Run the Boosted Ensemble by default (Highest Performance)
+        print("\n--- Training Production  (XGBoost) ---")
+        train_boosted_ensemble()
+        served = CHAMPION_PATH
+    else:
+        # Featurize once, train every family concurrently, optionally promote the best Gini
+        print("\n--- Training all model families (parallel) ---")
+        families = [f.strip() for f in args.families.split(",") if f.strip()]
+        unknown = set(families) - set(MODEL_FAMILIES)
+        if unknown:
+            sys.exit(f" Unknown model families: {sorted(unknown)}")
+        served = train_all(families, cpus=args.cpus, promote=args.promote)["champion_path"]
     
     # You can also run others as needed:
     # print("\n--- Training Production  (Voting Ensemble) ---")    
@@ -34,4 +61,8 @@ if __name__ == "__main__":
     # print("\n--- Training Production  (Logistics) ---")
     # train_logistic_baseline()
     
-    print("\n System ready. Start the API with: python app.py")
+    if served:
+        print(f"\n System ready: serving {served}. Start the API with: python app.py")
+    else:
+        print(f"\n Candidates saved to {CANDIDATE_DIR}; the served model is unchanged. "
+              f"Run with --promote to replace it with the best candidate.")
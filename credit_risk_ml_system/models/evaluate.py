@@ -5,11 +5,18 @@ Created on Sun Jan 18 13:37:37 2025
 @author: mjayant
 """
 
+import numpy as np
 import pandas as pd
 import scipy.stats as stats
 from sklearn.metrics import roc_auc_score
 
-def get_credit_metrics(y_true, y_probs):
+from monitoring.quantile_sketch import KLLSketch, ks_sketches
+
+def get_credit_metrics(y_true, y_probs, sketch_k=None):
+    
+    # Bounded-memory variant: score distributions per class kept as sketches
+    if sketch_k:
+        return CreditMetricsSketch(sketch_k).update(y_true, y_probs).metrics()
     
     auc = roc_auc_score(y_true, y_probs)
     
@@ -36,4 +43,46 @@ def get_credit_metrics(y_true, y_probs):
         "AUC": float(auc),
         "Gini": float(gini),
         "KS_Statistic": float(ks)
-    }
\ No newline at end of file
+    }
+
+
+class CreditMetricsSketch:
+    """
+    AUC / Gini / KS from one KLL sketch per class, so scores can be streamed
+    in chunks and per-partition results merged. KS is within the sketches'
+    rank error (reported as KS_Error_Bound); AUC is integrated over the
+    retained items and carries a comparable error.
+    """
+
+    def __init__(self, k=200):
+        self.goods = KLLSketch(k)
+        self.bads = KLLSketch(k)
+
+    def update(self, y_true, y_probs):
+        y_true = np.asarray(y_true)
+        y_probs = np.asarray(y_probs, dtype=float)
+        self.goods.update(y_probs[y_true == 0])
+        self.bads.update(y_probs[y_true == 1])
+        return self
+
+    def merge(self, other):
+        self.goods.merge(other.goods)
+        self.bads.merge(other.bads)
+        return self
+
+    def metrics(self):
+        if self.goods.n == 0 or self.bads.n == 0:
+            raise ValueError("Credit metrics need scores of both classes")
+        # P(score_bad > score_good) + 0.5 * P(tie), weighted over the bads' retained items
+        items, cum = self.bads._weighted()
+        weights = np.diff(cum, prepend=0.0)
+        below = self.goods.cdf(np.nextafter(items, -np.inf))
+        at_or_below = self.goods.cdf(items)
+        auc = float(np.sum(weights * (below + at_or_below) / 2) / cum[-1])
+        ks, _, ks_error = ks_sketches(self.goods, self.bads)
+        return {
+            "AUC": auc,
+            "Gini": float(2 * auc - 1),
+            "KS_Statistic": float(ks),
+            "KS_Error_Bound": float(ks_error)
+        }
@@ -12,10 +12,12 @@ from mlflow.tracking import MlflowClient
 
 MODEL_NAME = "HMEQ_Risk_Estimation_Engine"
 
-def register_and_promote(run_id, current_gini, stage="Production"):
+def register_and_promote(run_id, current_gini, stage="Production", champion_gini=None):
     """
     Registers the model and promotes it to Production only if it 
     outperforms the current champion.
+    champion_gini: the champion's Gini on the challenger's evaluation data
+    (e.g. the retraining hold-out); default is the Gini logged by its run.
     """
     client = MlflowClient()
     model_uri = f"runs:/{run_id}/pd_model"
@@ -38,8 +40,9 @@ def register_and_promote(run_id, current_gini, stage="Production"):
         # 3. Champion vs Challenger logic
         champion_version = production_versions[0]
         # Fetch the Gini score of the current champion from its run
-        champion_run = client.get_run(champion_version.run_id)
-        champion_gini = float(champion_run.data.metrics.get("Gini", 0))
+        if champion_gini is None:
+            champion_run = client.get_run(champion_version.run_id)
+            champion_gini = float(champion_run.data.metrics.get("Gini", 0))
         
         print(f" Champion Gini: {champion_gini:.4f} | Challenger Gini: {current_gini:.4f}")
         
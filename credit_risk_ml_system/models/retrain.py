@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""
+Warm-start retraining from labelled production outcomes:
+    python -m models.retrain --outcomes data/outcomes/outcomes.csv
+    python -m models.retrain --outcomes outcomes.parquet --since 2026-09-01 --promote
+
+The outcomes file holds prediction_id plus the observed target (BAD or
+target): the ids returned by /predict and /predict/batch. They are joined
+to the prediction log, which already holds each applicant in the model's
+feature view. The serving pipeline's features and preprocessing steps stay
+frozen (the fitted model depends on them); only the model is updated:
+    RandomForest / GradientBoosting - warm_start, `add_trees` new trees
+    XGBoost                         - `add_rounds` rounds on top of the booster (xgb_model)
+    SGD and other partial_fit models- partial_fit
+    LogisticRegression              - warm-started refit on original + new rows (lbfgs has no partial_fit)
+    DecisionTree                    - kept as is
+Voting / Stacking ensembles are updated member by member. The newest
+`holdout_fraction` of the labelled rows (by prediction time) is the
+out-of-time hold-out on which candidate and current model are compared
+with get_credit_metrics; the candidate then goes to the registry.
+"""
+
+import os
+import json
+import time
+import shutil
+import argparse
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import joblib
+import mlflow
+from sklearn.ensemble import (
+    RandomForestClassifier, ExtraTreesClassifier, GradientBoostingClassifier,
+    VotingClassifier, StackingClassifier
+)
+from sklearn.linear_model import LogisticRegression
+from xgboost import XGBClassifier
+
+from features.feature_pipeline import NUMERIC_FEATURES, CATEGORICAL_FEATURES
+from models.evaluate import get_credit_metrics
+from models.registry import register_and_promote
+from models.train_orchestrator import CHAMPION_PATH, CANDIDATE_DIR, TRAINING_REPORTS_DIR
+from monitoring.prediction_store import PredictionLogStore
+
+LOG_STORE_DIR = "logs/predictions"
+MODEL_COLUMNS = NUMERIC_FEATURES + CATEGORICAL_FEATURES
+MIN_LABELLED_ROWS = 200
+ADD_TREES = 50
+ADD_ROUNDS = 50
+
+
+def load_outcomes(path):
+    """prediction_id + target from CSV / Parquet; the last label per id wins."""
+    outcomes = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+    if "BAD" in outcomes.columns:
+        outcomes = outcomes.rename(columns={"BAD": "target"})
+    missing = {"prediction_id", "target"} - set(outcomes.columns)
+    if missing:
+        raise ValueError(f"Outcomes file needs columns {sorted(missing)}")
+    outcomes = outcomes.dropna(subset=["prediction_id", "target"])
+    outcomes["prediction_id"] = outcomes["prediction_id"].astype(str)
+    outcomes["target"] = outcomes["target"].astype(int)
+    return outcomes.drop_duplicates("prediction_id", keep="last")[["prediction_id", "target"]]
+
+
+def join_outcomes(outcomes, store, start=None, end=None):
+    """Logged model inputs of every labelled prediction, one part file at a time."""
+    columns = MODEL_COLUMNS + ["prediction_id", "timestamp"]
+    joined = [frame.merge(outcomes, on="prediction_id", how="inner")
+              for frame in store.iter_frames(columns=columns, start=start, end=end)]
+    joined = [frame for frame in joined if len(frame)]
+    if not joined:
+        return pd.DataFrame(columns=columns + ["target"])
+    return pd.concat(joined, ignore_index=True).sort_values("timestamp", kind="stable").reset_index(drop=True)
+
+
+def out_of_time_split(labelled, holdout_fraction=0.3):
+    """Oldest rows update the model, newest rows evaluate it."""
+    if len(labelled) < MIN_LABELLED_ROWS:
+        raise ValueError(f"Only {len(labelled)} labelled predictions (need {MIN_LABELLED_ROWS})")
+    cut = int(round(len(labelled) * (1 - holdout_fraction)))
+    train, holdout = labelled.iloc[:cut], labelled.iloc[cut:]
+    for name, part in (("update", train), ("hold-out", holdout)):
+        if part["target"].nunique() < 2:
+            raise ValueError(f"The {name} rows contain a single class; wait for more outcomes")
+    return train, holdout
+
+
+def warm_start_update(estimator, Xt, y, replay=None, add_trees=ADD_TREES, add_rounds=ADD_ROUNDS, name="model"):
+    """
+    Updates a fitted estimator in place with new rows Xt / y.
+    replay: callable -> (Xt_ref, y_ref) with the original training rows,
+    only called for models that cannot be updated incrementally.
+    Returns {member name: action} for the report.
+    """
+    if isinstance(estimator, (VotingClassifier, StackingClassifier)):
+        # estimators_ are the fitted members used at predict time
+        actions = {}
+        for member_name, member in zip(estimator.named_estimators_, estimator.estimators_):
+            actions.update(warm_start_update(member, Xt, y, replay, add_trees, add_rounds,
+                                             f"{name}.{member_name}"))
+        if isinstance(estimator, StackingClassifier):
+            actions[f"{name}.final_estimator"] = "frozen"
+        return actions
+
+    if isinstance(estimator, XGBClassifier):
+        booster = estimator.get_booster()
+        before = booster.num_boosted_rounds()
+        estimator.set_params(n_estimators=add_rounds)
+        estimator.fit(Xt, y, xgb_model=booster)
+        return {name: f"xgb_model continuation: {before} -> {estimator.get_booster().num_boosted_rounds()} rounds"}
+
+    if isinstance(estimator, (RandomForestClassifier, ExtraTreesClassifier, GradientBoostingClassifier)):
+        before = estimator.n_estimators
+        estimator.set_params(warm_start=True, n_estimators=before + add_trees)
+        estimator.fit(Xt, y)
+        estimator.set_params(warm_start=False)
+        return {name: f"warm_start: {before} -> {estimator.n_estimators} trees"}
+
+    if isinstance(estimator, LogisticRegression):
+        Xt_ref, y_ref = replay()
+        estimator.set_params(warm_start=True)
+        estimator.fit(np.vstack([Xt_ref, Xt]), np.concatenate([y_ref, y]))
+        estimator.set_params(warm_start=False)
+        return {name: f"warm-started refit on {len(y_ref)} original + {len(y)} new rows"}
+
+    if hasattr(estimator, "partial_fit"):
+        # SGD keeps the dtype of its first fit (float32 for the streaming trainer)
+        coef = getattr(estimator, "coef_", None)
+        estimator.partial_fit(Xt if coef is None else np.asarray(Xt, dtype=coef.dtype), y)
+        return {name: f"partial_fit on {len(y)} rows"}
+
+    return {name: "frozen"}
+
+
+def _replay_rows(pipeline):
+    """Original training rows in the pipeline's model space (feature cache, no re-featurizing)."""
+    from data.feature_cache import load_training_split
+
+    data = load_training_split()
+    return pipeline.named_steps["preprocessing"].transform(data.Xf_train), data.y_train.to_numpy()
+
+
+def retrain_from_outcomes(outcomes_path, model_path=CHAMPION_PATH, log_root=LOG_STORE_DIR, since=None,
+                          holdout_fraction=0.3, add_trees=ADD_TREES, add_rounds=ADD_ROUNDS,
+                          register=True, promote=False):
+    """Runs one warm-start cycle and returns its report (also written to reports/training/)."""
+    started = datetime.now()
+    start = time.perf_counter()
+
+    # 1. Labelled outcomes joined to the logged model inputs
+    labelled = join_outcomes(load_outcomes(outcomes_path), PredictionLogStore(log_root), start=since)
+    train, holdout = out_of_time_split(labelled, holdout_fraction)
+    print(f" [*] {len(labelled)} labelled predictions: {len(train)} update rows, {len(holdout)} hold-out rows")
+
+    # 2. Candidate = a fresh copy of the current model, updated in place
+    champion = joblib.load(model_path)
+    candidate = joblib.load(model_path)
+    if "preprocessing" not in candidate.named_steps:
+        raise ValueError(f"{model_path} has no preprocessing step; retrain it with a current trainer")
+    update_start = time.perf_counter()
+    Xt = candidate.named_steps["preprocessing"].transform(train[MODEL_COLUMNS])
+    actions = warm_start_update(candidate.steps[-1][1], Xt, train["target"].to_numpy(),
+                                replay=lambda: _replay_rows(candidate), add_trees=add_trees, add_rounds=add_rounds)
+    update_seconds = time.perf_counter() - update_start
+
+    # 3. Both models on the same out-of-time hold-out (log rows are already in the feature view)
+    def holdout_metrics(pipeline):
+        model_part = pipeline[1:] if "features" in pipeline.named_steps else pipeline
+        return get_credit_metrics(holdout["target"], model_part.predict_proba(holdout[MODEL_COLUMNS])[:, 1])
+
+    metrics = holdout_metrics(candidate)
+    champion_metrics = holdout_metrics(champion)
+    print(f" [*] Hold-out Gini: candidate {metrics['Gini']:.4f} | current model {champion_metrics['Gini']:.4f}")
+
+    os.makedirs(CANDIDATE_DIR, exist_ok=True)
+    artifact = os.path.join(CANDIDATE_DIR, "warm_start.pkl")
+    joblib.dump(candidate, artifact)
+
+    # 4. Hand-off: MLflow run + registry (champion scored on the same hold-out)
+    mlflow.set_experiment("HMEQ_Warm_Start_Retraining")
+    with mlflow.start_run(run_name="Warm_Start_Retrain"):
+        mlflow.log_params({"update_rows": len(train), "holdout_rows": len(holdout),
+                           "add_trees": add_trees, "add_rounds": add_rounds, "base_model": model_path})
+        mlflow.log_metrics(metrics)
+        mlflow.log_metrics({f"champion_{k}": v for k, v in champion_metrics.items()})
+        mlflow.sklearn.log_model(candidate, "pd_model")
+        run_id = mlflow.active_run().info.run_id
+    if register:
+        register_and_promote(run_id, metrics["Gini"], champion_gini=champion_metrics["Gini"])
+
+    # 5. Optionally swap the serving artifact (hot-reloaded by the API)
+    promoted = promote and metrics["Gini"] > champion_metrics["Gini"]
+    if promoted:
+        shutil.copyfile(artifact, model_path + ".tmp")
+        os.replace(model_path + ".tmp", model_path)
+        print(f" [*] Candidate promoted to {model_path}")
+
+    report = {
+        "started_at": started.isoformat(timespec="seconds"),
+        "labelled_rows": len(labelled),
+        "update_rows": len(train),
+        "holdout_rows": len(holdout),
+        "updates": actions,
+        "update_seconds": round(update_seconds, 2),
+        "total_seconds": round(time.perf_counter() - start, 2),
+        "candidate_metrics": metrics,
+        "champion_metrics": champion_metrics,
+        "artifact": artifact,
+        "mlflow_run_id": run_id,
+        "promoted": promoted
+    }
+    os.makedirs(TRAINING_REPORTS_DIR, exist_ok=True)
+    report_path = os.path.join(TRAINING_REPORTS_DIR, f"retrain-{started:%Y%m%dT%H%M%S}.json")
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f" Warm-start retrain done in {report['total_seconds']}s (model update {report['update_seconds']}s) "
+          f"-> {report_path}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Warm-start retraining from labelled outcomes")
+    parser.add_argument("--outcomes", required=True, help="CSV/Parquet with prediction_id and BAD/target")
+    parser.add_argument("--model", default=CHAMPION_PATH, help="pipeline to update")
+    parser.add_argument("--since", default=None, help="only predictions logged from this date")
+    parser.add_argument("--holdout-fraction", type=float, default=0.3)
+    parser.add_argument("--add-trees", type=int, default=ADD_TREES)
+    parser.add_argument("--add-rounds", type=int, default=ADD_ROUNDS)
+    parser.add_argument("--no-register", action="store_true", help="skip the model registry hand-off")
+    parser.add_argument("--promote", action="store_true", help="replace the serving artifact if the candidate wins")
+    args = parser.parse_args()
+
+    retrain_from_outcomes(args.outcomes, args.model, since=args.since, holdout_fraction=args.holdout_fraction,
+                          add_trees=args.add_trees, add_rounds=args.add_rounds,
+                          register=not args.no_register, promote=args.promote)
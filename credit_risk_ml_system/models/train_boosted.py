@@ -7,7 +7,6 @@ Created on Sun Jul 25 13:16:15 2025
 
 import mlflow
 import joblib
-from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
@@ -16,48 +15,59 @@ from sklearn.ensemble import RandomForestClassifier, VotingClassifier
 from sklearn.tree import DecisionTreeClassifier
 from xgboost import XGBClassifier
 
-from data.load_data import load_credit_data
-from features.feature_pipeline import create_features
+from data.feature_cache import load_training_split
+from features.feature_pipeline import (
+    CreditFeatureTransformer, NUMERIC_FEATURES, CATEGORICAL_FEATURES
+)
 from models.evaluate import get_credit_metrics
+from monitoring.baseline_profile import write_baseline_profile
 
-def train_boosted_ensemble():
-    """Requirement  Decision Trees, Random Forest, XGBoost"""
-    df = load_credit_data()
-    X, y = create_features(df)
-    X_train, X_test, y_train, y_test = train_test_split(X, y, stratify=y, test_size=0.3, random_state=42)
-
-    preprocessor = ColumnTransformer([
-        ("num", StandardScaler(), X.select_dtypes(include=["number"]).columns),
-        ("cat", OneHotEncoder(handle_unknown="ignore"), X.select_dtypes(include=["object", "category"]).columns)
-    ])
-
+def build_boosted_model(n_jobs=None):
+    """Soft-voting Random Forest + XGBoost; n_jobs is split between the two members."""
     # Using XGBoost as the primary champion
     #xgb = XGBClassifier(n_estimators=100, learning_rate=0.05, use_label_encoder=False, eval_metric='logloss')
-    
-    model = VotingClassifier(
+    rf_jobs = max(1, n_jobs // 2) if n_jobs else None
+    xgb_jobs = max(1, n_jobs - rf_jobs) if n_jobs else None
+    return VotingClassifier(
         estimators=[
-            ("rf", RandomForestClassifier(n_estimators=200)),
+            ("rf", RandomForestClassifier(n_estimators=200, n_jobs=rf_jobs)),
             ("xgb", XGBClassifier(
                 eval_metric="logloss",
                 max_depth=4,
                 learning_rate=0.05,
-                n_estimators=300
+                n_estimators=300,
+                n_jobs=xgb_jobs
             ))
         ],
         voting="soft"
     )
+
+def train_boosted_ensemble():
+    """Requirement  Decision Trees, Random Forest, XGBoost"""
+    # Cached split + engineered features (rebuilt only when hmeq.csv or the feature code changes)
+    data = load_training_split()
+    X_train, y_test = data.X_train, data.y_test
+
+    preprocessor = ColumnTransformer([
+        ("num", StandardScaler(), NUMERIC_FEATURES),
+        ("cat", OneHotEncoder(handle_unknown="ignore"), CATEGORICAL_FEATURES)
+    ])
+
+    model = build_boosted_model()
     
-    pipeline = Pipeline([("preprocessing", preprocessor), ("model", model)])
+    pipeline = Pipeline([("features", CreditFeatureTransformer()), ("preprocessing", preprocessor), ("model", model)])
 
     mlflow.set_experiment("HMEQ_XGBoost_Voting_Experiment")
     with mlflow.start_run(run_name="XGBoost_Model"):
-        pipeline.fit(X_train, y_train)
-        probs = pipeline.predict_proba(X_test)[:, 1]
+        data.fit(pipeline)
+        probs = data.predict_test(pipeline)
         metrics = get_credit_metrics(y_test, probs)
         
         mlflow.log_metrics(metrics)
         mlflow.sklearn.log_model(pipeline, "xgb_model")
         joblib.dump(pipeline, "artifacts/credit_risk_pipeline.pkl")
+        # Drift baseline: feature buckets + holdout score distribution
+        write_baseline_profile(pipeline, X_train, probs)
         print(f" XGBoost Model Trained. Gini: {metrics['Gini']:.3f}")
 
 if __name__ == "__main__":
@@ -4,55 +4,59 @@ import os
 import mlflow
 import joblib
 import pandas as pd
-from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier, StackingClassifier
 from sklearn.linear_model import LogisticRegression
 
-from data.load_data import load_credit_data
-from features.feature_pipeline import create_features
+from data.feature_cache import load_training_split
+from features.feature_pipeline import (
+    CreditFeatureTransformer, NUMERIC_FEATURES, CATEGORICAL_FEATURES
+)
 from models.evaluate import get_credit_metrics
+from monitoring.baseline_profile import write_baseline_profile
 
-def train_model():
-    df = load_credit_data()
-    X, y = create_features(df)
-
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, stratify=y, test_size=0.3, random_state=42
-    )
-
-    num_cols = X.select_dtypes(include=["int64", "float64"]).columns
-    cat_cols = X.select_dtypes(include=["object", "category"]).columns
-
-    preprocessor = ColumnTransformer([
-        ("num", StandardScaler(), num_cols),
-        ("cat", OneHotEncoder(handle_unknown="ignore"), cat_cols)
-    ])
-
+def build_stacking_model(n_jobs=None):
     # Industry Best Practice: Stacking complex models into a simple Baseline (Meta-Learner)
     base_learners = [
-        ('rf', RandomForestClassifier(n_estimators=100, random_state=42)),
+        ('rf', RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=n_jobs)),
         ('gb', GradientBoostingClassifier(random_state=42))
     ]
     
     # Meta-Learner: Logistic Regression for probability calibration
-    stack_model = StackingClassifier(
+    return StackingClassifier(
         estimators=base_learners,
         final_estimator=LogisticRegression(),
-        cv=5
+        cv=5,
+        n_jobs=n_jobs
     )
 
+def train_model():
+    # Cached split + engineered features (rebuilt only when hmeq.csv or the feature code changes)
+    data = load_training_split()
+    X_train, y_test = data.X_train, data.y_test
+
+    num_cols = NUMERIC_FEATURES
+    cat_cols = CATEGORICAL_FEATURES
+
+    preprocessor = ColumnTransformer([
+        ("num", StandardScaler(), num_cols),
+        ("cat", OneHotEncoder(handle_unknown="ignore"), cat_cols)
+    ])
+
+    stack_model = build_stacking_model()
+
     pipeline = Pipeline([
+        ("features", CreditFeatureTransformer()),
         ("preprocessing", preprocessor),
         ("model", stack_model)
     ])
 
     mlflow.set_experiment("Credit_Risk_PD_Engine")
     with mlflow.start_run():
-        pipeline.fit(X_train, y_train) # trains the model
-        probs = pipeline.predict_proba(X_test)[:, 1]
+        data.fit(pipeline) # trains the model
+        probs = data.predict_test(pipeline)
         metrics = get_credit_metrics(y_test, probs)
 
         mlflow.log_metrics(metrics)
@@ -68,6 +72,9 @@ def train_model():
         # Save the model
         joblib.dump(pipeline, "artifacts/credit_risk_pipeline.pkl")
         # Save training reference (Crucial for PSI drift calculation later)
-        X_train.to_csv("data/processed/training_reference.csv", index=False)
+        # (engineered view, as the model sees it)
+        data.Xf_train.to_csv("data/processed/training_reference.csv", index=False)
+        # Compact drift baseline used by the monitor (feature buckets + holdout scores)
+        write_baseline_profile(pipeline, X_train, probs)
         
         print(f"✅ Gini: {metrics['Gini']:.3f} | KS: {metrics['KS_Statistic']:.3f}")
\ No newline at end of file
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import time
+import shutil
+import resource
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import joblib
+import mlflow
+from sklearn.preprocessing import StandardScaler, OneHotEncoder
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+
+from data.feature_cache import load_training_split
+from features.feature_pipeline import NUMERIC_FEATURES, CATEGORICAL_FEATURES, record_training_mean
+from models.evaluate import get_credit_metrics
+from models.train_boosted import build_boosted_model
+from models.train_voting import build_voting_model
+from models.train_logistic import build_logistic_model
+from models.train_ensemble import build_stacking_model
+from monitoring.baseline_profile import write_baseline_profile
+
+CHAMPION_PATH = "artifacts/credit_risk_pipeline.pkl"
+CANDIDATE_DIR = "artifacts/candidates"
+TRAINING_REPORTS_DIR = "reports/training"
+
+# family -> (model builder, MLflow experiment, relative CPU weight)
+MODEL_FAMILIES = {
+    "boosted": (build_boosted_model, "HMEQ_XGBoost_Voting_Experiment", 3),
+    "stacking": (build_stacking_model, "Credit_Risk_PD_Engine", 2),
+    "voting": (build_voting_model, "HMEQ_Voting_Experiment", 2),
+    "logistic": (build_logistic_model, "HMEQ_Logistic_Experiment", 1),
+}
+
+
+def split_cpu_budget(families, cpus):
+    """
+    n_jobs per family. With cpus >= len(families) every family gets one
+    core plus a weight-proportional share of the rest, summing to exactly
+    cpus. With fewer cores every family gets n_jobs=1 and train_all runs
+    only `cpus` families at a time, so the budget holds either way.
+    """
+    weights = np.array([MODEL_FAMILIES[f][2] for f in families], dtype=float)
+    shares = np.ones(len(families), dtype=int)
+    spare = cpus - len(families)
+    if spare > 0:
+        extra = np.floor(spare * weights / weights.sum()).astype(int)
+        shares += extra
+        # Hand the rounding remainder to the heaviest families
+        for i in np.argsort(-weights, kind="stable")[:spare - extra.sum()]:
+            shares[i] += 1
+    return dict(zip(families, shares.tolist()))
+
+
+def prepare_shared_data(work_dir):
+    """
+    Takes the (cached) split and fitted feature step, then fits the
+    preprocessing once on the training split. The transformed matrices are
+    written as .npy files that every trainer memory-maps read-only; the
+    fitted steps are saved so each candidate becomes the same three-step
+    serving pipeline.
+    """
+    data = load_training_split()
+    y_train, y_test = data.y_train, data.y_test
+
+    preprocessor = ColumnTransformer([
+        ("num", StandardScaler(), NUMERIC_FEATURES),
+        ("cat", OneHotEncoder(handle_unknown="ignore"), CATEGORICAL_FEATURES)
+    ], sparse_threshold=0.0)
+    Xt_train = preprocessor.fit_transform(data.Xf_train, y_train)
+    Xt_test = preprocessor.transform(data.Xf_test)
+    record_training_mean(preprocessor, Xt_train)
+
+    os.makedirs(work_dir, exist_ok=True)
+    paths = {name: os.path.join(work_dir, f"{name}.npy") for name in ("X_train", "X_test", "y_train", "y_test")}
+    np.save(paths["X_train"], np.ascontiguousarray(Xt_train, dtype=np.float64))
+    np.save(paths["X_test"], np.ascontiguousarray(Xt_test, dtype=np.float64))
+    np.save(paths["y_train"], np.asarray(y_train))
+    np.save(paths["y_test"], np.asarray(y_test))
+    paths["steps"] = os.path.join(work_dir, "fitted_steps.pkl")
+    joblib.dump({"features": data.features, "preprocessing": preprocessor}, paths["steps"])
+    return paths, data.X_train, data.X_test
+
+
+def train_family(family, paths, n_jobs, candidate_dir):
+    """Pool task: fits one model family on the shared matrices and saves its candidate pipeline."""
+    start = time.perf_counter()
+    builder, experiment, _ = MODEL_FAMILIES[family]
+    X_train = np.load(paths["X_train"], mmap_mode="r")
+    X_test = np.load(paths["X_test"], mmap_mode="r")
+    y_train = np.load(paths["y_train"])
+    y_test = np.load(paths["y_test"])
+
+    model = builder(n_jobs=n_jobs)
+    fit_start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - fit_start
+    probs = model.predict_proba(X_test)[:, 1]
+    metrics = get_credit_metrics(y_test, probs)
+
+    steps = joblib.load(paths["steps"])
+    pipeline = Pipeline([("features", steps["features"]), ("preprocessing", steps["preprocessing"]), ("model", model)])
+    os.makedirs(candidate_dir, exist_ok=True)
+    artifact = os.path.join(candidate_dir, f"{family}.pkl")
+    joblib.dump(pipeline, artifact)
+
+    mlflow.set_experiment(experiment)
+    with mlflow.start_run(run_name=f"{family}_orchestrated"):
+        mlflow.log_params({"family": family, "n_jobs": n_jobs})
+        mlflow.log_metrics(metrics)
+        mlflow.sklearn.log_model(pipeline, f"{family}_model")
+        run_id = mlflow.active_run().info.run_id
+
+    return {
+        "family": family,
+        **{k: round(v, 4) for k, v in metrics.items()},
+        "n_jobs": n_jobs,
+        "fit_seconds": round(fit_seconds, 2),
+        "wall_seconds": round(time.perf_counter() - start, 2),
+        # ru_maxrss is in kB on Linux; each task gets a fresh worker process
+        "peak_memory_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "artifact": artifact,
+        "mlflow_run_id": run_id
+    }
+
+
+def promote_champion(leaderboard, X_train, X_test, champion_path=CHAMPION_PATH):
+    """Copies the best candidate (by Gini) over the serving artifact and rewrites the drift baseline."""
+    best = leaderboard[0]
+    pipeline = joblib.load(best["artifact"])
+    tmp_path = champion_path + ".tmp"
+    shutil.copyfile(best["artifact"], tmp_path)
+    # Atomic swap: the API's model watcher never sees a half-written file
+    os.replace(tmp_path, champion_path)
+    write_baseline_profile(pipeline, X_train, pipeline.predict_proba(X_test)[:, 1])
+    return best
+
+
+def train_all(families=None, cpus=None, promote=False, work_dir="artifacts/training_data"):
+    """
+    Trains every model family concurrently on shared, pre-featurized data.
+    cpus: total CPU budget (default: all cores), split between the families
+    by weight and passed down as n_jobs / nthread.
+    promote: copy the best candidate over the serving artifact and rewrite
+    the drift baseline. Opt-in while a champion exists; on a fresh checkout
+    (no serving artifact yet) the best candidate is always promoted.
+    Returns the leaderboard report.
+    """
+    families = list(families or MODEL_FAMILIES)
+    cpus = cpus or os.cpu_count() or 1
+    budget = split_cpu_budget(families, cpus)
+    started = datetime.now()
+    start = time.perf_counter()
+
+    # 1. Load + featurize once
+    paths, X_train, X_test = prepare_shared_data(work_dir)
+    prepare_seconds = time.perf_counter() - start
+    print(f" [*] Shared training data ready in {prepare_seconds:.2f}s; CPU budget {cpus}: {budget}")
+
+    # 2. One fresh process per family (peak memory is then per model)
+    leaderboard, failures = [], {}
+    # At most `cpus` families at once: with fewer cores than families each runs single-threaded
+    with ProcessPoolExecutor(max_workers=min(len(families), cpus), max_tasks_per_child=1) as pool:
+        futures = {f: pool.submit(train_family, f, paths, budget[f], CANDIDATE_DIR) for f in families}
+        for family, future in futures.items():
+            try:
+                leaderboard.append(future.result())
+                print(f" [*] {family} trained: Gini {leaderboard[-1]['Gini']:.3f}")
+            except Exception as e:
+                failures[family] = str(e)
+                print(f" [!] {family} failed: {e}")
+
+    # 3. Leaderboard (Gini, as in the registry's champion/challenger rule) and promotion
+    leaderboard.sort(key=lambda row: -row["Gini"])
+    if not promote and not os.path.exists(CHAMPION_PATH):
+        print(f" [*] No serving artifact at {CHAMPION_PATH} yet; promoting the best candidate")
+        promote = True
+    champion = promote_champion(leaderboard, X_train, X_test) if promote and leaderboard else None
+    report = {
+        "started_at": started.isoformat(timespec="seconds"),
+        "cpu_budget": cpus,
+        "prepare_seconds": round(prepare_seconds, 2),
+        "total_seconds": round(time.perf_counter() - start, 2),
+        "leaderboard": leaderboard,
+        "failures": failures,
+        "champion": champion["family"] if champion else None,
+        "champion_path": CHAMPION_PATH if champion else None
+    }
+    os.makedirs(TRAINING_REPORTS_DIR, exist_ok=True)
+    report_path = os.path.join(TRAINING_REPORTS_DIR, f"leaderboard-{started:%Y%m%dT%H%M%S}.json")
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print_leaderboard(report)
+    print(f" Leaderboard saved to {report_path}")
+    return report
+
+
+def print_leaderboard(report):
+    print(f"\n{'family':>10} | {'AUC':>6} | {'Gini':>6} | {'KS':>6} | {'n_jobs':>6} | {'fit s':>6} | "
+          f"{'wall s':>6} | {'peak MB':>7}")
+    for row in report["leaderboard"]:
+        mark = " *" if row["family"] == report["champion"] else ""
+        print(f"{row['family']:>10} | {row['AUC']:6.4f} | {row['Gini']:6.4f} | {row['KS_Statistic']:6.4f} | "
+              f"{row['n_jobs']:>6} | {row['fit_seconds']:6.2f} | {row['wall_seconds']:6.2f} | "
+              f"{row['peak_memory_mb']:7.1f}{mark}")
+    print(f" Total {report['total_seconds']:.1f}s (shared featurization {report['prepare_seconds']:.2f}s)")
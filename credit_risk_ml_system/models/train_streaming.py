@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+"""
+Out-of-core training for tables larger than memory:
+    python -m models.train_streaming --model sgd              # SGD logistic regression (partial_fit)
+    python -m models.train_streaming --model xgb --chunksize 100000
+    python -m models.train_streaming --model xgb --where "LOAN > 5000"
+
+Reads hmeq_data through data/sql_loader.iter_chunks and never holds more
+than one chunk (plus bounded sketches / samples) in memory:
+    1. one pass: KLL sketches of every numeric column give the imputation
+       medians and clip values, category levels are collected and a fixed
+       size uniform sample fits the StandardScaler / OneHotEncoder;
+    2. training: SGDClassifier.partial_fit per chunk for --epochs passes,
+       or XGBoost on an ExtMemQuantileDMatrix fed by a chunk iterator
+       (pages cached on disk);
+    3. hold-out rows (a stable hash of the row id) are scored chunk by
+       chunk into a CreditMetricsSketch.
+The result is the usual (features, preprocessing, model) Pipeline.
+"""
+
+import os
+import time
+import shutil
+import argparse
+import resource
+import tempfile
+
+import numpy as np
+import pandas as pd
+import joblib
+import mlflow
+import xgboost as xgb
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import StandardScaler, OneHotEncoder
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+
+from data.sql_loader import iter_chunks, DEFAULT_COLUMNS
+from features.feature_pipeline import (
+    CreditFeatureTransformer, add_ratio_features, split_target, RATIO_FEATURES, FLAG_FEATURES,
+    NUMERIC_FEATURES, CATEGORICAL_FEATURES, record_training_mean, split_column_types
+)
+from models.evaluate import CreditMetricsSketch
+from monitoring.quantile_sketch import KLLSketch
+
+STREAM_COLUMNS = ["id"] + DEFAULT_COLUMNS
+TEST_PERCENT = 30
+# Imputation statistics come from sketches: k=2000 keeps their rank error near 0.1%
+FEATURE_SKETCH_K = 2000
+SAMPLE_ROWS = 50_000
+CANDIDATE_DIR = "artifacts/candidates"
+XGB_PARAMS = {
+    # Same booster as the XGBoost member of build_boosted_model
+    "objective": "binary:logistic",
+    "eval_metric": "logloss",
+    "tree_method": "hist",
+    "max_depth": 4,
+    "eta": 0.05
+}
+XGB_ROUNDS = 300
+
+
+def holdout_mask(ids, test_percent=TEST_PERCENT):
+    """Stable train/test assignment from the row id (same rows every pass and every run)."""
+    hashed = (np.asarray(ids, dtype=np.uint64) * np.uint64(2654435761)) % np.uint64(2**32)
+    return (hashed % np.uint64(100)) < test_percent
+
+
+def split_chunk(chunk):
+    """Chunk -> (X_train, y_train, X_test, y_test); the id column is dropped."""
+    test = holdout_mask(chunk["id"].to_numpy())
+    X, y = split_target(chunk.drop(columns=["id"]))
+    return X[~test], y[~test], X[test], y[test]
+
+
+def filled_quantile(sketch, median, n_rows, q):
+    """
+    q-quantile of the column after its n_rows - sketch.n missing values are
+    filled with `median` (what fit_imputation_stats computes exactly), read
+    off the observed-value sketch.
+    """
+    n_obs = sketch.n
+    n_missing = n_rows - n_obs
+    if n_obs == 0:
+        return np.nan
+    rank = q * (n_rows - 1)
+    n_below = sketch.cdf(np.nextafter(median, -np.inf)) * n_obs
+    if rank < n_below:
+        return sketch.quantile(rank / max(n_obs - 1, 1))
+    if rank < n_below + n_missing:
+        return median
+    return sketch.quantile((rank - n_missing) / max(n_obs - 1, 1))
+
+
+def fit_streaming_features(chunks, clip_quantile=0.99, sample_rows=SAMPLE_ROWS, seed=42):
+    """
+    Pass 1 over the training rows. Returns the fitted feature transformer,
+    the fitted preprocessing ColumnTransformer, and pass statistics.
+    """
+    rng = np.random.default_rng(seed)
+    sketches, levels = {}, {}
+    columns = None
+    n_rows = n_bad = 0
+    sample, sample_keys = None, None
+
+    for chunk in chunks:
+        X, y, _, _ = split_chunk(chunk)
+        if len(X) == 0:
+            continue
+        X = add_ratio_features(X.copy())
+        if columns is None:
+            numeric, categorical = split_column_types(X)
+            columns = list(X.columns)
+            sketches = {c: KLLSketch(FEATURE_SKETCH_K, seed=seed) for c in numeric}
+            levels = {c: set() for c in categorical}
+        for col, sketch in sketches.items():
+            sketch.update(X[col].to_numpy(dtype=np.float64, na_value=np.nan))
+        for col, seen in levels.items():
+            seen.update(X[col].dropna().unique().tolist())
+        n_rows += len(X)
+        n_bad += int(y.sum())
+
+        # Uniform sample without replacement: keep the rows with the smallest random keys
+        keys = rng.random(len(X))
+        raw = X[[c for c in columns if c not in RATIO_FEATURES]]
+        if sample is None:
+            sample, sample_keys = raw, keys
+        else:
+            sample = pd.concat([sample, raw], ignore_index=True)
+            sample_keys = np.concatenate([sample_keys, keys])
+        if len(sample) > sample_rows:
+            keep = np.argpartition(sample_keys, sample_rows)[:sample_rows]
+            sample, sample_keys = sample.iloc[keep].reset_index(drop=True), sample_keys[keep]
+
+    if n_rows == 0:
+        raise ValueError("No training rows in the stream")
+
+    features = CreditFeatureTransformer(clip_quantile)
+    features.numeric_columns_ = list(sketches)
+    features.categorical_columns_ = list(levels)
+    features.output_columns_ = columns + [f for f in FLAG_FEATURES if f not in columns]
+    features.medians_ = np.array([sketches[c].quantile(0.5) for c in sketches])
+    features.clip_upper_ = np.array([filled_quantile(sketches[c], m, n_rows, clip_quantile)
+                                     for c, m in zip(sketches, features.medians_)])
+
+    # Scaler moments from the sample; one-hot levels from the full pass
+    preprocessor = ColumnTransformer([
+        ("num", StandardScaler(), NUMERIC_FEATURES),
+        ("cat", OneHotEncoder(handle_unknown="ignore",
+                              categories=[sorted(levels.get(c, set()) | {"Unknown"}) for c in CATEGORICAL_FEATURES]),
+         CATEGORICAL_FEATURES)
+    ], sparse_threshold=0.0)
+    record_training_mean(preprocessor, preprocessor.fit_transform(features.transform(sample)))
+
+    stats = {"train_rows": n_rows, "bad_rate": n_bad / n_rows, "sample_rows": len(sample),
+             "sketch_rank_error": max(s.rank_error() for s in sketches.values())}
+    return features, preprocessor, stats
+
+
+def _model_matrix(features, preprocessor, X):
+    return preprocessor.transform(features.transform(X)).astype(np.float32)
+
+
+class ChunkBatches(xgb.DataIter):
+    """Feeds transformed training chunks to XGBoost; pages are cached under cache_dir."""
+
+    def __init__(self, make_chunks, features, preprocessor, cache_dir):
+        self.make_chunks = make_chunks
+        self.features = features
+        self.preprocessor = preprocessor
+        self._chunks = None
+        super().__init__(cache_prefix=os.path.join(cache_dir, "train"), release_data=True)
+
+    def next(self, input_data):
+        if self._chunks is None:
+            self._chunks = iter(self.make_chunks())
+        for chunk in self._chunks:
+            X, y, _, _ = split_chunk(chunk)
+            if len(X):
+                input_data(data=_model_matrix(self.features, self.preprocessor, X), label=y.to_numpy())
+                return True
+        return False
+
+    def reset(self):
+        self._chunks = None
+
+
+def train_sgd(make_chunks, features, preprocessor, epochs=5, seed=42):
+    # Averaged SGD: on HMEQ it reaches near-LogisticRegression Gini in ~5 passes (plain SGD needs many more)
+    model = SGDClassifier(loss="log_loss", alpha=1e-3, average=True, random_state=seed)
+    rng = np.random.default_rng(seed)
+    for _ in range(epochs):
+        for chunk in make_chunks():
+            X, y, _, _ = split_chunk(chunk)
+            if len(X) == 0:
+                continue
+            order = rng.permutation(len(X))
+            model.partial_fit(_model_matrix(features, preprocessor, X)[order], y.to_numpy()[order], classes=[0, 1])
+    return model
+
+
+def train_xgb(make_chunks, features, preprocessor, n_jobs=None, rounds=XGB_ROUNDS):
+    cache_dir = tempfile.mkdtemp(prefix="xgb-extmem-", dir="artifacts")
+    try:
+        matrix = xgb.ExtMemQuantileDMatrix(ChunkBatches(make_chunks, features, preprocessor, cache_dir), max_bin=256)
+        booster = xgb.train(dict(XGB_PARAMS, nthread=n_jobs or 0), matrix, rounds)
+        # The DMatrix removes its own page files when freed
+        del matrix
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    # sklearn wrapper around the trained booster, so it fits the serving Pipeline
+    model = xgb.XGBClassifier()
+    model.load_model(booster.save_raw("ubj"))
+    return model
+
+
+def evaluate_streaming(make_chunks, pipeline, sketch_k=2000):
+    """Hold-out AUC / Gini / KS from a CreditMetricsSketch, one chunk at a time."""
+    metrics = CreditMetricsSketch(sketch_k)
+    n_test = 0
+    for chunk in make_chunks():
+        _, _, X, y = split_chunk(chunk)
+        if len(X):
+            metrics.update(y.to_numpy(), pipeline.predict_proba(X)[:, 1])
+            n_test += len(X)
+    return dict(metrics.metrics(), test_rows=n_test)
+
+
+def train_streaming(model_type="sgd", chunksize=None, where=None, params=None, epochs=5, n_jobs=None,
+                    make_chunks=None, log_mlflow=True):
+    """
+    Out-of-core training run. make_chunks: zero-argument callable returning
+    a fresh chunk iterator (default: hmeq_data via the SQL loader).
+    Returns (pipeline, report).
+    """
+    make_chunks = make_chunks or (lambda: iter_chunks(columns=STREAM_COLUMNS, where=where, params=params,
+                                                      chunksize=chunksize))
+    timings = {}
+    start = time.perf_counter()
+
+    # 1. Feature statistics + preprocessing in one pass
+    features, preprocessor, stats = fit_streaming_features(make_chunks())
+    timings["stats_seconds"] = time.perf_counter() - start
+
+    # 2. Incremental training
+    t = time.perf_counter()
+    if model_type == "sgd":
+        model = train_sgd(make_chunks, features, preprocessor, epochs)
+    elif model_type == "xgb":
+        model = train_xgb(make_chunks, features, preprocessor, n_jobs)
+    else:
+        raise ValueError(f"Unknown streaming model: {model_type}")
+    timings["train_seconds"] = time.perf_counter() - t
+    pipeline = Pipeline([("features", features), ("preprocessing", preprocessor), ("model", model)])
+
+    # 3. Streaming hold-out metrics
+    t = time.perf_counter()
+    metrics = evaluate_streaming(make_chunks, pipeline)
+    timings["eval_seconds"] = time.perf_counter() - t
+
+    report = dict(
+        model=model_type, **stats, **metrics,
+        **{k: round(v, 2) for k, v in timings.items()},
+        total_seconds=round(time.perf_counter() - start, 2),
+        peak_memory_mb=round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    )
+    os.makedirs(CANDIDATE_DIR, exist_ok=True)
+    report["artifact"] = os.path.join(CANDIDATE_DIR, f"streaming_{model_type}.pkl")
+    joblib.dump(pipeline, report["artifact"])
+
+    if log_mlflow:
+        mlflow.set_experiment("HMEQ_Streaming_Experiment")
+        with mlflow.start_run(run_name=f"Streaming_{model_type}"):
+            mlflow.log_params({"model": model_type, "epochs": epochs, "chunksize": chunksize})
+            mlflow.log_metrics({k: report[k] for k in ("AUC", "Gini", "KS_Statistic", "KS_Error_Bound",
+                                                       "total_seconds", "peak_memory_mb")})
+            mlflow.sklearn.log_model(pipeline, f"streaming_{model_type}_model")
+            report["mlflow_run_id"] = mlflow.active_run().info.run_id
+    return pipeline, report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Out-of-core training from the hmeq_data table")
+    parser.add_argument("--model", default="sgd", choices=["sgd", "xgb"])
+    parser.add_argument("--chunksize", type=int, default=None)
+    parser.add_argument("--where", default=None, help="SQL filter pushed down to the database")
+    parser.add_argument("--epochs", type=int, default=5, help="SGD passes over the table")
+    parser.add_argument("--n-jobs", type=int, default=None, help="XGBoost threads")
+    args = parser.parse_args()
+
+    _, report = train_streaming(args.model, args.chunksize, args.where, epochs=args.epochs, n_jobs=args.n_jobs)
+    print(f" Streaming {args.model} trained on {report['train_rows']} rows | Gini: {report['Gini']:.3f} "
+          f"| KS: {report['KS_Statistic']:.3f} | peak {report['peak_memory_mb']} MB | {report['total_seconds']}s")
+    print(f" Candidate saved to {report['artifact']}")
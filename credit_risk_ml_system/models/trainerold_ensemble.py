@@ -8,25 +8,26 @@ Created on Sun Jan 18 13:37:26 2025
 import mlflow
 import joblib
 import os
-from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
 from sklearn.ensemble import VotingClassifier, RandomForestClassifier, GradientBoostingClassifier
 from sklearn.linear_model import LogisticRegression
 
-from data.load_data import load_credit_data
-from features.feature_pipeline import create_features
+from data.feature_cache import load_training_split
+from features.feature_pipeline import (
+    CreditFeatureTransformer, NUMERIC_FEATURES, CATEGORICAL_FEATURES
+)
 from models.evaluate import get_credit_metrics
+from monitoring.baseline_profile import write_baseline_profile
 
 def train_model():
-    df = load_credit_data()
-    X, y = create_features(df)
+    # Cached split + engineered features (rebuilt only when hmeq.csv or the feature code changes)
+    data = load_training_split()
+    X_train, y_test = data.X_train, data.y_test
     
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, stratify=y, random_state=42)
-    
-    num_cols = X.select_dtypes(include=['int64', 'float64']).columns
-    cat_cols = X.select_dtypes(include=['object', 'category']).columns
+    num_cols = NUMERIC_FEATURES
+    cat_cols = CATEGORICAL_FEATURES
 
     preprocessor = ColumnTransformer([
         ("num", StandardScaler(), num_cols),
@@ -40,6 +41,7 @@ def train_model():
     ], voting='soft')
 
     model_pipeline = Pipeline([
+        ("features", CreditFeatureTransformer()),
         ("preprocessing", preprocessor),
         ("model", ensemble)
     ])
@@ -49,9 +51,9 @@ def train_model():
     # =====================
     mlflow.set_experiment("Credit_Risk_Production")
     with mlflow.start_run(run_name="Credit_Risk_Ensemble"):
-        model_pipeline.fit(X_train, y_train)
+        data.fit(model_pipeline)
 
-        probs = model_pipeline.predict_proba(X_test)[:, 1]
+        probs = data.predict_test(model_pipeline)
         metrics = get_credit_metrics(y_test, probs)
 
         mlflow.log_metrics(metrics)
@@ -69,7 +71,10 @@ def train_model():
         
         # Save training reference (Crucial for PSI drift calculation later)
         reference_path = "data/processed/training_reference.csv"
-        X_train.to_csv(reference_path, index=False)
+        # (engineered view, as the model sees it)
+        data.Xf_train.to_csv(reference_path, index=False)
+        # Compact drift baseline used by the monitor (feature buckets + holdout scores)
+        write_baseline_profile(model_pipeline, X_train, probs)
     
         print(f" Training complete | Gini: {metrics['Gini']:.3f} | KS: {metrics['KS_Statistic']:.3f}")
         print(f" Model saved to: artifacts/credit_risk_pipeline.pkl")
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import scipy.stats as stats
+
+from features.feature_pipeline import NUMERIC_FEATURES, CATEGORICAL_FEATURES
+
+BASELINE_PROFILE_PATH = "artifacts/baseline_profile.json"
+PROFILE_BUCKETS = 10
+# Quantile grid kept for the predicted probability (KS test against production)
+SCORE_QUANTILES = 201
+
+
+def _bucket_edges(values, buckets):
+    """Interior quantile breakpoints; the outer buckets are open-ended."""
+    edges = np.unique(np.quantile(values, np.linspace(0, 1, buckets + 1)[1:-1]))
+    return edges
+
+
+def bucket_proportions(values, edges):
+    """Share of non-missing values in each bucket defined by the interior edges."""
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return np.zeros(len(edges) + 1)
+    counts = np.bincount(np.searchsorted(edges, values, side="right"), minlength=len(edges) + 1)
+    return counts / len(values)
+
+
+def numeric_profile(values, buckets=PROFILE_BUCKETS):
+    values = np.asarray(values, dtype=float)
+    present = values[~np.isnan(values)]
+    if len(present) == 0:
+        return {"n": 0, "missing_rate": 1.0, "edges": [], "proportions": [1.0]}
+    edges = _bucket_edges(present, buckets)
+    return {
+        "n": int(len(values)),
+        "missing_rate": float(1 - len(present) / len(values)),
+        "edges": edges.tolist(),
+        "proportions": bucket_proportions(present, edges).tolist(),
+        "mean": float(present.mean()),
+        "std": float(present.std())
+    }
+
+
+def categorical_profile(values):
+    counts = pd.Series(values).fillna("Unknown").astype(str).value_counts(normalize=True)
+    return {"n": int(len(values)), "frequencies": {k: float(v) for k, v in counts.items()}}
+
+
+def build_baseline_profile(features_df, predicted_probs, buckets=PROFILE_BUCKETS):
+    """
+    Compact drift baseline: per-feature bucket edges and proportions,
+    category frequencies and the predicted-probability distribution.
+    features_df: engineered training view (what the production log records)
+    predicted_probs: model scores on the holdout set
+    """
+    probs = np.asarray(predicted_probs, dtype=float)
+    score = numeric_profile(probs, buckets)
+    score["quantiles"] = np.quantile(probs, np.linspace(0, 1, SCORE_QUANTILES)).tolist()
+
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "n_rows": int(len(features_df)),
+        "buckets": buckets,
+        "numeric": {c: numeric_profile(features_df[c], buckets) for c in NUMERIC_FEATURES if c in features_df},
+        "categorical": {c: categorical_profile(features_df[c]) for c in CATEGORICAL_FEATURES if c in features_df},
+        "predicted_prob": score
+    }
+
+
+def save_baseline_profile(profile, path=BASELINE_PROFILE_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(profile, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def load_baseline_profile(path=BASELINE_PROFILE_PATH):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def write_baseline_profile(pipeline, X_train, holdout_probs, path=BASELINE_PROFILE_PATH):
+    """Trainer hook: profiles the fitted feature view of X_train plus holdout scores."""
+    features_df = pipeline.named_steps["features"].transform(X_train)
+    profile = build_baseline_profile(features_df, holdout_probs)
+    save_baseline_profile(profile, path)
+    print(f" Baseline profile saved to {path} ({os.path.getsize(path) / 1024:.1f} KB)")
+    return profile
+
+
+# ----------------------------------------------------------------------
+# Comparisons against a stored profile
+# ----------------------------------------------------------------------
+def psi_from_proportions(expected, actual, floor=0.0001):
+    expected = np.clip(np.asarray(expected, dtype=float), floor, None)
+    actual = np.clip(np.asarray(actual, dtype=float), floor, None)
+    return float(np.sum((expected - actual) * np.log(expected / actual)))
+
+
+def numeric_psi(feature_profile, actual):
+    """PSI of production values against a numeric feature profile."""
+    actual = np.asarray(actual, dtype=float)
+    if np.isnan(actual).all():
+        return 0.0
+    edges = np.asarray(feature_profile["edges"])
+    return psi_from_proportions(feature_profile["proportions"], bucket_proportions(actual, edges))
+
+
+def ks_against_quantiles(quantiles, actual, baseline_n):
+    """
+    Two-sample KS approximated from the baseline's quantile grid: D is the
+    largest gap between the interpolated baseline CDF and the production
+    ECDF, the p-value uses the effective size n*m/(n+m).
+    """
+    actual = np.sort(np.asarray(actual, dtype=float))
+    actual = actual[~np.isnan(actual)]
+    m = len(actual)
+    if m == 0 or baseline_n == 0:
+        return 0.0, 1.0
+
+    quantiles = np.asarray(quantiles)
+    grid = np.linspace(0, 1, len(quantiles))
+    # Baseline CDF at each production value (flat runs resolved to their upper end)
+    base_cdf = np.interp(actual, quantiles, grid, left=0.0, right=1.0)
+    ecdf_hi = np.arange(1, m + 1) / m
+    ecdf_lo = np.arange(0, m) / m
+    d = float(max(np.max(np.abs(ecdf_hi - base_cdf)), np.max(np.abs(base_cdf - ecdf_lo))))
+
+    n_eff = max(1, int(round(baseline_n * m / (baseline_n + m))))
+    return d, float(stats.kstwo.sf(d, n_eff))
+
+
+def ks_against_grid_counts(quantiles, grid_counts, baseline_n):
+    """
+    KS from production scores already counted on the baseline quantile grid
+    (grid_counts[b] = values with b grid points <= value). The ECDF is only
+    known at the grid points, so D is exact up to one grid step.
+    """
+    grid_counts = np.asarray(grid_counts, dtype=float)
+    m = grid_counts.sum()
+    if m == 0 or baseline_n == 0:
+        return 0.0, 1.0
+
+    # Share of production values strictly below each grid point vs the baseline's
+    below = np.cumsum(grid_counts)[:len(quantiles)] / m
+    base_cdf = np.linspace(0, 1, len(quantiles))
+    d = float(np.max(np.abs(below - base_cdf)))
+
+    n_eff = max(1, int(round(baseline_n * m / (baseline_n + m))))
+    return d, float(stats.kstwo.sf(d, n_eff))
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+import os
+import glob
+import json
+import time
+import atexit
+import hashlib
+import argparse
+import threading
+from datetime import timedelta
+
+import pandas as pd
+
+from monitoring.drift_engine import DriftCounts
+from monitoring.prediction_store import PredictionLogStore
+
+DRIFT_COUNTS_DIR = "logs/drift_counts"
+# Views an hourly history can be rolled up into
+ROLLUP_FREQS = {"hour": "h", "day": "D", "week": "W", "month": "M"}
+
+
+def profile_id(profile):
+    """Short fingerprint of a baseline profile; counts are only comparable under the same edges."""
+    return hashlib.sha256(json.dumps(profile, sort_keys=True).encode()).hexdigest()[:12]
+
+
+class DriftAccumulator:
+    """
+    Incremental, hourly drift counts kept next to the prediction log.
+
+    update() is called by the log writer thread (PredictionLogWriter
+    on_write) with every batch it writes, and adds the batch's bucket counts
+    (monitoring/drift_engine.py) to this process's total for each hour.
+    Totals are persisted every `persist_interval` seconds as
+
+        <root>/<profile id>/date=YYYY-MM-DD/hour=HH/counts-<pid>-<ns>.json
+
+    one file per process and hour, so workers never write the same file.
+    Counts of disjoint rows add up: a report over any window merges the
+    hourly files of every worker, costing O(hours x buckets) whatever the
+    number of logged rows. Parsed files of closed hours are cached.
+
+    Only the current and previous hour stay in memory. Rows that arrive
+    later for an older hour (delayed flush, writer backlog) are merged into
+    the hour's file on disk instead of replacing it.
+
+    A new baseline profile (retraining) starts a new directory; rebuild()
+    re-counts the log's closed hours under the current profile.
+    """
+
+    def __init__(self, monitor, root=DRIFT_COUNTS_DIR, persist_interval=60.0):
+        self.monitor = monitor
+        self.root = root
+        self.persist_interval = persist_interval
+
+        self._lock = threading.Lock()
+        self._token = f"{os.getpid()}-{time.time_ns()}"
+        self._engine = None
+        self._hours = {}     # hour -> DriftCounts of this process
+        self._dirty = set()  # hours changed since the last persist
+        self._fresh = set()  # hours (re)entered memory since the last persist: merge with their file
+        self._last_persist = time.monotonic()
+        self._cache = {}     # path -> (mtime_ns, DriftCounts)
+        self._counters = {"rows": 0, "persists": 0}
+        atexit.register(self.persist)
+
+    @property
+    def engine(self):
+        return self.monitor.engine
+
+    # ------------------------------------------------------------------
+    # Producer side (log writer thread)
+    # ------------------------------------------------------------------
+    def update(self, frame):
+        """Adds a logged batch to the hourly counts (frame needs a timestamp column)."""
+        if len(frame) == 0:
+            return
+        self.monitor.refresh_baseline()
+        engine = self.engine
+        if engine is not self._engine:
+            # New profile: flush counts made under the old edges, then start over
+            self.persist()
+            with self._lock:
+                self._engine, self._hours, self._dirty, self._fresh = engine, {}, set(), set()
+
+        hours = pd.to_datetime(frame["timestamp"], errors="coerce").dt.floor("h")
+        batch = {hour: engine.count(part) for hour, part in frame.groupby(hours)}
+        with self._lock:
+            for hour, counts in batch.items():
+                if hour not in self._hours:
+                    self._fresh.add(hour)
+                self._hours[hour] = self._hours[hour] + counts if hour in self._hours else counts
+                self._dirty.add(hour)
+                self._counters["rows"] += counts.rows
+            due = time.monotonic() - self._last_persist >= self.persist_interval
+        if due:
+            self.persist()
+
+    def persist(self):
+        """Writes the totals of every hour changed since the last persist."""
+        with self._lock:
+            self._last_persist = time.monotonic()
+            if not self._dirty or self._engine is None:
+                return
+            pid = profile_id(self._engine.profile)
+            for hour in sorted(self._dirty):
+                path = os.path.join(self._hour_dir(pid, hour), f"counts-{self._token}.json")
+                if hour in self._fresh and os.path.exists(path):
+                    # Late rows for an hour already evicted from memory: add to what was written
+                    self._hours[hour] = self._hours[hour] + self._read(path)
+                self._write(path, self._hours[hour])
+            self._dirty, self._fresh = set(), set()
+            self._counters["persists"] += 1
+
+            # Closed hours are on disk for good; keep only the current ones in memory
+            current = pd.Timestamp.now().floor("h") - timedelta(hours=1)
+            self._hours = {h: c for h, c in self._hours.items() if h >= current}
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, hours_in_memory=len(self._hours), pending_hours=len(self._dirty))
+
+    def after_fork(self):
+        """Counts taken in the parent stay the parent's; the worker starts its own file set."""
+        self._lock = threading.Lock()
+        self._token = f"{os.getpid()}-{time.time_ns()}"
+        self._hours, self._dirty, self._fresh = {}, set(), set()
+        self._counters = dict.fromkeys(self._counters, 0)
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+    def window(self, start=None, end=None):
+        """{hour: DriftCounts} merged over all workers for hours overlapping [start, end)."""
+        self.persist()
+        start = pd.Timestamp(start).floor("h") if start is not None else None
+        end = pd.Timestamp(end) if end is not None else None
+
+        hourly, seen = {}, set()
+        pattern = os.path.join(self.root, profile_id(self.engine.profile), "date=*", "hour=*")
+        for hour_dir in sorted(glob.glob(pattern)):
+            hour = self._parse_hour(hour_dir)
+            if (start is not None and hour < start) or (end is not None and hour >= end):
+                continue
+            for path in glob.glob(os.path.join(hour_dir, "counts-*.json")):
+                counts = self._read(path)
+                seen.add(path)
+                hourly[hour] = hourly[hour] + counts if hour in hourly else counts
+        self._cache = {p: v for p, v in self._cache.items() if p in seen}
+        return hourly
+
+    def total(self, start=None, end=None):
+        """All counts in the window merged into one DriftCounts."""
+        total = self.engine.empty_counts()
+        for counts in self.window(start, end).values():
+            total = total + counts
+        return total
+
+    def rollup(self, freq="day", start=None, end=None):
+        """Hourly counts merged into hour/day/week/month periods: [(period label, DriftCounts)]."""
+        periods = {}
+        for hour, counts in sorted(self.window(start, end).items()):
+            label = str(hour.to_period(ROLLUP_FREQS[freq]))
+            periods[label] = periods[label] + counts if label in periods else counts
+        return list(periods.items())
+
+    def has_history(self):
+        """True once this process counted rows or any counts exist on disk for the current profile."""
+        if self._hours and self._engine is self.engine:
+            return True
+        return bool(glob.glob(os.path.join(self.root, profile_id(self.engine.profile), "date=*")))
+
+    # ------------------------------------------------------------------
+    # Backfill
+    # ------------------------------------------------------------------
+    def rebuild(self, store, start=None, end=None, closed_only=True):
+        """
+        Re-counts hours of the Parquet log under the current profile,
+        replacing the per-worker files of those hours. Returns rows counted.
+        closed_only: skip the current and the previous hour, which live
+        workers still hold in memory and would rewrite on their next
+        persist (pass False only while no server is logging).
+        """
+        self.monitor.refresh_baseline()
+        engine = self.engine
+        pid = profile_id(engine.profile)
+        if closed_only:
+            # Same window persist() keeps in memory
+            cutoff = pd.Timestamp.now().floor("h") - timedelta(hours=1)
+            end = min(pd.Timestamp(end), cutoff) if end is not None else cutoff
+
+        hourly = {}
+        for frame in store.iter_frames(columns=engine.columns + ["timestamp"], start=start, end=end):
+            hours = pd.to_datetime(frame["timestamp"]).dt.floor("h")
+            for hour, part in frame.groupby(hours):
+                counts = engine.count(part)
+                hourly[hour] = hourly[hour] + counts if hour in hourly else counts
+
+        rows = 0
+        for hour, counts in sorted(hourly.items()):
+            hour_dir = self._hour_dir(pid, hour)
+            for path in glob.glob(os.path.join(hour_dir, "counts-*.json")):
+                os.remove(path)
+            self._write(os.path.join(hour_dir, "counts-rebuild.json"), counts)
+            rows += counts.rows
+        return rows
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _hour_dir(self, pid, hour):
+        return os.path.join(self.root, pid, f"date={hour:%Y-%m-%d}", f"hour={hour:%H}")
+
+    @staticmethod
+    def _parse_hour(hour_dir):
+        day = os.path.basename(os.path.dirname(hour_dir))[len("date="):]
+        return pd.Timestamp(day) + timedelta(hours=int(os.path.basename(hour_dir)[len("hour="):]))
+
+    @staticmethod
+    def _write(path, counts):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(counts.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    def _read(self, path):
+        mtime = os.stat(path).st_mtime_ns
+        cached = self._cache.get(path)
+        if cached is None or cached[0] != mtime:
+            with open(path, "r") as f:
+                cached = (mtime, DriftCounts.from_dict(json.load(f)))
+            self._cache[path] = cached
+        return cached[1]
+
+
+if __name__ == "__main__":
+    # Backfill / re-count the accumulators from the Parquet log (e.g. after retraining)
+    from monitoring.drift_analysis import CreditRiskMonitor
+    from monitoring.baseline_profile import BASELINE_PROFILE_PATH
+
+    parser = argparse.ArgumentParser(description="Rebuild hourly drift counts from the prediction log")
+    parser.add_argument("--log-root", default="logs/predictions")
+    parser.add_argument("--root", default=DRIFT_COUNTS_DIR)
+    parser.add_argument("--baseline", default=BASELINE_PROFILE_PATH)
+    parser.add_argument("--days", type=int, default=None, help="only the last N days")
+    parser.add_argument("--include-current-hour", action="store_true",
+                        help="also re-count the last two hours (only while no server is logging)")
+    args = parser.parse_args()
+
+    accumulator = DriftAccumulator(CreditRiskMonitor(args.baseline), args.root)
+    start = pd.Timestamp.now() - timedelta(days=args.days) if args.days else None
+    n = accumulator.rebuild(PredictionLogStore(args.log_root), start=start,
+                            closed_only=not args.include_current_hour)
+    print(f" Rebuilt drift counts from {n} logged rows")
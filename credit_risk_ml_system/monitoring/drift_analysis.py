@@ -7,10 +7,20 @@ Created on Sun Jun 25 16:57:15 2025
 
 import pandas as pd
 import numpy as np
-import scipy.stats as stats
 import os
 import json
-from datetime import datetime
+import threading
+from datetime import datetime, timedelta
+
+from monitoring.prediction_store import PredictionLogStore
+from monitoring.baseline_profile import (
+    BASELINE_PROFILE_PATH, build_baseline_profile, load_baseline_profile
+)
+from monitoring.drift_engine import DriftEngine, psi_label
+from monitoring.quantile_sketch import KLLSketch, ks_sketch_against_quantiles
+
+# Columns of the legacy two-metric report (the drift engine reads every profiled feature)
+DRIFT_COLUMNS = ["predicted_prob", "DEBTINC"]
 
 
 class CreditRiskMonitor:
@@ -18,104 +28,189 @@ class CreditRiskMonitor:
     Module to calculate PSI (Population Stability Index), 
     K-S Statistics, and Drift metrics for Credit Risk.
     """
-    def __init__(self, baseline_path="data/processed/training_reference.csv"):
-        # Fix: Ensure path matches the actual training output directory
-        if os.path.exists(baseline_path):
-            self.baseline = pd.read_csv(baseline_path)
-            # Ensure we have the probability column for scoring drift
-            if 'predicted_prob' not in self.baseline and 'BAD' in self.baseline:
-                # Fallback: if probs aren't in reference, use the target as a proxy for dist
-                self.baseline['predicted_prob'] = self.baseline['BAD']
+    def __init__(self, baseline_path=BASELINE_PROFILE_PATH):
+        # Compact profile written by the trainers (monitoring/baseline_profile.py);
+        # loaded once and reloaded only when the file changes (retraining)
+        self.baseline_path = baseline_path
+        self._baseline_mtime = None
+        # (profile, engine) swapped as one reference: called from the log
+        # writer thread and request threads alike
+        self._baseline = (None, None)
+        self._lock = threading.Lock()
+        self.refresh_baseline()
+
+    @property
+    def profile(self):
+        return self._baseline[0]
+
+    @property
+    def engine(self):
+        return self._baseline[1]
+
+    def refresh_baseline(self):
+        """(Re)loads the baseline profile if the file changed since the last load."""
+        mtime = os.path.getmtime(self.baseline_path) if os.path.exists(self.baseline_path) else None
+        if self.profile is not None and mtime == self._baseline_mtime:
+            return
+        with self._lock:
+            if self.profile is not None and mtime == self._baseline_mtime:
+                return
+
+            if mtime is None:
+                print(f"Warning: Baseline file {self.baseline_path} missing. Using simulated distribution.")
+                profile = self._simulated_profile()
+            elif self.baseline_path.endswith(".json"):
+                profile = load_baseline_profile(self.baseline_path)
+            else:
+                # Legacy training_reference.csv: profiled once here; it holds no scores
+                reference = pd.read_csv(self.baseline_path)
+                if 'predicted_prob' in reference:
+                    probs = reference['predicted_prob']
+                else:
+                    print("Warning: Legacy reference has no predicted_prob. Using simulated score distribution.")
+                    probs = self._simulated_profile_scores()
+                profile = build_baseline_profile(reference, probs)
+            self._baseline = (profile, DriftEngine(profile))
+            # Only marked as loaded once the new profile is in place
+            self._baseline_mtime = mtime
+
+    def after_fork(self):
+        # A lock held by a parent thread at fork time would never be released
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _simulated_profile_scores():
+        return np.random.beta(2, 5, 1000)
+
+    def _simulated_profile(self):
+        return build_baseline_profile(
+            pd.DataFrame({'DEBTINC': np.random.normal(30, 8, 1000)}), self._simulated_profile_scores()
+        )
+
+    def load_production_log(self, log_path, lookback_days=None, columns=DRIFT_COLUMNS):
+        """
+        Reads the production log. A directory is treated as a partitioned
+        Parquet store (only the last `lookback_days` partitions and the drift
+        columns are read); a file is the legacy CSV log.
+        """
+        if os.path.isdir(log_path):
+            start = datetime.now() - timedelta(days=lookback_days) if lookback_days else None
+            return PredictionLogStore(log_path).read(columns=columns, start=start)
+
+        prod_df = pd.read_csv(log_path, usecols=lambda c: c in list(columns) + ["timestamp"])
+        if lookback_days and "timestamp" in prod_df:
+            cutoff = datetime.now() - timedelta(days=lookback_days)
+            prod_df = prod_df[pd.to_datetime(prod_df["timestamp"], errors="coerce") >= cutoff]
+        return prod_df
+
+    def collect_drift_counts(self, log_path, lookback_days=None, engine=None):
+        """
+        Streams the production log into mergeable bucket counts for every
+        profiled feature (one Parquet part at a time) and a fixed-size sketch
+        of the scores. Returns (counts, score_sketch).
+        """
+        engine = engine or self.engine
+        if os.path.isdir(log_path):
+            start = datetime.now() - timedelta(days=lookback_days) if lookback_days else None
+            frames = PredictionLogStore(log_path).iter_frames(columns=engine.columns, start=start)
         else:
-            print(f"Warning: Baseline file {baseline_path} missing. Using simulated distribution.")
-            self.baseline = pd.DataFrame({
-                'predicted_prob': np.random.beta(2, 5, 1000), 
-                'DEBTINC': np.random.normal(30, 8, 1000)
-            })
-
-    def calculate_psi(self, expected, actual, buckets=10):
-        """Calculates PSI between two populations with robust error handling."""
-        try:
-            # Drop NaNs to prevent calculation failure
-            expected = expected.dropna()
-            actual = actual.dropna()
-
-            if len(actual) == 0:
-                return 0.0
+            frames = [self.load_production_log(log_path, lookback_days, columns=engine.columns)]
 
-            # Use quantiles to define the buckets based on expected data
-            breakpoints = np.unique(np.percentile(expected, np.linspace(0, 100, buckets + 1)))
-            
-            # If expected data is too constant, breakpoints might not work
-            if len(breakpoints) < 2:
-                return 0.0
-
-            def get_distribution(data, bins):
-                hist, _ = np.histogram(data, bins=bins)
-                return hist / len(data)
-
-            e_percents = get_distribution(expected, breakpoints)
-            a_percents = get_distribution(actual, breakpoints)
-            
-            # Clip to avoid log(0) and division by zero
-            e_percents = np.clip(e_percents, 0.0001, None)
-            a_percents = np.clip(a_percents, 0.0001, None)
-            
-            psi_val = np.sum((e_percents - a_percents) * np.log(e_percents / a_percents))
-            return float(psi_val)
-        except Exception as e:
-            print(f"PSI Calculation Error: {e}")
-            return 0.0
+        counts, sketch = engine.empty_counts(), KLLSketch()
+        for frame in frames:
+            counts = counts + engine.count(frame)
+            sketch.update(pd.to_numeric(frame["predicted_prob"], errors="coerce").to_numpy(dtype=float))
+        return counts, sketch
 
-    def analyze_current_drift(self, log_path="logs/production_predictions.csv"):
+    def analyze_current_drift(self, log_path="logs/production_predictions.csv", lookback_days=None):
         """Main entry point for the drift scheduler."""
         if not os.path.exists(log_path):
             return {"error": "No production data found. Run a few predictions in the dashboard first."}
 
         try:
-            prod_df = pd.read_csv(log_path)
+            self.refresh_baseline()
+            engine = self.engine
+            counts, score_sketch = self.collect_drift_counts(log_path, lookback_days, engine)
             
-            if len(prod_df) < 5:
+            if counts.rows < 5:
                 return {"error": "Insufficient production data. Need at least 5 records for meaningful drift analysis."}
 
-            # 1. Score Drift (PSI on Model Output)
-            # Compares the 'predicted_prob' in training vs 'predicted_prob' in logs
-            train_probs = self.baseline['predicted_prob']
-            score_psi = self.calculate_psi(train_probs, prod_df['predicted_prob'])
-            
-            # 2. Feature Drift (PSI on Key Input: Debt-to-Income)
-            # Uses DEBTINC as a representative feature for data drift
-            train_debt = self.baseline['DEBTINC'] if 'DEBTINC' in self.baseline else pd.Series(np.random.normal(30, 8, 1000))
-            debt_psi = self.calculate_psi(train_debt, prod_df['DEBTINC'])
-
-            # 3. KS Test for Statistical Significance
-            # Non-parametric test for distribution difference
-            ks_stat, p_val = stats.ks_2samp(train_probs, prod_df['predicted_prob'])
-
-            report = {
-                "report_timestamp": datetime.now().isoformat(),
-                "population_size": len(prod_df),
-                "metrics": {
-                    "score_drift_psi": round(score_psi, 4),
-                    "feature_drift_psi": round(debt_psi, 4),
-                    "ks_p_value": round(float(p_val), 4)
-                },
-                "status": {
-                    "overall_health": "HEALTHY" if score_psi < 0.1 and p_val > 0.05 else "DRIFT_DETECTED",
-                    "score_label": self._get_psi_label(score_psi),
-                    "feature_label": self._get_psi_label(debt_psi)
-                },
-                "recommendation": "Maintain" if score_psi < 0.25 else "Retrain Model Immediately"
-            }
+            # KS Test for Statistical Significance
+            # Score sketch against the stored score quantiles (bounded memory on both sides)
+            score_profile = engine.profile['predicted_prob']
+            _, p_val, _ = ks_sketch_against_quantiles(score_profile['quantiles'], score_sketch, score_profile['n'])
+            return self.drift_report(counts, p_val, engine)
+
+        except Exception as e:
+            return {"error": f"Internal analysis failure: {str(e)}"}
+
+    def analyze_accumulated_drift(self, accumulator, lookback_days=None, granularity=None):
+        """
+        Drift report from the hourly accumulators (monitoring/drift_accumulator.py):
+        only the counts of the whole hours in the window are merged, the log
+        is never read. granularity ("hour"/"day"/"week"/"month") adds a
+        per-period timeline of the same metrics.
+        """
+        try:
+            self.refresh_baseline()
+            engine = self.engine
+            start = datetime.now() - timedelta(days=lookback_days) if lookback_days else None
+            if granularity is None:
+                counts = accumulator.total(start=start)
+                return self.drift_report(counts, engine.score_ks(counts)[1], engine)
+
+            periods = accumulator.rollup(granularity, start=start)
+            counts = engine.empty_counts()
+            timeline = []
+            for label, period_counts in periods:
+                counts = counts + period_counts
+                table = {row["feature"]: row["psi"] for row in engine.drift_table(period_counts)}
+                timeline.append({
+                    "period": label,
+                    "population_size": period_counts.rows,
+                    "score_drift_psi": table["predicted_prob"],
+                    "feature_drift_psi": table.get("DEBTINC", 0.0),
+                    "ks_p_value": round(engine.score_ks(period_counts)[1], 4)
+                })
+
+            report = self.drift_report(counts, engine.score_ks(counts)[1], engine)
+            report["timeline"] = timeline
             return report
 
         except Exception as e:
             return {"error": f"Internal analysis failure: {str(e)}"}
 
-    def _get_psi_label(self, val):
-        if val < 0.1: return "STABLE"
-        if val < 0.25: return "MODERATE SHIFT"
-        return "SIGNIFICANT DRIFT"
+    def drift_report(self, counts, p_val, engine=None):
+        """Report payload from merged bucket counts and the score KS p-value."""
+        if counts.rows < 5:
+            return {"error": "Insufficient production data. Need at least 5 records for meaningful drift analysis."}
+
+        # 1. Per-feature drift table: PSI for the score and every numeric
+        # feature in one pass, PSI + chi-square for REASON / JOB
+        feature_drift = (engine or self.engine).drift_table(counts)
+        psi_by_feature = {row["feature"]: row["psi"] for row in feature_drift}
+
+        # 2. Score Drift (holdout score distribution from the profile) and
+        # the representative input feature (Debt-to-Income)
+        score_psi = psi_by_feature["predicted_prob"]
+        debt_psi = psi_by_feature.get("DEBTINC", 0.0)
+
+        return {
+            "report_timestamp": datetime.now().isoformat(),
+            "population_size": counts.rows,
+            "metrics": {
+                "score_drift_psi": round(score_psi, 4),
+                "feature_drift_psi": round(debt_psi, 4),
+                "ks_p_value": round(float(p_val), 4)
+            },
+            "status": {
+                "overall_health": "HEALTHY" if score_psi < 0.1 and p_val > 0.05 else "DRIFT_DETECTED",
+                "score_label": psi_label(score_psi),
+                "feature_label": psi_label(debt_psi)
+            },
+            "recommendation": "Maintain" if score_psi < 0.25 else "Retrain Model Immediately",
+            "feature_drift": sorted(feature_drift, key=lambda row: -row["psi"])
+        }
 
 if __name__ == "__main__":
     monitor = CreditRiskMonitor()
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import scipy.stats as stats
+
+from monitoring.baseline_profile import psi_from_proportions, ks_against_grid_counts
+
+SCORE_COLUMN = "predicted_prob"
+PSI_FLOOR = 0.0001
+
+
+def psi_label(val):
+    if val < 0.1: return "STABLE"
+    if val < 0.25: return "MODERATE SHIFT"
+    return "SIGNIFICANT DRIFT"
+
+
+class DriftCounts:
+    """
+    Mergeable bucket counts for one population of logged rows.
+        numeric:     (n_features, n_buckets + 1) int64, last column = missing
+        categorical: {column: {category: count}}
+        score:       counts of predicted_prob on the profile's quantile grid (KS)
+    Counts of disjoint row sets add up, so partitions/workers/time windows
+    can be merged with `+`.
+    """
+
+    def __init__(self, numeric, categorical, rows=0, score=None):
+        self.numeric = numeric
+        self.categorical = categorical
+        self.rows = rows
+        self.score = score
+
+    def __add__(self, other):
+        categorical = {}
+        for col in set(self.categorical) | set(other.categorical):
+            merged = dict(self.categorical.get(col, {}))
+            for cat, n in other.categorical.get(col, {}).items():
+                merged[cat] = merged.get(cat, 0) + n
+            categorical[col] = merged
+        score = self.score if other.score is None else other.score if self.score is None else self.score + other.score
+        return DriftCounts(self.numeric + other.numeric, categorical, self.rows + other.rows, score)
+
+    def to_dict(self):
+        return {"numeric": self.numeric.tolist(), "categorical": self.categorical, "rows": self.rows,
+                "score": None if self.score is None else self.score.tolist()}
+
+    @classmethod
+    def from_dict(cls, d):
+        score = d.get("score")
+        return cls(np.asarray(d["numeric"], dtype=np.int64), d["categorical"], d["rows"],
+                   None if score is None else np.asarray(score, dtype=np.int64))
+
+
+class DriftEngine:
+    """
+    All-feature drift against a baseline profile (monitoring/baseline_profile.py).
+
+    The profile's bucket edges are padded into one (n_features, max_edges)
+    matrix; count() compares the whole feature matrix against each edge
+    column and differences the cumulative counts into per-bucket counts.
+    PSI for all numeric features (and the score) is then one vectorised
+    expression, categorical columns get PSI plus a chi-square
+    goodness-of-fit test.
+    """
+
+    def __init__(self, profile):
+        self.profile = profile
+        numeric = dict(profile["numeric"])
+        numeric[SCORE_COLUMN] = profile[SCORE_COLUMN]
+        self.numeric_features = [c for c, p in numeric.items() if p.get("n")]
+        self.categorical_features = list(profile.get("categorical", {}))
+
+        # 1. Padded edge matrix; +inf padding keeps unused buckets empty
+        n_edges = [len(numeric[c]["edges"]) for c in self.numeric_features]
+        self.n_buckets = max(n_edges, default=0) + 1
+        self.edges = np.full((len(self.numeric_features), self.n_buckets - 1), np.inf)
+        self.expected = np.zeros((len(self.numeric_features), self.n_buckets))
+        self.valid = np.zeros((len(self.numeric_features), self.n_buckets), dtype=bool)
+        for i, col in enumerate(self.numeric_features):
+            k = n_edges[i]
+            self.edges[i, :k] = numeric[col]["edges"]
+            self.expected[i, :k + 1] = numeric[col]["proportions"]
+            self.valid[i, :k + 1] = True
+        self.expected_missing = np.array([numeric[c].get("missing_rate", 0.0) for c in self.numeric_features])
+
+        # Fine score histogram on the stored quantile grid, for KS without raw scores
+        self.score_grid = np.asarray(profile[SCORE_COLUMN].get("quantiles", []), dtype=float)
+
+    @property
+    def columns(self):
+        return self.numeric_features + self.categorical_features
+
+    def empty_counts(self):
+        return DriftCounts(np.zeros((len(self.numeric_features), self.n_buckets + 1), dtype=np.int64),
+                           {c: {} for c in self.categorical_features},
+                           score=np.zeros(len(self.score_grid) + 1, dtype=np.int64))
+
+    def count(self, frame):
+        """Bucket counts for a frame of logged rows (missing columns count as missing)."""
+        n, f = len(frame), len(self.numeric_features)
+        counts = self.empty_counts()
+        counts.rows = n
+        if n == 0:
+            return counts
+
+        # 2. (n, f) value matrix; absent columns become NaN, strings are coerced
+        sub = frame.reindex(columns=self.numeric_features)
+        coerce = [c for c in sub if not pd.api.types.is_numeric_dtype(sub[c])]
+        if coerce:
+            sub = sub.assign(**{c: pd.to_numeric(sub[c], errors="coerce") for c in coerce})
+        values = sub.to_numpy(dtype=float, na_value=np.nan)
+
+        # 3. Rows at or above each edge, for all features at once. With the
+        # few interior edges of a profile this beats a per-column searchsorted;
+        # bucket b holds the values with b edges <= value (searchsorted side="right")
+        n_edges = self.n_buckets - 1
+        at_or_above = np.zeros((f, n_edges + 1), dtype=np.int64)
+        for k in range(n_edges):
+            at_or_above[:, k + 1] = np.count_nonzero(values >= self.edges[:, k], axis=0)
+        missing = np.count_nonzero(np.isnan(values), axis=0)
+        at_or_above[:, 0] = n - missing
+
+        numeric = counts.numeric
+        numeric[:, :n_edges] = at_or_above[:, :-1] - at_or_above[:, 1:]
+        numeric[:, n_edges] = at_or_above[:, -1]
+        numeric[:, self.n_buckets] = missing
+
+        if SCORE_COLUMN in frame and len(self.score_grid):
+            scores = values[:, self.numeric_features.index(SCORE_COLUMN)]
+            scores = scores[~np.isnan(scores)]
+            counts.score = np.bincount(np.searchsorted(self.score_grid, scores, side="right"),
+                                       minlength=len(self.score_grid) + 1)
+
+        # 4. Category count tables (NaN is profiled as "Unknown")
+        for col in self.categorical_features:
+            if col in frame:
+                table = {}
+                for cat, k in frame[col].value_counts(dropna=False).items():
+                    key = "Unknown" if pd.isna(cat) else str(cat)
+                    table[key] = table.get(key, 0) + int(k)
+                counts.categorical[col] = table
+        return counts
+
+    def count_frames(self, frames):
+        """Streams an iterable of frames (e.g. Parquet partitions) into one DriftCounts."""
+        total = self.empty_counts()
+        for frame in frames:
+            total = total + self.count(frame)
+        return total
+
+    def numeric_psi(self, counts):
+        """PSI per numeric feature, vectorised over the whole count table."""
+        observed = counts.numeric[:, :self.n_buckets].astype(float)
+        present = observed.sum(axis=1, keepdims=True)
+        actual = np.divide(observed, present, out=np.zeros_like(observed), where=present > 0)
+
+        e = np.clip(self.expected, PSI_FLOOR, None)
+        a = np.clip(actual, PSI_FLOOR, None)
+        psi = np.where(self.valid, (e - a) * np.log(e / a), 0.0).sum(axis=1)
+        return np.where(present[:, 0] > 0, psi, 0.0)
+
+    def score_ks(self, counts):
+        """KS (D, p) of the counted scores against the baseline quantile grid."""
+        if counts.score is None or not len(self.score_grid):
+            return 0.0, 1.0
+        return ks_against_grid_counts(self.score_grid, counts.score, self.profile[SCORE_COLUMN]["n"])
+
+    def categorical_drift(self, col, observed):
+        """PSI and chi-square goodness-of-fit of observed category counts vs baseline frequencies."""
+        freqs = self.profile["categorical"][col]["frequencies"]
+        categories = sorted(set(freqs) | set(observed))
+        obs = np.array([observed.get(c, 0) for c in categories], dtype=float)
+        total = obs.sum()
+        if total == 0:
+            return 0.0, 0.0, 1.0
+
+        expected_p = np.clip(np.array([freqs.get(c, 0.0) for c in categories]), PSI_FLOOR, None)
+        expected_p = expected_p / expected_p.sum()
+        psi = psi_from_proportions(expected_p, obs / total, PSI_FLOOR)
+        chi2, p_val = stats.chisquare(obs, expected_p * total)
+        return psi, float(chi2), float(p_val)
+
+    def drift_table(self, counts):
+        """Per-feature drift rows: PSI + label for every feature, chi-square for categoricals."""
+        rows = []
+        psi = self.numeric_psi(counts)
+        missing = counts.numeric[:, self.n_buckets]
+        for i, col in enumerate(self.numeric_features):
+            rows.append({
+                "feature": col,
+                "type": "score" if col == SCORE_COLUMN else "numeric",
+                "psi": round(float(psi[i]), 4),
+                "label": psi_label(psi[i]),
+                "missing_rate_baseline": round(float(self.expected_missing[i]), 4),
+                "missing_rate_current": round(float(missing[i] / counts.rows), 4) if counts.rows else 0.0
+            })
+        for col in self.categorical_features:
+            psi_c, chi2, p_val = self.categorical_drift(col, counts.categorical.get(col, {}))
+            rows.append({
+                "feature": col,
+                "type": "categorical",
+                "psi": round(psi_c, 4),
+                "label": psi_label(psi_c),
+                "chi2": round(chi2, 4),
+                "chi2_p_value": round(p_val, 4)
+            })
+        return rows
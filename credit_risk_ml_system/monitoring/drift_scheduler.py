@@ -3,37 +3,349 @@
 Created on Sun Jun 25 16:58:21 2025
 
 @author: mjayant
+
+Drift monitoring daemon:
+    python -m monitoring.drift_scheduler              # every `interval_minutes` (config.yaml)
+    python -m monitoring.drift_scheduler --once       # one audit, then exit
+    python -m monitoring.drift_scheduler --interval 60
+
+Every run executes the drift check (score and feature alerts, both from
+one drift report) and the performance check as independent jobs on a
+process pool, writes one timestamped JSON report to reports/drift/ and
+hands alerts to the configured sinks. A run never starts while the
+previous one is still going (in this process or in another scheduler
+sharing the reports directory).
 """
 
-import schedule
+import os
+import json
 import time
-from monitoring.drift_analysis import RiskMonitor
+import fcntl
+import signal
+import argparse
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+
 import joblib
-import pandas as pd
-
-def run_monthly_audit():
-    print("  Starting Monthly Model Audit...")
-    
-    # 1. Load the model and the baseline training data
-    pipeline = joblib.load("artifacts/credit_risk_pipeline.pkl")
-    
-    # 2. Fetch the LAST 30 DAYS of production data from your database/logs
-    # For this example, we assume you log every 'predict' request to a CSV/DB
-    production_logs = pd.read_csv("logs/production_predictions.csv")
-    
-    # 3. Initialize Monitor and Run Analysis
-    monitor = RiskMonitor(baseline_path="data/training_reference.csv")
-    report = monitor.generate_health_report(production_logs, pipeline)
-    
-    # 4. Action based on results
-    if report["metrics"]["score_drift_psi"] > 0.25:
-        send_alert_to_slack(f" CRITICAL DRIFT DETECTED: PSI={report['metrics']['score_drift_psi']}")
-    else:
-        print(" Model is stable.")
+import requests
+
+from services.scoring import load_config
+
+# Defaults; overridden by the `monitoring` section of config.yaml
+MONITORING_DEFAULTS = {
+    "interval_minutes": 60 * 24,
+    "lookback_days": 7,
+    "max_workers": 3,
+    "baseline_path": "artifacts/baseline_profile.json",
+    "log_store_dir": "logs/predictions",
+    "drift_counts_dir": "logs/drift_counts",
+    "model_path": "artifacts/credit_risk_pipeline.pkl",
+    # Labelled production outcomes (prediction_id + BAD, as models/retrain.py reads them);
+    # without enough of them the performance check uses the held-out test split
+    "outcomes_path": None,
+    "reports_dir": "reports/drift",
+    "alert_thresholds": {
+        "score_psi": 0.25,
+        "score_ks_p_value": 0.01,
+        "feature_psi": 0.25,
+        "feature_chi2_p_value": 0.001,
+        "min_auc": 0.75,
+        "min_ks": 0.30
+    },
+    "alert_sinks": [{"type": "file", "path": "reports/drift/alerts.jsonl"}]
+}
+
+
+def load_monitoring_config(overrides=None):
+    config = json.loads(json.dumps(MONITORING_DEFAULTS))
+    section = (load_config() or {}).get("monitoring") or {}
+    for key, value in dict(section, **(overrides or {})).items():
+        if isinstance(value, dict) and isinstance(config.get(key), dict):
+            config[key].update(value)
+        elif value is not None:
+            config[key] = value
+    return config
+
+
+# ----------------------------------------------------------------------
+# Jobs: module-level so they can run in pool processes; each takes the
+# config dict and returns {"payload": ..., "alerts": [...]}
+# ----------------------------------------------------------------------
+def _drift_report(config):
+    from monitoring.drift_analysis import CreditRiskMonitor
+    from monitoring.drift_accumulator import DriftAccumulator
+
+    monitor = CreditRiskMonitor(config["baseline_path"])
+    accumulator = DriftAccumulator(monitor, config["drift_counts_dir"])
+    if accumulator.has_history():
+        return monitor.analyze_accumulated_drift(accumulator, config["lookback_days"])
+    return monitor.analyze_current_drift(config["log_store_dir"], config["lookback_days"])
+
+
+def _alert(job, severity, message, **details):
+    return dict(job=job, severity=severity, message=message, **details)
+
+
+def _score_drift_alerts(report, limits):
+    metrics = report["metrics"]
+    alerts = []
+    if metrics["score_drift_psi"] >= limits["score_psi"]:
+        alerts.append(_alert("score_drift", "critical",
+                             f"CRITICAL DRIFT DETECTED: PSI={metrics['score_drift_psi']}",
+                             metric="score_drift_psi", value=metrics["score_drift_psi"], threshold=limits["score_psi"]))
+    if metrics["ks_p_value"] < limits["score_ks_p_value"]:
+        alerts.append(_alert("score_drift", "warning",
+                             f"Score distribution differs from baseline: KS p={metrics['ks_p_value']}",
+                             metric="ks_p_value", value=metrics["ks_p_value"], threshold=limits["score_ks_p_value"]))
+    return alerts
+
+
+def _feature_drift_alerts(report, limits):
+    alerts = []
+    for row in report["feature_drift"]:
+        if row["type"] == "score":
+            continue
+        if row["psi"] >= limits["feature_psi"]:
+            alerts.append(_alert("feature_drift", "critical", f"{row['feature']} drifted: PSI={row['psi']}",
+                                 metric="psi", feature=row["feature"], value=row["psi"], threshold=limits["feature_psi"]))
+        elif row.get("chi2_p_value", 1.0) < limits["feature_chi2_p_value"]:
+            alerts.append(_alert("feature_drift", "warning",
+                                 f"{row['feature']} category mix changed: chi2 p={row['chi2_p_value']}",
+                                 metric="chi2_p_value", feature=row["feature"], value=row["chi2_p_value"],
+                                 threshold=limits["feature_chi2_p_value"]))
+    return alerts
+
+
+def drift_job(config):
+    """Score and feature drift alerts, both derived from one drift report (built once per audit)."""
+    report = _drift_report(config)
+    if "error" in report:
+        # No logged data / no baseline: nothing was checked, so the audit must not come out HEALTHY
+        raise RuntimeError(report["error"])
+
+    limits = config["alert_thresholds"]
+    alerts = _score_drift_alerts(report, limits) + _feature_drift_alerts(report, limits)
+    payload = {k: report[k] for k in ("population_size", "metrics", "status", "recommendation", "feature_drift")}
+    return {"payload": payload, "alerts": alerts}
+
+
+def _performance_set(config):
+    """
+    Labelled rows the model was not trained on, as (X, y, source, in_feature_view):
+    production outcomes of the lookback window joined on prediction_id when
+    an outcomes file is configured and holds enough labels, otherwise the
+    held-out test split of the training data.
+    """
+    outcomes_path = config.get("outcomes_path")
+    if outcomes_path and os.path.exists(outcomes_path):
+        from models.retrain import load_outcomes, join_outcomes, MODEL_COLUMNS, MIN_LABELLED_ROWS
+        from monitoring.prediction_store import PredictionLogStore
+
+        since = datetime.now() - timedelta(days=config["lookback_days"])
+        labelled = join_outcomes(load_outcomes(outcomes_path), PredictionLogStore(config["log_store_dir"]), start=since)
+        if len(labelled) >= MIN_LABELLED_ROWS and labelled["target"].nunique() == 2:
+            # Logged rows are already in the model's feature view
+            return labelled[MODEL_COLUMNS], labelled["target"], outcomes_path, True
+        print(f" [!] Only {len(labelled)} labelled predictions in the lookback window; using the held-out split")
+
+    from data.feature_cache import load_training_split
+    data = load_training_split()
+    return data.X_test, data.y_test, "holdout_split", False
+
+
+def performance_job(config):
+    """Scores out-of-sample labelled data with the current artifact (AUC / Gini / KS)."""
+    from models.evaluate import get_credit_metrics
+
+    X, y, source, in_feature_view = _performance_set(config)
+    pipeline = joblib.load(config["model_path"])
+    model = pipeline[1:] if in_feature_view and "features" in pipeline.named_steps else pipeline
+    probs = model.predict_proba(X)[:, 1]
+    metrics = get_credit_metrics(y, probs)
+
+    limits = config["alert_thresholds"]
+    alerts = []
+    if metrics["AUC"] < limits["min_auc"]:
+        alerts.append(_alert("performance", "critical", f"AUC below floor: {metrics['AUC']:.4f}",
+                             metric="AUC", value=metrics["AUC"], threshold=limits["min_auc"]))
+    if metrics["KS_Statistic"] < limits["min_ks"]:
+        alerts.append(_alert("performance", "warning", f"KS below floor: {metrics['KS_Statistic']:.4f}",
+                             metric="KS_Statistic", value=metrics["KS_Statistic"], threshold=limits["min_ks"]))
+    payload = dict(metrics, rows=int(len(X)), data=source)
+    return {"payload": payload, "alerts": alerts}
+
+
+def _run_job(job, config):
+    start = time.perf_counter()
+    result = job(config)
+    result["duration_seconds"] = round(time.perf_counter() - start, 3)
+    return result
 
-# Schedule to run at midnight on the 1st of every month
-schedule.every().month.at("00:00").do(run_monthly_audit)
 
-while True:
-    schedule.run_pending()
-    time.sleep(60)
\ No newline at end of file
+JOBS = {
+    "drift": drift_job,
+    "performance": performance_job
+}
+
+
+# ----------------------------------------------------------------------
+# Alert sinks
+# ----------------------------------------------------------------------
+class ConsoleAlertSink:
+    def send(self, alert):
+        print(f" [!] [{alert['severity'].upper()}] {alert['job']}: {alert['message']}")
+
+
+class FileAlertSink:
+    """Appends one JSON line per alert (also the local stand-in for a pager)."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def send(self, alert):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a") as f:
+            f.write(json.dumps(alert) + "\n")
+
+
+class WebhookAlertSink:
+    """POSTs each alert as JSON (Slack-compatible `text` field included)."""
+
+    def __init__(self, url, timeout=5.0):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, alert):
+        response = requests.post(self.url, json=dict(alert, text=alert["message"]), timeout=self.timeout)
+        response.raise_for_status()
+
+
+ALERT_SINKS = {"console": ConsoleAlertSink, "file": FileAlertSink, "webhook": WebhookAlertSink}
+
+
+def build_alert_sinks(specs):
+    """[{"type": "file", "path": ...}, {"type": "webhook", "url": ...}] -> sink objects."""
+    sinks = []
+    for spec in specs:
+        spec = dict(spec)
+        sinks.append(ALERT_SINKS[spec.pop("type")](**spec))
+    return sinks
+
+
+# ----------------------------------------------------------------------
+# Scheduler
+# ----------------------------------------------------------------------
+class DriftScheduler:
+    """
+    Runs all JOBS in parallel every `interval_minutes`. Runs are strictly
+    sequential: the next one is scheduled from the start of the previous
+    one and, if a run overruns its interval, starts right after it
+    finishes (missed ticks are skipped, not queued). An exclusive lock
+    file in the reports directory keeps a second scheduler from running
+    an audit at the same time.
+    """
+
+    def __init__(self, config=None, jobs=None, sinks=None):
+        self.config = config or load_monitoring_config()
+        self.jobs = jobs or JOBS
+        self.sinks = sinks if sinks is not None else build_alert_sinks(self.config["alert_sinks"])
+        self._stop = threading.Event()
+
+    def run_once(self):
+        """One audit: jobs in parallel, one JSON report, alerts to every sink. Returns the report."""
+        reports_dir = self.config["reports_dir"]
+        os.makedirs(reports_dir, exist_ok=True)
+        with open(os.path.join(reports_dir, ".scheduler.lock"), "w") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                print(" [!] Another drift audit is running, skipping this one")
+                return None
+            return self._run_jobs()
+
+    def _run_jobs(self):
+        started = datetime.now()
+        start = time.perf_counter()
+        results = {}
+        with ProcessPoolExecutor(max_workers=min(self.config["max_workers"], len(self.jobs))) as pool:
+            futures = {name: pool.submit(_run_job, job, self.config) for name, job in self.jobs.items()}
+            for name, future in futures.items():
+                try:
+                    result = future.result()
+                    status = "alert" if result["alerts"] else "ok"
+                except Exception as e:
+                    # A job that could not check anything is reported to the sinks as well
+                    error = _alert(name, "error", f"{name} job failed: {e}")
+                    result, status = {"payload": {"error": str(e)}, "alerts": [error]}, "error"
+                results[name] = dict(result, status=status)
+
+        alerts = [alert for result in results.values() for alert in result["alerts"]]
+        drift_found = any(alert["severity"] != "error" for alert in alerts)
+        report = {
+            "report_timestamp": started.isoformat(timespec="seconds"),
+            "duration_seconds": round(time.perf_counter() - start, 3),
+            "status": "DRIFT_DETECTED" if drift_found else (
+                "ERROR" if any(r["status"] == "error" for r in results.values()) else "HEALTHY"),
+            "jobs": results,
+            "alerts": alerts
+        }
+        report["report_path"] = self._write_report(report, started)
+        self._dispatch(alerts, report["report_path"])
+        print(f" [*] Drift audit {report['status']} in {report['duration_seconds']}s -> {report['report_path']}")
+        return report
+
+    def _write_report(self, report, started):
+        path = os.path.join(self.config["reports_dir"], f"drift-report-{started:%Y%m%dT%H%M%S}.json")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+        os.replace(tmp_path, path)
+        return path
+
+    def _dispatch(self, alerts, report_path):
+        for alert in alerts:
+            alert = dict(alert, report=report_path)
+            for sink in self.sinks:
+                try:
+                    sink.send(alert)
+                except Exception as e:
+                    print(f" [!] Alert sink {type(sink).__name__} failed: {e}")
+
+    def run_forever(self):
+        interval = self.config["interval_minutes"] * 60
+        print(f" [*] Drift scheduler started: every {self.config['interval_minutes']} min, jobs={list(self.jobs)}")
+        next_run = time.monotonic()
+        while not self._stop.is_set():
+            self._stop.wait(max(0.0, next_run - time.monotonic()))
+            if self._stop.is_set():
+                break
+            run_start = time.monotonic()
+            self.run_once()
+            next_run = run_start + interval
+            if time.monotonic() > next_run:
+                print(" [!] Drift audit overran its interval; next run starts now")
+        print(" [*] Drift scheduler stopped")
+
+    def stop(self, *_):
+        self._stop.set()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scheduled drift and performance audits")
+    parser.add_argument("--once", action="store_true", help="run one audit and exit")
+    parser.add_argument("--interval", type=float, default=None, help="minutes between audits")
+    parser.add_argument("--webhook", default=None, help="also POST alerts to this URL")
+    args = parser.parse_args()
+
+    config = load_monitoring_config({"interval_minutes": args.interval})
+    if args.webhook:
+        config["alert_sinks"].append({"type": "webhook", "url": args.webhook})
+
+    scheduler = DriftScheduler(config)
+    if args.once:
+        scheduler.run_once()
+    else:
+        signal.signal(signal.SIGTERM, scheduler.stop)
+        signal.signal(signal.SIGINT, scheduler.stop)
+        scheduler.run_forever()
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+import atexit
+import threading
+
+import pandas as pd
+
+
+class CsvLogSink:
+    """Appends batches to a single CSV file (the original log format)."""
+
+    def __init__(self, log_file, columns):
+        self.log_file = log_file
+        self.columns = list(columns)
+
+    def write(self, batch):
+        batch = batch.reindex(columns=self.columns)
+        needs_header = not os.path.exists(self.log_file) or os.path.getsize(self.log_file) == 0
+        payload = batch.to_csv(index=False, header=needs_header).encode("utf-8")
+
+        # One append per batch: lines from other processes cannot interleave
+        fd = os.open(self.log_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            view = memoryview(payload)
+            while view:
+                written = os.write(fd, view)
+                view = view[written:]
+        finally:
+            os.close(fd)
+
+
+class PredictionLogWriter:
+    """
+    Background writer for the production prediction log.
+
+    Request threads only append a frame to a bounded in-memory buffer; a
+    single writer thread hands the buffer to `sink.write(frame)` in batches
+    when either `batch_size` records are pending or `flush_interval` seconds
+    have passed. Sinks: CsvLogSink (one O_APPEND write per batch) or
+    monitoring.prediction_store.PredictionLogStore (Parquet partitions).
+    `on_write` callbacks get every batch after it was written (e.g. the
+    incremental drift counts of monitoring/drift_accumulator.py).
+
+    Full-buffer policy (explicit, per writer):
+        "drop"  - reject the new records immediately and count them as dropped
+        "block" - wait up to `block_timeout` seconds for space, then drop
+    """
+
+    def __init__(self, sink, max_queue=10000, batch_size=500,
+                 flush_interval=1.0, on_full="drop", block_timeout=1.0, on_write=None):
+        if on_full not in ("drop", "block"):
+            raise ValueError("on_full must be 'drop' or 'block'")
+
+        self.sink = sink
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_full = on_full
+        self.block_timeout = block_timeout
+        self.on_write = list(on_write or [])
+
+        self._buffer = []
+        self._pending = 0
+        self._in_flight = 0
+        self._closed = False
+        self._flush_requested = False
+        self._cond = threading.Condition()
+        self._counters = {"queued": 0, "written": 0, "dropped": 0, "flushes": 0, "write_errors": 0}
+
+        self._thread = threading.Thread(target=self._run, name="prediction-log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # ------------------------------------------------------------------
+    # Producer side (request threads)
+    # ------------------------------------------------------------------
+    def submit(self, frame):
+        """Queues scored rows for writing. Returns False if they were dropped."""
+        n = len(frame)
+        if n == 0:
+            return True
+
+        with self._cond:
+            if self._closed:
+                self._counters["dropped"] += n
+                return False
+
+            if self._pending + n > self.max_queue:
+                has_space = False
+                if self.on_full == "block":
+                    has_space = self._cond.wait_for(
+                        lambda: self._closed or self._pending + n <= self.max_queue,
+                        timeout=self.block_timeout
+                    ) and not self._closed
+                if not has_space:
+                    self._counters["dropped"] += n
+                    return False
+
+            self._buffer.append(frame)
+            self._pending += n
+            self._counters["queued"] += n
+            if self._pending >= self.batch_size:
+                self._cond.notify_all()
+        return True
+
+    def stats(self):
+        """Counters for queued, written and dropped records plus current backlog."""
+        with self._cond:
+            return dict(self._counters, pending=self._pending + self._in_flight,
+                        max_queue=self.max_queue, on_full=self.on_full)
+
+    def flush(self, timeout=10.0):
+        """Blocks until everything queued so far has been written (or timeout)."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify_all()
+            while self._pending or self._in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def after_fork(self):
+        """
+        Restarts the writer thread in a pre-forked worker. Records still
+        buffered belong to the parent, which writes them itself.
+        """
+        self._cond = threading.Condition()
+        self._buffer, self._pending, self._in_flight = [], 0, 0
+        self._flush_requested = False
+        self._counters = dict.fromkeys(self._counters, 0)
+        self._thread = threading.Thread(target=self._run, name="prediction-log-writer", daemon=True)
+        self._thread.start()
+
+    def close(self, timeout=10.0):
+        """Flushes the remaining records and stops the writer thread."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    # ------------------------------------------------------------------
+    # Writer thread
+    # ------------------------------------------------------------------
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._closed or self._flush_requested or self._pending >= self.batch_size,
+                    timeout=self.flush_interval
+                )
+                self._flush_requested = False
+                frames, self._buffer = self._buffer, []
+                self._in_flight, self._pending = self._pending, 0
+                closing = self._closed
+                # Space was freed for blocked producers
+                self._cond.notify_all()
+
+            if frames:
+                self._write(frames)
+
+            with self._cond:
+                self._in_flight = 0
+                self._cond.notify_all()
+
+            if closing:
+                return
+
+    def _write(self, frames):
+        n = sum(len(f) for f in frames)
+        try:
+            batch = pd.concat(frames, ignore_index=True)
+            self.sink.write(batch)
+
+            with self._cond:
+                self._counters["written"] += n
+                self._counters["flushes"] += 1
+        except Exception as e:
+            print(f" [!] Prediction log write failed ({n} records lost): {e}")
+            with self._cond:
+                self._counters["write_errors"] += 1
+                self._counters["dropped"] += n
+            return
+
+        for callback in self.on_write:
+            try:
+                callback(batch)
+            except Exception as e:
+                print(f" [!] Prediction log on_write callback failed: {e}")
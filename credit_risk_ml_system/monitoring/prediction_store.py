@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+import os
+import glob
+import json
+import argparse
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Fixed, typed schema of the production prediction log
+NUMERIC_LOG_COLUMNS = [
+    "LOAN", "MORTDUE", "VALUE", "YOJ", "DEROG", "DELINQ", "CLAGE", "NINQ", "CLNO",
+    "DEBTINC", "COLLATERAL", "L_P_RATIO", "L_C_RATIO", "C_P_RATIO"
+]
+LOG_SCHEMA = pa.schema(
+    [(c, pa.float64()) for c in NUMERIC_LOG_COLUMNS[:9]] +
+    [("REASON", pa.string()), ("JOB", pa.string())] +
+    [(c, pa.float64()) for c in NUMERIC_LOG_COLUMNS[9:]] +
+    [
+        ("HIGH_DEBTINC_FLAG", pa.int8()),
+        ("HAS_DEROG", pa.int8()),
+        ("timestamp", pa.timestamp("s")),
+        ("predicted_prob", pa.float64()),
+        ("decision", pa.string()),
+        # Join key for labelled outcomes (null in parts written before it existed)
+        ("prediction_id", pa.string())
+    ]
+)
+# compact() stages a merged part as <part>.parquet.compacting, listing its sources under this key
+COMPACT_SUFFIX = ".compacting"
+COMPACTED_FROM_KEY = b"compacted_from"
+
+
+class PredictionLogStore:
+    """
+    Columnar, time-partitioned prediction log.
+
+    Layout: <root>/date=YYYY-MM-DD/hour=HH/part-<ns>-<pid>.parquet
+    Writers append new part files (never rewrite), so several workers can
+    log concurrently. Readers prune partitions by timestamp from directory
+    names alone and only decode the requested columns.
+    """
+
+    def __init__(self, root="logs/predictions"):
+        self.root = root
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+    def write(self, frame):
+        """Writes a batch of log rows, one part file per hour partition touched."""
+        if len(frame) == 0:
+            return
+        table = self._to_table(frame)
+        hours = pd.to_datetime(frame["timestamp"]).dt.floor("h").to_numpy()
+
+        for hour in np.unique(hours):
+            mask = hours == hour
+            part = table if mask.all() else table.filter(pa.array(mask))
+            self._write_part(part, pd.Timestamp(hour))
+
+    def _write_part(self, table, hour):
+        part_dir = self._partition_dir(hour)
+        os.makedirs(part_dir, exist_ok=True)
+        name = f"part-{datetime.now().strftime('%Y%m%d%H%M%S%f')}-{os.getpid()}.parquet"
+        tmp_path = os.path.join(part_dir, "." + name + ".tmp")
+        # Write then rename so readers never see a half-written file
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, os.path.join(part_dir, name))
+
+    def _partition_dir(self, hour):
+        return os.path.join(self.root, f"date={hour:%Y-%m-%d}", f"hour={hour:%H}")
+
+    @staticmethod
+    def _to_table(frame):
+        df = frame.reindex(columns=LOG_SCHEMA.names)
+        arrays = []
+        for field in LOG_SCHEMA:
+            col = df[field.name]
+            if pa.types.is_timestamp(field.type):
+                values = pd.to_datetime(col).astype("datetime64[s]")
+            elif pa.types.is_string(field.type):
+                values = col.astype(object).where(col.notna(), None)
+            else:
+                values = pd.to_numeric(col, errors="coerce")
+            arrays.append(pa.array(values, type=field.type, from_pandas=True))
+        return pa.Table.from_arrays(arrays, schema=LOG_SCHEMA)
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+    def list_files(self, start=None, end=None):
+        """Part files whose hour partition overlaps [start, end)."""
+        start = pd.Timestamp(start).floor("h") if start is not None else None
+        end = pd.Timestamp(end) if end is not None else None
+
+        files = []
+        for date_dir in sorted(glob.glob(os.path.join(self.root, "date=*"))):
+            day = pd.Timestamp(os.path.basename(date_dir)[len("date="):])
+            # Day-level pruning before touching hour directories
+            if start is not None and day + timedelta(days=1) <= start:
+                continue
+            if end is not None and day >= end:
+                continue
+            for hour_dir in sorted(glob.glob(os.path.join(date_dir, "hour=*"))):
+                hour = day + timedelta(hours=int(os.path.basename(hour_dir)[len("hour="):]))
+                if start is not None and hour + timedelta(hours=1) <= start:
+                    continue
+                if end is not None and hour >= end:
+                    continue
+                files.extend(sorted(glob.glob(os.path.join(hour_dir, "part-*.parquet"))))
+        return files
+
+    def read(self, columns=None, start=None, end=None):
+        """
+        Reads the log as a DataFrame.
+        columns: projection (only these columns are decoded)
+        start/end: timestamp bounds; non-overlapping partitions are never opened
+        """
+        files = self.list_files(start, end)
+        read_cols = None
+        if columns is not None:
+            read_cols = list(dict.fromkeys(list(columns) + (["timestamp"] if start or end else [])))
+        if not files:
+            return pd.DataFrame(columns=read_cols or LOG_SCHEMA.names)
+
+        tables = [pq.read_table(f, columns=read_cols, schema=LOG_SCHEMA) for f in files]
+        df = pa.concat_tables(tables).to_pandas()
+
+        # Exact row-level bounds inside the edge partitions
+        if start is not None:
+            df = df[df["timestamp"] >= pd.Timestamp(start)]
+        if end is not None:
+            df = df[df["timestamp"] < pd.Timestamp(end)]
+        if columns is not None:
+            df = df[list(columns)]
+        return df.reset_index(drop=True)
+
+    def iter_frames(self, columns=None, start=None, end=None):
+        """
+        Yields the log one part file at a time (bounded memory for large
+        histories); same projection and bounds as read().
+        """
+        read_cols = None
+        if columns is not None:
+            read_cols = list(dict.fromkeys(list(columns) + (["timestamp"] if start or end else [])))
+        for path in self.list_files(start, end):
+            df = pq.read_table(path, columns=read_cols, schema=LOG_SCHEMA).to_pandas()
+            if start is not None:
+                df = df[df["timestamp"] >= pd.Timestamp(start)]
+            if end is not None:
+                df = df[df["timestamp"] < pd.Timestamp(end)]
+            if columns is not None:
+                df = df[list(columns)]
+            yield df
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+    def compact(self, before=None):
+        """
+        Merges the small part files of each closed hour partition into one
+        file (default: every hour before the current one).
+        """
+        before = pd.Timestamp(before) if before is not None else pd.Timestamp.now().floor("h")
+        merged = 0
+        for hour_dir in sorted(glob.glob(os.path.join(self.root, "date=*", "hour=*"))):
+            for staging in glob.glob(os.path.join(hour_dir, "*" + COMPACT_SUFFIX)):
+                # Left by an interrupted compaction: finish it
+                self._publish_compacted(staging)
+            files = sorted(glob.glob(os.path.join(hour_dir, "part-*.parquet")))
+            day = os.path.basename(os.path.dirname(hour_dir))[len("date="):]
+            hour = pd.Timestamp(day) + timedelta(hours=int(os.path.basename(hour_dir)[len("hour="):]))
+            if len(files) < 2 or hour >= before:
+                continue
+            # The merged part is staged under a name the readers' glob skips and
+            # records its sources, so no reader ever sees the rows twice
+            table = pa.concat_tables([pq.read_table(f, schema=LOG_SCHEMA) for f in files])
+            sources = json.dumps([os.path.basename(f) for f in files]).encode()
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}), COMPACTED_FROM_KEY: sources})
+            name = f"part-{datetime.now().strftime('%Y%m%d%H%M%S%f')}-{os.getpid()}.parquet"
+            staging = os.path.join(hour_dir, name + COMPACT_SUFFIX)
+            pq.write_table(table, staging)
+            self._publish_compacted(staging)
+            merged += len(files)
+        return merged
+
+    @staticmethod
+    def _publish_compacted(staging):
+        """Removes the source parts recorded in a staged merge, then moves it into place."""
+        hour_dir = os.path.dirname(staging)
+        for name in json.loads(pq.read_schema(staging).metadata[COMPACTED_FROM_KEY]):
+            if os.path.exists(os.path.join(hour_dir, name)):
+                os.remove(os.path.join(hour_dir, name))
+        os.replace(staging, staging[:-len(COMPACT_SUFFIX)])
+
+    def migrate_csv(self, csv_path):
+        """One-off import of the legacy single-file CSV log into partitions."""
+        df = pd.read_csv(csv_path)
+        df = df[pd.to_datetime(df["timestamp"], errors="coerce").notna()]
+        self.write(df)
+        return len(df)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prediction log store maintenance")
+    parser.add_argument("command", choices=["migrate", "compact"])
+    parser.add_argument("--csv", default="logs/production_predictions.csv")
+    parser.add_argument("--root", default="logs/predictions")
+    args = parser.parse_args()
+
+    store = PredictionLogStore(args.root)
+    if args.command == "migrate":
+        n = store.migrate_csv(args.csv)
+        print(f" Migrated {n} records from {args.csv} into {args.root}")
+    else:
+        n = store.compact()
+        print(f" Compacted {n} part files in {args.root}")
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import scipy.stats as stats
+
+SKETCH_K = 200
+# Capacity decay between compactor levels (KLL's c)
+LEVEL_DECAY = 2.0 / 3.0
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch: approximate distribution of a stream of scores in
+    O(k log(n/k)) memory, mergeable across workers and log partitions.
+
+    Level h holds items of weight 2^h. When the sketch is over capacity the
+    lowest full level is sorted and every other item (random offset) is
+    promoted to the next level. A compaction at level h moves the rank of
+    any query by 0 or +-2^h with mean zero, so the rank error after all
+    compactions is bounded (Hoeffding) by sqrt(2 * sum(w^2) * ln(2/delta)).
+    rank_error() reports that bound, normalised by n, for this sketch.
+    """
+
+    def __init__(self, k=SKETCH_K, seed=None):
+        self.k = k
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+        self._sq_weight = 0.0   # sum of squared compaction weights (error variance bound)
+        self._abs_weight = 0.0  # sum of compaction weights (worst-case error)
+        self._sorted = None
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+    def update(self, values):
+        """Adds a batch of values (NaN ignored)."""
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        self.n += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        """Folds another sketch into this one (in place)."""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, items in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._sq_weight += other._sq_weight
+        self._abs_weight += other._abs_weight
+        self._compress()
+        return self
+
+    def _capacity(self, h):
+        depth = len(self.levels) - 1 - h
+        return max(2, int(np.ceil(self.k * LEVEL_DECAY ** depth)))
+
+    def _compress(self):
+        self._sorted = None
+        while sum(len(items) for items in self.levels) > sum(self._capacity(h) for h in range(len(self.levels))):
+            h = next(h for h, items in enumerate(self.levels) if len(items) >= self._capacity(h))
+            if h + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+
+            items = np.sort(self.levels[h])
+            # An odd item out stays at this level
+            keep, items = (items[-1:], items[:-1]) if len(items) % 2 else (items[:0], items)
+            self.levels[h + 1] = np.concatenate([self.levels[h + 1], items[self._rng.integers(2)::2]])
+            self.levels[h] = keep
+
+            weight = float(2 ** h)
+            self._sq_weight += weight * weight
+            self._abs_weight += weight
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def _weighted(self):
+        """Retained items sorted, with their cumulative weights."""
+        if self._sorted is None:
+            items = np.concatenate(self.levels)
+            weights = np.concatenate([np.full(len(items_h), 2.0 ** h) for h, items_h in enumerate(self.levels)])
+            order = np.argsort(items, kind="stable")
+            self._sorted = (items[order], np.cumsum(weights[order]))
+        return self._sorted
+
+    def cdf(self, x):
+        """Approximate share of values <= x (vectorised)."""
+        if self.n == 0:
+            return np.zeros(np.shape(x))
+        items, cum = self._weighted()
+        idx = np.searchsorted(items, x, side="right")
+        ranks = np.where(idx > 0, cum[np.maximum(idx - 1, 0)], 0.0)
+        return ranks / cum[-1]
+
+    def quantile(self, q):
+        """Approximate q-quantile(s); q=0 and q=1 return the exact min and max."""
+        q = np.asarray(q, dtype=float)
+        if self.n == 0:
+            return np.full(q.shape, np.nan)
+        items, cum = self._weighted()
+        idx = np.minimum(np.searchsorted(cum / cum[-1], q, side="left"), len(items) - 1)
+        out = items[idx]
+        out = np.where(q <= 0, self.min, np.where(q >= 1, self.max, out))
+        return out if out.ndim else float(out)
+
+    def rank_error(self, confidence=0.99):
+        """Normalised rank error bound of one cdf/quantile query at the given confidence."""
+        if self.n == 0:
+            return 0.0
+        hoeffding = np.sqrt(2 * self._sq_weight * np.log(2 / (1 - confidence)))
+        return float(min(hoeffding, self._abs_weight) / self.n)
+
+    @property
+    def num_retained(self):
+        return int(sum(len(items) for items in self.levels))
+
+    @property
+    def nbytes(self):
+        return int(sum(items.nbytes for items in self.levels))
+
+    def __len__(self):
+        return self.n
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    def to_dict(self):
+        return {
+            "k": self.k, "n": self.n, "min": self.min, "max": self.max,
+            "levels": [items.tolist() for items in self.levels],
+            "sq_weight": self._sq_weight, "abs_weight": self._abs_weight
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        sketch = cls(d["k"])
+        sketch.n, sketch.min, sketch.max = d["n"], d["min"], d["max"]
+        sketch.levels = [np.asarray(items, dtype=float) for items in d["levels"]]
+        sketch._sq_weight, sketch._abs_weight = d["sq_weight"], d["abs_weight"]
+        return sketch
+
+
+def _ks_p_value(d, n, m):
+    n_eff = max(1, int(round(n * m / (n + m))))
+    return float(stats.kstwo.sf(d, n_eff))
+
+
+def ks_sketches(a, b, confidence=0.99):
+    """
+    Two-sample KS between two sketches. Both CDFs are step functions that
+    only change at retained items, so D is evaluated there.
+    Returns (D, p_value, error bound of D).
+    """
+    if a.n == 0 or b.n == 0:
+        return 0.0, 1.0, 0.0
+    points = np.concatenate([a._weighted()[0], b._weighted()[0]])
+    d = float(np.max(np.abs(a.cdf(points) - b.cdf(points))))
+    return d, _ks_p_value(d, a.n, b.n), a.rank_error(confidence) + b.rank_error(confidence)
+
+
+def ks_sketch_against_quantiles(quantiles, sketch, baseline_n, confidence=0.99):
+    """
+    KS of a production score sketch against a baseline quantile grid
+    (baseline_profile.SCORE_QUANTILES points, interpolated CDF).
+    Returns (D, p_value, error bound of D from the sketch).
+    """
+    if sketch.n == 0 or baseline_n == 0:
+        return 0.0, 1.0, 0.0
+    quantiles = np.asarray(quantiles, dtype=float)
+    grid = np.linspace(0, 1, len(quantiles))
+    points = np.concatenate([sketch._weighted()[0], quantiles])
+    base_cdf = np.interp(points, quantiles, grid, left=0.0, right=1.0)
+    d = float(np.max(np.abs(sketch.cdf(points) - base_cdf)))
+    return d, _ks_p_value(d, baseline_n, sketch.n), sketch.rank_error(confidence)
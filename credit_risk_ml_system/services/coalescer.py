@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+import time
+import atexit
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+
+from services.inference import predict_default_probability
+
+
+class PredictionCoalescer:
+    """
+    Micro-batches concurrent single-request scoring calls.
+
+    Request threads hand their model-ready frame to predict() and block on a
+    Future. A dispatcher thread collects requests for at most `max_wait_ms`
+    after the first one arrives (or until `max_batch` rows are waiting),
+    runs one predict_proba over the concatenated frame and fans the
+    probabilities back out. Requests scored by different pipelines (a hot
+    reload in the middle of a window) are batched separately.
+    """
+
+    def __init__(self, max_wait_ms=2.0, max_batch=64, predict_fn=predict_default_probability):
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch = max_batch
+        self.predict_fn = predict_fn
+
+        self._queue = []  # (pipeline, frame, future)
+        self._rows = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._counters = {"requests": 0, "batches": 0, "rows": 0}
+
+        self._thread = threading.Thread(target=self._run, name="prediction-coalescer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def predict(self, pipeline, input_df, timeout=None):
+        """Probability of default for every row of input_df (same as predict_default_probability)."""
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("PredictionCoalescer is closed")
+            self._queue.append((pipeline, input_df, future))
+            self._rows += len(input_df)
+            self._counters["requests"] += 1
+            self._cond.notify_all()
+        return future.result(timeout)
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._counters, pending=len(self._queue),
+                         max_wait_ms=self.max_wait * 1000, max_batch=self.max_batch)
+        stats["avg_batch_rows"] = round(stats["rows"] / stats["batches"], 2) if stats["batches"] else 0.0
+        return stats
+
+    def after_fork(self):
+        """Restarts the dispatcher thread in a pre-forked worker."""
+        self._cond = threading.Condition()
+        self._queue, self._rows = [], 0
+        self._counters = dict.fromkeys(self._counters, 0)
+        self._thread = threading.Thread(target=self._run, name="prediction-coalescer", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout=5)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closed or self._queue)
+                if not self._queue:
+                    return
+                # Window opens with the first waiting request
+                deadline = time.monotonic() + self.max_wait
+                while not self._closed and self._rows < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, self._queue, self._rows = self._queue, [], 0
+
+            self._score(batch)
+
+    def _score(self, batch):
+        groups = {}
+        for item in batch:
+            groups.setdefault(id(item[0]), []).append(item)
+
+        for items in groups.values():
+            pipeline = items[0][0]
+            try:
+                frame = items[0][1] if len(items) == 1 else pd.concat([f for _, f, _ in items], ignore_index=True)
+                probs = np.asarray(self.predict_fn(pipeline, frame))
+            except Exception as e:
+                for _, _, future in items:
+                    future.set_exception(e)
+                continue
+
+            # Fan the batch back out to the waiting requests
+            start = 0
+            for _, f, future in items:
+                future.set_result(probs[start:start + len(f)])
+                start += len(f)
+
+            with self._cond:
+                self._counters["batches"] += 1
+                self._counters["rows"] += len(probs)
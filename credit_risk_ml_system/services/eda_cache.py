@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import time
+import base64
+import hashlib
+import argparse
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+from eda_report import render_dashboard_png
+
+EDA_DATA_PATH = "data/raw/hmeq.csv"
+EDA_CACHE_DIR = "reports/eda"
+# Bump when the dashboard layout changes so cached images are re-rendered
+EDA_RENDER_VERSION = "1"
+
+
+def _file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class EdaReportCache:
+    """
+    Precomputed EDA dashboard keyed on the source data's SHA-256.
+
+    The rendered report is persisted as <cache_dir>/eda-<etag>.json, so a
+    restart (or a render at training time) is reused without touching
+    matplotlib. get() serves the current report; at most every
+    `check_interval` seconds it stats the data file and, if it changed,
+    re-renders in a background thread while the previous report is still
+    served.
+    """
+
+    def __init__(self, data_path=EDA_DATA_PATH, cache_dir=EDA_CACHE_DIR, check_interval=30.0):
+        self.data_path = data_path
+        self.cache_dir = cache_dir
+        self.check_interval = check_interval
+
+        self._report = None
+        self._file_state = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self._rendering = None  # thread of the in-flight render
+        self._ready = threading.Event()
+        self.last_error = None
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def get(self, wait=30.0):
+        """Current report dict (etag, image, summary, ...) or None if not rendered yet."""
+        if time.monotonic() - self._last_check >= self.check_interval:
+            self.refresh()
+        if self._report is None:
+            self._ready.wait(wait)
+        return self._report
+
+    def refresh(self, block=False):
+        """Starts a (background) render if the source data changed."""
+        with self._lock:
+            self._last_check = time.monotonic()
+            if not os.path.exists(self.data_path):
+                return
+            stat = os.stat(self.data_path)
+            file_state = (stat.st_mtime_ns, stat.st_size)
+            if file_state == self._file_state or (self._rendering and self._rendering.is_alive()):
+                render = self._rendering
+            else:
+                render = threading.Thread(target=self._build, args=(file_state,), name="eda-render", daemon=True)
+                self._rendering = render
+                render.start()
+        if block and render is not None:
+            render.join()
+
+    def after_fork(self):
+        """A render running in the parent at fork time is restarted on the next get()."""
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _build(self, file_state):
+        try:
+            data_sha256 = _file_sha256(self.data_path)
+            etag = f"{data_sha256[:16]}-v{EDA_RENDER_VERSION}"
+            if self._report is None or self._report["etag"] != etag:
+                report = self._load_persisted(etag) or self._render(etag, data_sha256)
+                self._report = report
+            self._file_state = file_state
+            self.last_error = None
+        except Exception as e:
+            print(f" [!] EDA report render failed: {e}")
+            self.last_error = str(e)
+        finally:
+            self._ready.set()
+
+    def _path(self, etag):
+        return os.path.join(self.cache_dir, f"eda-{etag}.json")
+
+    def _load_persisted(self, etag):
+        path = self._path(etag)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def _render(self, etag, data_sha256):
+        start = time.perf_counter()
+        png = render_dashboard_png(pd.read_csv(self.data_path))
+        report = {
+            "etag": etag,
+            "image": base64.b64encode(png).decode(),
+            "summary": "EDA generated successfully.",
+            "data_sha256": data_sha256,
+            "generated_at": datetime.now().isoformat(timespec="seconds")
+        }
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = self._path(etag) + f".{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(report, f)
+        os.replace(tmp_path, self._path(etag))
+        print(f" [*] EDA report {etag} rendered in {time.perf_counter() - start:.2f}s")
+        return report
+
+
+if __name__ == "__main__":
+    # Precompute the dashboard (e.g. right after a training run)
+    parser = argparse.ArgumentParser(description="Render and cache the EDA dashboard")
+    parser.add_argument("--data", default=EDA_DATA_PATH)
+    parser.add_argument("--cache-dir", default=EDA_CACHE_DIR)
+    args = parser.parse_args()
+
+    cache = EdaReportCache(args.data, args.cache_dir)
+    cache.refresh(block=True)
+    print(f" EDA report ready: {cache.get()['etag']}")
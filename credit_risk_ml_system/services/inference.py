@@ -5,7 +5,311 @@ Created on Sun Jan 18 13:39:06 2025
 @author: mjayant
 """
 
+import os
+import time
+import hashlib
+import threading
+from datetime import datetime
+
 import joblib
+import numpy as np
+import pandas as pd
+
+from features.schema import EXPECTED_SCHEMA
+from features.feature_pipeline import engineer_features
+
+MODEL_PATH = "artifacts/credit_risk_pipeline.pkl"
+
+# Representative applicant used to warm the pipeline up before serving
+# (first predict_proba call pays for lazy initialisation in sklearn/XGBoost)
+WARMUP_RECORD = {
+    "LOAN": 10000,
+    "MORTDUE": 100000,
+    "VALUE": 200000,
+    "REASON": "HomeImp",
+    "JOB": "ProfExe",
+    "YOJ": 15,
+    "DEROG": 0,
+    "DELINQ": 0,
+    "CLAGE": 320,
+    "NINQ": 0,
+    "CLNO": 35,
+    "DEBTINC": 22
+}
+
+
+def load_latest_model(path=MODEL_PATH):
+    return joblib.load(path)
+
+
+def validate_records(records):
+    """
+    Splits a batch of applicant records into valid rows and per-row errors.
+    Returns (valid_records, valid_positions, errors).
+    """
+    valid, positions, errors = [], [], []
+    for i, record in enumerate(records):
+        if not isinstance(record, dict):
+            errors.append({"index": i, "error": "Record must be a JSON object."})
+            continue
+
+        problems = []
+        for col, expected_type in EXPECTED_SCHEMA.items():
+            value = record.get(col)
+            if value is None:
+                continue
+            if expected_type == "float64":
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    problems.append(f"{col} must be numeric")
+            elif not isinstance(value, str):
+                problems.append(f"{col} must be a string")
+
+        if problems:
+            errors.append({"index": i, "error": "; ".join(problems)})
+        else:
+            valid.append(record)
+            positions.append(i)
+    return valid, positions, errors
+
+
+def records_to_frame(records):
+    """Builds the model input frame for a list of applicant dicts in one go."""
+    df = pd.DataFrame.from_records(records)
+    # Absent fields become NaN columns so every row has the full schema
+    for col, expected_type in EXPECTED_SCHEMA.items():
+        if col not in df:
+            df[col] = np.nan if expected_type == "float64" else None
+    return df
+
+
+def build_model_input(records, pipeline=None):
+    """
+    Applicant dicts -> model-ready frame. The request dicts are left untouched.
+
+    Pipelines trained with a "features" step (CreditFeatureTransformer) apply
+    the imputation/clipping statistics fitted at training time; older
+    artifacts fall back to the shared ratio/flag engineering only.
+    """
+    frame = records_to_frame(records)
+    if pipeline is not None and "features" in pipeline.named_steps:
+        return pipeline.named_steps["features"].transform(frame)
+    return engineer_features(frame)
+
+
+def predict_default_probability(pipeline, input_df):
+    """PD for frames produced by build_model_input (the feature step is not re-run)."""
+    if "features" in pipeline.named_steps:
+        return pipeline[1:].predict_proba(input_df)[:, 1]
+    return pipeline.predict_proba(input_df)[:, 1]
+
+
+def _file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ModelManager:
+    """
+    Process-wide cache for the scoring pipeline.
+
+    The artifact is unpickled once, warmed up with a dummy applicant and then
+    shared by every request. A background watcher polls the artifact (mtime,
+    size and SHA-256) or an optional version marker file and swaps a freshly
+    loaded pipeline in atomically. Requests already holding the old pipeline
+    finish with it, so nothing in flight is dropped.
+
+    on_reload callbacks are called as callback(old_pipeline, new_pipeline)
+    after every swap, e.g. to drop or pre-build per-model caches.
+
+    mmap_mode="r" loads an immutable, content-addressed snapshot of the
+    artifact with joblib memory-mapping, so the numpy arrays joblib stores
+    raw are backed by the shared page cache instead of per-process copies.
+    """
+
+    def __init__(self, model_path=MODEL_PATH, version_file=None, poll_interval=5.0, on_reload=None,
+                 mmap_mode=None, snapshot_dir=None):
+        self.model_path = model_path
+        # Optional marker written by deployment tooling, e.g. "2025-07-25-xgb"
+        self.version_file = version_file or os.path.join(os.path.dirname(model_path), "MODEL_VERSION")
+        self.poll_interval = poll_interval
+        self.on_reload = list(on_reload or [])
+        self.mmap_mode = mmap_mode
+        self.snapshot_dir = snapshot_dir or os.path.join(os.path.dirname(model_path), "serving")
+
+        self._pipeline = None
+        self._file_state = None
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        self._watching = False
+        self._stop = threading.Event()
+        self._status = {
+            "ready": False,
+            "model_path": model_path,
+            "model_version": None,
+            "sha256": None,
+            "loaded_at": None,
+            "load_seconds": None,
+            "warmup_ms": None,
+            "reload_count": 0,
+            "last_error": None
+        }
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def get(self):
+        """Returns the current pipeline (None until a model has been loaded)."""
+        return self._pipeline
+
+    @property
+    def ready(self):
+        return self._pipeline is not None
+
+    def status(self):
+        """Snapshot of the loaded model metadata for the status endpoint."""
+        return dict(self._status)
+
+    def load(self, force=False):
+        """
+        Loads (or reloads) the artifact if it changed on disk.
+        Returns True when a new pipeline was swapped in.
+        """
+        with self._reload_lock:
+            if not os.path.exists(self.model_path):
+                return False
+
+            file_state = self._read_file_state()
+            if not force and file_state == self._file_state:
+                return False
+
+            try:
+                if self.mmap_mode:
+                    sha256, load_path = self._snapshot()
+                else:
+                    sha256, load_path = _file_sha256(self.model_path), self.model_path
+                version = self._read_version_marker() or sha256[:12]
+                if not force and sha256 == self._status["sha256"] and version == self._status["model_version"]:
+                    # Touched but not changed (e.g. copied over with identical bytes)
+                    self._file_state = file_state
+                    return False
+
+                start = time.perf_counter()
+                pipeline = joblib.load(load_path, mmap_mode=self.mmap_mode)
+                load_seconds = time.perf_counter() - start
+
+                warmup_ms = self._warm_up(pipeline)
+            except Exception as e:
+                # A half-written artifact must never replace a working model
+                print(f" [!] Model reload failed, keeping current model: {e}")
+                self._status["last_error"] = str(e)
+                return False
+
+            # Single reference assignment: readers see either old or new pipeline
+            old_pipeline, self._pipeline = self._pipeline, pipeline
+            self._file_state = file_state
+            self._status.update({
+                "ready": True,
+                "model_version": version,
+                "sha256": sha256,
+                "loaded_at": datetime.now().isoformat(timespec="seconds"),
+                "load_seconds": round(load_seconds, 4),
+                "warmup_ms": round(warmup_ms, 2),
+                "reload_count": self._status["reload_count"] + 1,
+                "last_error": None
+            })
+            print(f" [*] Model {version} loaded in {load_seconds:.2f}s (warmup {warmup_ms:.1f} ms)")
+            if self.mmap_mode:
+                self._prune_snapshots(keep=load_path)
+
+            for callback in self.on_reload:
+                try:
+                    callback(old_pipeline, pipeline)
+                except Exception as e:
+                    print(f" [!] Model reload callback failed: {e}")
+            return True
+
+    def start_watcher(self):
+        """Starts the daemon thread that hot-reloads the artifact."""
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop.clear()
+        self._watching = True
+        self._watcher = threading.Thread(target=self._watch, name="model-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self):
+        self._watching = False
+        self._stop.set()
+
+    def after_fork(self):
+        """
+        Re-arms the manager in a pre-forked worker: threads do not survive
+        fork(), the pipeline (and its memory pages) is inherited as is.
+        """
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+        if self._watching:
+            self.start_watcher()
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.load()
+            except Exception as e:
+                print(f" [!] Model watcher error: {e}")
+
+    def _snapshot(self):
+        """
+        Copies the artifact to <snapshot_dir>/<sha256[:16]>.pkl and returns
+        (sha256, path). Trainers overwrite model_path in place, which must
+        never happen under a live mapping; snapshots are never modified and
+        every worker maps the same file for the same content.
+        """
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        tmp_path = os.path.join(self.snapshot_dir, f".snapshot-{os.getpid()}.tmp")
+        digest = hashlib.sha256()
+        with open(self.model_path, "rb") as src, open(tmp_path, "wb") as dst:
+            for chunk in iter(lambda: src.read(1 << 20), b""):
+                digest.update(chunk)
+                dst.write(chunk)
+        sha256 = digest.hexdigest()
+        path = os.path.join(self.snapshot_dir, f"{sha256[:16]}.pkl")
+        # Same name == same bytes, so replacing a concurrently written copy is harmless
+        os.replace(tmp_path, path)
+        return sha256, path
+
+    def _prune_snapshots(self, keep):
+        # Unlinking a mapped file is safe: live mappings keep the old inode
+        for name in os.listdir(self.snapshot_dir):
+            path = os.path.join(self.snapshot_dir, name)
+            if name.endswith(".pkl") and path != keep:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def _read_file_state(self):
+        stat = os.stat(self.model_path)
+        marker = None
+        if os.path.exists(self.version_file):
+            marker = os.stat(self.version_file).st_mtime_ns
+        return (stat.st_mtime_ns, stat.st_size, marker)
+
+    def _read_version_marker(self):
+        if os.path.exists(self.version_file):
+            with open(self.version_file, "r") as f:
+                return f.read().strip() or None
+        return None
 
-def load_latest_model(path="artifacts/credit_risk_pipeline.pkl"):
-    return joblib.load(path)
\ No newline at end of file
+    def _warm_up(self, pipeline):
+        start = time.perf_counter()
+        warmup_df = build_model_input([WARMUP_RECORD], pipeline)
+        predict_default_probability(pipeline, warmup_df)
+        return (time.perf_counter() - start) * 1000
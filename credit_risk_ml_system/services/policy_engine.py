@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+import os
+import math
+import time
+
+import numpy as np
+import yaml
+
+CONFIG_PATH = "config.yaml"
+
+# Policy used when config.yaml has no `policy` section (the original hard-coded rules)
+DEFAULT_THRESHOLDS = {"high_risk": 0.70, "medium_risk": 0.25}
+DEFAULT_POLICY = {
+    "score": {"factor": 50, "offset": 500, "min_score": 300, "max_score": 850,
+              "min_prob": 0.001, "max_prob": 0.999},
+    "bands": [
+        {"name": "High Risk", "decision": "DECLINE", "action_code": "D01", "color": "#ef4444",
+         "pd_above": "high_risk", "score_below": 450},
+        {"name": "Medium Risk", "decision": "REFER TO UNDERWRITER", "action_code": "R05", "color": "#f97316",
+         "pd_above": "medium_risk", "score_below": 620},
+        {"name": "Low Risk", "decision": "AUTO-APPROVE", "action_code": "A00", "color": "#22c55e"}
+    ]
+}
+
+
+class RiskPolicy:
+    """
+    Band / decision rules compiled into arrays.
+
+    Bands are checked in order; a band matches when PD > its `pd_above`
+    threshold (a key of config `thresholds`) or the credit score is below
+    `score_below`. The first match wins, a band without rules is the
+    default. evaluate() applies this to whole arrays with np.select.
+    """
+
+    def __init__(self, thresholds, policy):
+        score = policy["score"]
+        self.factor = float(score["factor"])
+        self.offset = float(score["offset"])
+        self.min_score, self.max_score = score["min_score"], score["max_score"]
+        self.min_prob, self.max_prob = float(score["min_prob"]), float(score["max_prob"])
+
+        bands = policy["bands"]
+        rules = [b for b in bands if "pd_above" in b or "score_below" in b]
+        defaults = [b for b in bands if b not in rules]
+        if len(defaults) != 1 or bands[-1] is not defaults[0]:
+            raise ValueError("policy.bands needs exactly one default band (no rules), listed last")
+
+        # NaN-free bounds: a missing rule can never match
+        self.pd_above = np.array([float(thresholds[b["pd_above"]]) if "pd_above" in b else np.inf for b in rules])
+        self.score_below = np.array([b.get("score_below", -np.inf) for b in rules], dtype=float)
+        self.band_fields = {
+            field: np.array([b[key] for b in bands], dtype=object)
+            for field, key in (("risk_band", "name"), ("decision", "decision"),
+                               ("action_code", "action_code"), ("color", "color"))
+        }
+        # Plain-Python copies for the single-row path (no array overhead per request)
+        self._rules = list(zip(self.pd_above.tolist(), self.score_below.tolist()))
+        self._band_rows = [{field: str(values[i]) for field, values in self.band_fields.items()}
+                           for i in range(len(bands))]
+
+    def credit_scores(self, probs):
+        clipped = np.clip(probs, self.min_prob, self.max_prob)
+        scores = self.offset + self.factor * np.log((1 - clipped) / clipped)
+        return np.clip(scores, self.min_score, self.max_score).astype(int)
+
+    def evaluate(self, probs):
+        """Column arrays (one entry per PD): credit_score, risk_band, decision, action_code, color."""
+        probs = np.asarray(probs, dtype=float)
+        scores = self.credit_scores(probs)
+        conditions = [(probs > self.pd_above[i]) | (scores < self.score_below[i]) for i in range(len(self.pd_above))]
+        band_idx = np.select(conditions, list(range(len(conditions))), default=len(conditions))
+
+        details = {field: values[band_idx] for field, values in self.band_fields.items()}
+        details["credit_score"] = scores
+        return details
+
+    def evaluate_one(self, prob):
+        """Single PD -> dict with plain Python values (the realtime API payload); same rules as evaluate()."""
+        clipped = max(min(prob, self.max_prob), self.min_prob)
+        score = self.offset + self.factor * math.log((1 - clipped) / clipped)
+        credit_score = int(max(min(score, self.max_score), self.min_score))
+
+        band = len(self._rules)
+        for i, (pd_above, score_below) in enumerate(self._rules):
+            if prob > pd_above or credit_score < score_below:
+                band = i
+                break
+        row = self._band_rows[band]
+        return {
+            "risk_band": row["risk_band"],
+            "credit_score": credit_score,
+            "decision": row["decision"],
+            "action_code": row["action_code"],
+            "color": row["color"]
+        }
+
+
+class PolicyEngine:
+    """
+    Serves the compiled RiskPolicy from config.yaml. The file is stat-ed
+    at most every `check_interval` seconds and re-compiled only when its
+    mtime changes; a broken edit keeps the previous policy in force.
+    """
+
+    def __init__(self, config_path=CONFIG_PATH, check_interval=5.0):
+        self.config_path = config_path
+        self.check_interval = check_interval
+        self._policy = None
+        self._mtime = None
+        self._last_check = 0.0
+        self.last_error = None
+
+    @property
+    def policy(self):
+        if self._policy is None or time.monotonic() - self._last_check >= self.check_interval:
+            self.reload()
+        return self._policy
+
+    def reload(self):
+        self._last_check = time.monotonic()
+        mtime = os.path.getmtime(self.config_path) if os.path.exists(self.config_path) else None
+        if self._policy is not None and mtime == self._mtime:
+            return
+
+        try:
+            config = {}
+            if mtime is not None:
+                with open(self.config_path, "r") as f:
+                    config = yaml.safe_load(f) or {}
+            thresholds = dict(DEFAULT_THRESHOLDS, **(config.get("thresholds") or {}))
+            self._policy = RiskPolicy(thresholds, config.get("policy") or DEFAULT_POLICY)
+            self._mtime = mtime
+            self.last_error = None
+            print(f" [*] Risk policy loaded from {self.config_path if mtime else 'defaults'}")
+        except Exception as e:
+            self.last_error = str(e)
+            self._mtime = mtime
+            print(f" [!] Risk policy reload failed, keeping the previous policy: {e}")
+            if self._policy is None:
+                self._policy = RiskPolicy(DEFAULT_THRESHOLDS, DEFAULT_POLICY)
+
+    def evaluate(self, probs):
+        return self.policy.evaluate(probs)
+
+    def evaluate_one(self, prob):
+        return self.policy.evaluate_one(prob)
+
+
+policy_engine = PolicyEngine()
@@ -9,13 +9,23 @@ import yaml
 import os
 import math
 
+from services.policy_engine import policy_engine
+
+# Parsed config.yaml, re-read only when the file changes
+_config_cache = {"mtime": None, "config": None}
+
 def load_config():
     """Load thresholds from config.yaml for centralized governance."""
     config_path = "config.yaml"
     if os.path.exists(config_path):
+        mtime = os.path.getmtime(config_path)
+        if _config_cache["mtime"] == mtime:
+            return _config_cache["config"]
         try:
             with open(config_path, "r") as f:
-                return yaml.safe_load(f)
+                config = yaml.safe_load(f)
+            _config_cache.update(mtime=mtime, config=config)
+            return config
         except Exception as e:
             print(f"Error loading config: {e}")
     return None
@@ -31,39 +41,18 @@ def get_realtime_risk_details(prob):
     """
     Refined logic to ensure 'Borderline' cases (like score 550) 
     are referred to manual review.
+    Bands, cut-offs and action codes come from config.yaml (thresholds +
+    policy), compiled once by services.policy_engine and hot-reloaded on change.
+    """
+    return policy_engine.evaluate_one(prob)
+
+def get_batch_risk_details(probs):
+    """
+    Vectorised counterpart of get_realtime_risk_details for batch scoring.
+    Returns column arrays (one entry per probability) with the same
+    score, band, decision and action code as the single-row function.
     """
-    credit_score = probability_to_score(prob)
-    
-    # 1. High Risk / Auto-Decline (PD > 70% or Score < 450)
-    if prob > 0.70 or credit_score < 450:
-        return {
-            "risk_band": "High Risk",
-            "credit_score": credit_score,
-            "decision": "DECLINE",
-            "action_code": "D01",
-            "color": "#ef4444" 
-        }
-    
-    # 2. Medium Risk / Manual Review (PD > 25% or Score < 620)
-    # This captures your 550 score / 26% PD case perfectly.
-    elif prob > 0.25 or credit_score < 620:
-        return {
-            "risk_band": "Medium Risk",
-            "credit_score": credit_score,
-            "decision": "REFER TO UNDERWRITER",
-            "action_code": "R05",
-            "color": "#f97316" # Orange
-        }
-    
-    # 3. Low Risk / Auto-Approve
-    else:
-        return {
-            "risk_band": "Low Risk",
-            "credit_score": credit_score,
-            "decision": "AUTO-APPROVE",
-            "action_code": "A00",
-            "color": "#22c55e" # Green
-        }
+    return policy_engine.evaluate(probs)
 
 # Legacy support for older calls
 def get_risk_band(prob):
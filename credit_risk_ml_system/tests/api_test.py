@@ -60,6 +60,55 @@ def test_prediction_and_shap():
         print(f"❌ Failed! Status: {response.status_code}")
         print(f"Error Detail: {response.text}")
 
+def test_batch_prediction():
+    print("\nTesting Batch Predict API (Vectorised Scoring)...")
+    applicant = {
+        "LOAN": 15000, "MORTDUE": 60000, "VALUE": 100000, "YOJ": 10,
+        "DEROG": 0, "DELINQ": 0, "CLAGE": 250, "NINQ": 0, "CLNO": 25,
+        "DEBTINC": 25.5, "JOB": "Office", "REASON": "DebtCon"
+    }
+    # Last record is deliberately malformed to exercise per-row errors
+    payload = [applicant] * 50 + [{"LOAN": "not-a-number"}]
+    
+    response = requests.post(f"{BASE_URL}/predict/batch", json=payload)
+    
+    if response.status_code == 200:
+        data = response.json()
+        print(f"✅ Scored {data['scored']} / {data['count']} records")
+        if data['failed'] == 1 and data['errors'][0]['index'] == 50:
+            print("✅ Malformed record reported as a per-row error.")
+        else:
+            print(f"❌ Unexpected errors block: {data['errors']}")
+    else:
+        print(f"❌ Failed! Status: {response.status_code}")
+        print(f"Error Detail: {response.text}")
+
+def test_async_explanation():
+    print("\nTesting Deferred Explanations (/predict?explain=async)...")
+    payload = {
+        "LOAN": 15000, "MORTDUE": 60000, "VALUE": 100000, "YOJ": 10,
+        "DEROG": 0, "DELINQ": 0, "CLAGE": 250, "NINQ": 0, "CLNO": 25,
+        "DEBTINC": 25.5, "JOB": "Office", "REASON": "DebtCon"
+    }
+    response = requests.post(f"{BASE_URL}/predict?explain=async", json=payload)
+    if response.status_code != 200:
+        print(f"❌ Failed! Status: {response.status_code}")
+        return
+    
+    data = response.json()
+    print(f"✅ Decision returned inline: {data.get('decision')} (ticket {data.get('explanation_ticket')})")
+    
+    # Poll until the background worker has stored the reason codes
+    for _ in range(50):
+        poll = requests.get(f"{BASE_URL}{data['explanation_url']}")
+        if poll.status_code != 202:
+            break
+        time.sleep(0.1)
+    if poll.status_code == 200 and poll.json().get("status") == "done":
+        print(f"✅ Explanation ready: {poll.json()['explanation']}")
+    else:
+        print(f"❌ Poll failed! Status: {poll.status_code} {poll.text}")
+
 def test_drift_report():
     print("\nTesting Drift Report API...")
     # This often returns 500 if the log file has mismatched columns
@@ -85,6 +134,8 @@ def test_eda_report():
 if __name__ == "__main__":
     if test_health_check():
         test_prediction_and_shap()
+        test_batch_prediction()
+        test_async_explanation()
         # Give the file system a moment to write logs
         time.sleep(1)
         test_drift_report()
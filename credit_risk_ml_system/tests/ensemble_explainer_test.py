@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Additivity of VotingEnsembleExplainer for every supported member type:
+expected_value + attributions.sum(axis=1) must equal the ensemble PD.
+Runs on synthetic data, no artifacts needed:
+    python -m tests.ensemble_explainer_test
+    python -m pytest tests/ensemble_explainer_test.py
+"""
+
+import numpy as np
+from sklearn.datasets import make_classification
+from sklearn.ensemble import (
+    VotingClassifier, RandomForestClassifier, GradientBoostingClassifier, ExtraTreesClassifier
+)
+from sklearn.linear_model import LogisticRegression
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.tree import DecisionTreeClassifier
+from xgboost import XGBClassifier
+
+from explainability.ensemble_explainer import VotingEnsembleExplainer
+
+X, y = make_classification(n_samples=600, n_features=8, n_informative=5, random_state=0)
+BACKGROUND = X.mean(axis=0)
+TOLERANCE = 1e-6
+
+
+def additivity_error(estimators, weights=None):
+    voter = VotingClassifier(estimators, voting="soft", weights=weights).fit(X, y)
+    values, base = VotingEnsembleExplainer(voter, background=BACKGROUND).explain(X[:100])
+    return float(np.abs(base + values.sum(axis=1) - voter.predict_proba(X[:100])[:, 1]).max())
+
+
+def test_tree_members():
+    error = additivity_error([("rf", RandomForestClassifier(50, random_state=0)),
+                              ("et", ExtraTreesClassifier(50, random_state=0)),
+                              ("dt", DecisionTreeClassifier(max_depth=5, random_state=0))])
+    print(f"RF + ExtraTrees + DT: max additivity error {error:.2e}")
+    assert error < TOLERANCE
+
+
+def test_gradient_boosting_member():
+    error = additivity_error([("rf", RandomForestClassifier(50, random_state=0)),
+                              ("gb", GradientBoostingClassifier(n_estimators=50, random_state=0))])
+    print(f"RF + GradientBoosting: max additivity error {error:.2e}")
+    assert error < TOLERANCE
+
+
+def test_xgboost_member():
+    error = additivity_error([("rf", RandomForestClassifier(50, random_state=0)),
+                              ("xgb", XGBClassifier(n_estimators=50, max_depth=3))], weights=[1, 2])
+    print(f"RF + XGBoost (weights 1:2): max additivity error {error:.2e}")
+    assert error < 1e-4  # XGBoost scores in float32
+
+
+def test_logistic_member():
+    error = additivity_error([("lr", LogisticRegression(max_iter=1000)),
+                              ("rf", RandomForestClassifier(50, random_state=0)),
+                              ("gb", GradientBoostingClassifier(n_estimators=50, random_state=0))])
+    print(f"LR + RF + GB (trainerold_ensemble layout): max additivity error {error:.2e}")
+    assert error < TOLERANCE
+
+
+def test_unsupported_member_is_rejected():
+    voter = VotingClassifier([("rf", RandomForestClassifier(10, random_state=0)),
+                              ("knn", KNeighborsClassifier())], voting="soft").fit(X, y)
+    try:
+        VotingEnsembleExplainer(voter, background=BACKGROUND)
+    except ValueError as e:
+        print(f"KNN member rejected: {str(e)[:80]}")
+        return
+    raise AssertionError("KNeighborsClassifier member was accepted")
+
+
+if __name__ == "__main__":
+    for test in (test_tree_members, test_gradient_boosting_member, test_xgboost_member,
+                 test_logistic_member, test_unsupported_member_is_rejected):
+        test()
+    print("\nAll additivity checks passed.")
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Exercises models/retrain.py on simulated production traffic: HMEQ rows
+(resampled with noise) are scored by a model artifact, written to a
+temporary prediction log with prediction ids, and labelled with their
+observed BAD flag. Run from the project directory after training
+(under pytest the serving artifact is used; skipped if there is none):
+    python -m tests.retrain_test
+    python -m tests.retrain_test artifacts/candidates/logistic.pkl artifacts/candidates/streaming_sgd.pkl
+    python -m pytest tests/retrain_test.py
+"""
+
+import os
+import sys
+import json
+import uuid
+import hashlib
+import tempfile
+
+import numpy as np
+import pandas as pd
+import joblib
+import pytest
+
+from models.retrain import retrain_from_outcomes
+from models.train_orchestrator import CHAMPION_PATH
+from monitoring.prediction_store import PredictionLogStore, LOG_SCHEMA
+from services.inference import build_model_input, predict_default_probability
+
+N_PREDICTIONS = 3000
+
+
+def simulate_traffic(model_path, log_root, outcomes_path, seed=7):
+    """Logs N_PREDICTIONS scored applicants over 3 days; returns the outcomes file path."""
+    rng = np.random.default_rng(seed)
+    hmeq = pd.read_csv("data/raw/hmeq.csv").sample(N_PREDICTIONS, replace=True, random_state=seed)
+    numeric = [c for c in hmeq.columns if c not in ("BAD", "REASON", "JOB")]
+    hmeq[numeric] = hmeq[numeric] * rng.lognormal(0, 0.05, size=(len(hmeq), len(numeric)))
+
+    pipeline = joblib.load(model_path)
+    records = hmeq.drop(columns=["BAD"]).astype(object).where(hmeq.notna(), None).to_dict("records")
+    log_df = build_model_input(records, pipeline)
+    log_df["predicted_prob"] = predict_default_probability(pipeline, log_df)
+    log_df["decision"] = "n/a"
+    log_df["timestamp"] = pd.Timestamp("2026-10-01") + pd.to_timedelta(np.sort(rng.uniform(0, 72, len(log_df))), unit="h")
+    log_df["prediction_id"] = [uuid.uuid4().hex for _ in range(len(log_df))]
+    PredictionLogStore(log_root).write(log_df.reindex(columns=LOG_SCHEMA.names))
+
+    pd.DataFrame({"prediction_id": log_df["prediction_id"], "BAD": hmeq["BAD"].to_numpy()}).to_csv(outcomes_path, index=False)
+    return outcomes_path
+
+
+@pytest.fixture
+def model_path():
+    if not os.path.exists(CHAMPION_PATH):
+        pytest.skip(f"{CHAMPION_PATH} missing; train a model first")
+    return CHAMPION_PATH
+
+
+def file_sha256(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def test_warm_start(model_path, tmp_path):
+    print(f"Testing warm-start retraining of {model_path}...")
+    log_root = os.path.join(tmp_path, "predictions")
+    outcomes = simulate_traffic(model_path, log_root, os.path.join(tmp_path, "outcomes.csv"))
+    before = file_sha256(model_path)
+    report = retrain_from_outcomes(outcomes, model_path, log_root=log_root, register=False)
+
+    print(f"Updates: {json.dumps(report['updates'], indent=2)}")
+    candidate = joblib.load(report["artifact"])
+    scored = candidate.predict_proba(pd.read_csv("data/raw/hmeq.csv").drop(columns=["BAD"]).head(5))[:, 1]
+    assert report["labelled_rows"] == N_PREDICTIONS
+    assert file_sha256(model_path) == before, "the source artifact must not change without --promote"
+    assert all(action != "frozen" for name, action in report["updates"].items()
+               if "dt" not in name and "final_estimator" not in name)
+    assert np.all((scored >= 0) & (scored <= 1))
+
+
+if __name__ == "__main__":
+    model_paths = sys.argv[1:] or [CHAMPION_PATH]
+    results = {}
+    for path in model_paths:
+        try:
+            test_warm_start(path, tempfile.mkdtemp())
+            results[path] = True
+        except AssertionError:
+            results[path] = False
+    print("\nResults:", json.dumps(results, indent=2))
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+Exercises data/sql_loader.py against a SQLite stand-in of hmeq_data built
+from sql/load_data.sql and data/raw/hmeq.csv. Run from the project directory:
+    python -m tests.sql_loader_test
+    python -m pytest tests/sql_loader_test.py
+"""
+
+import os
+import json
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data.sql_loader import create_sqlite_standin, iter_chunks, read_table, get_engine, TABLE_DTYPES
+
+CSV_PATH = "data/raw/hmeq.csv"
+
+
+@pytest.fixture
+def url(tmp_path):
+    """Fresh stand-in per test (the date-range test alters the table)."""
+    return create_sqlite_standin(os.path.join(tmp_path, "hmeq.sqlite"))
+
+
+def test_full_read_matches_csv(url):
+    print("Testing chunked full read against the CSV...")
+    csv = pd.read_csv(CSV_PATH).rename(columns={"BAD": "target"})
+    chunks = list(iter_chunks(url=url, chunksize=1000))
+    df = read_table(url=url, chunksize=1000)
+
+    dtypes_ok = all(str(df[c].dtype) == t for c, t in TABLE_DTYPES.items())
+    values_ok = all(
+        np.allclose(df[c].to_numpy(dtype=float), csv[c].to_numpy(dtype=float), equal_nan=True, rtol=1e-6)
+        for c, t in TABLE_DTYPES.items() if t != "category"
+    ) and all(df[c].astype(object).fillna("").tolist() == csv[c].fillna("").tolist() for c in ("REASON", "JOB"))
+    print(f"Chunks: {[len(c) for c in chunks][:3]}... rows {len(df)}, "
+          f"{df.memory_usage(deep=True).sum() / 2**20:.2f} MB vs CSV {csv.memory_usage(deep=True).sum() / 2**20:.2f} MB")
+    assert len(chunks) == 6 and max(len(c) for c in chunks) == 1000
+    assert dtypes_ok and values_ok
+
+
+def test_projection_and_where_pushdown(url):
+    print("\nTesting column projection and WHERE pushdown...")
+    df = read_table(url=url, columns=["LOAN", "JOB"], where="LOAN > :min_loan AND JOB = :job",
+                    params={"min_loan": 20000, "job": "Mgr"})
+    csv = pd.read_csv(CSV_PATH)
+    expected = csv[(csv["LOAN"] > 20000) & (csv["JOB"] == "Mgr")]
+    print(f"Columns {list(df.columns)}, rows {len(df)} (expected {len(expected)})")
+    assert list(df.columns) == ["LOAN", "JOB"] and len(df) == len(expected)
+
+
+def test_date_range_pushdown(url):
+    print("\nTesting date-range pushdown on an added application_date column...")
+    engine = get_engine(url)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ALTER TABLE hmeq_data ADD COLUMN application_date DATE")
+        # One application per day from 2024-01-01, by id
+        conn.exec_driver_sql("UPDATE hmeq_data SET application_date = date('2024-01-01', '+' || (id - 1) || ' days')")
+    df = read_table(url=url, columns=["LOAN", "application_date"], date_column="application_date",
+                    start="2024-02-01", end="2024-03-01")
+    print(f"Rows in February 2024: {len(df)}")
+    assert len(df) == 29 and str(df["application_date"].min()) == "2024-02-01"
+
+
+def test_bad_column_rejected(url):
+    print("\nTesting that unknown projection columns are rejected...")
+    with pytest.raises(ValueError) as rejected:
+        read_table(url=url, columns=["LOAN; DROP TABLE hmeq_data"])
+    print(f"Rejected: {rejected.value}")
+
+
+if __name__ == "__main__":
+    db_path = os.path.join(tempfile.mkdtemp(), "hmeq.sqlite")
+    url = create_sqlite_standin(db_path)
+    results = {}
+    for name, test in (("full_read_matches_csv", test_full_read_matches_csv),
+                       ("projection_and_where_pushdown", test_projection_and_where_pushdown),
+                       ("date_range_pushdown", test_date_range_pushdown),
+                       ("bad_column_rejected", test_bad_column_rejected)):
+        try:
+            test(url)
+            results[name] = True
+        except AssertionError:
+            results[name] = False
+    print("\nResults:", json.dumps(results, indent=2))
@@ -0,0 +1,43 @@
+"""
+CPU budget split of models/train_orchestrator.py: the n_jobs handed to
+the concurrently running families never add up to more than the budget.
+    python -m tests.train_orchestrator_test
+    python -m pytest tests/train_orchestrator_test.py
+"""
+
+from models.train_orchestrator import MODEL_FAMILIES, split_cpu_budget
+
+FAMILIES = list(MODEL_FAMILIES)
+
+
+def concurrent_jobs(budget, cpus):
+    # train_all runs min(len(families), cpus) families at a time
+    shares = sorted(budget.values(), reverse=True)
+    return sum(shares[:min(len(shares), cpus)])
+
+
+def test_budget_is_spent_exactly():
+    for cpus in range(len(FAMILIES), 33):
+        budget = split_cpu_budget(FAMILIES, cpus)
+        assert sum(budget.values()) == cpus, (cpus, budget)
+        assert min(budget.values()) >= 1
+
+
+def test_fewer_cpus_than_families():
+    for cpus in range(1, len(FAMILIES)):
+        budget = split_cpu_budget(FAMILIES, cpus)
+        print(f"cpus={cpus}: {budget}")
+        assert all(n_jobs == 1 for n_jobs in budget.values())
+        assert concurrent_jobs(budget, cpus) <= cpus
+
+
+def test_heavy_family_does_not_oversubscribe():
+    budget = split_cpu_budget(["boosted", "logistic"], 3)
+    assert budget == {"boosted": 2, "logistic": 1}
+
+
+if __name__ == "__main__":
+    test_budget_is_spent_exactly()
+    test_fewer_cpus_than_families()
+    test_heavy_family_does_not_oversubscribe()
+    print("\nAll budget checks passed.")